@@ -0,0 +1,74 @@
+"""Startup benchmark for ``shepherd init``.
+
+Tracks the costs that dominate when init runs thousands of times in batch
+mode: importing :mod:`shepherd.init`, scaffolding a fresh root, re-running
+on an already scaffolded root, and the end-to-end CLI call. Times are the
+median of ``--runs`` repetitions, in milliseconds.
+
+    python benchmarks/bench_init.py [--runs N] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from shepherd.init import load, scaffold  # noqa: E402
+
+PROJECT = REPO / "project.yaml"
+
+
+def _median_ms(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 2)
+
+
+def _python(*args: str) -> None:
+    env = {**os.environ, "PYTHONPATH": str(REPO)}
+    subprocess.run([sys.executable, *args], check=True, env=env, stdout=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shepherd init startup and scaffolding")
+    parser.add_argument("--runs", type=int, default=20, help="Repetitions per measurement (default: 20)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    config, _ = load(PROJECT)
+    with tempfile.TemporaryDirectory(prefix="shepherd-bench-") as tmp:
+        counter = iter(range(1 << 30))
+        existing = Path(tmp) / "existing"
+        scaffold(config, existing)
+        interpreter = _median_ms(lambda: _python("-c", "pass"), args.runs)
+        results = {
+            "interpreter": interpreter,
+            "import": round(_median_ms(lambda: _python("-c", "import shepherd.init"), args.runs) - interpreter, 2),
+            "scaffold_fresh": _median_ms(lambda: scaffold(config, Path(tmp) / f"fresh-{next(counter)}"), args.runs),
+            "scaffold_existing": _median_ms(lambda: scaffold(config, existing), args.runs),
+            "cli": _median_ms(
+                lambda: _python("-m", "shepherd", "init", str(PROJECT), "--root", f"{tmp}/cli-{next(counter)}"),
+                args.runs,
+            ),
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=1))
+    else:
+        for name, ms in results.items():
+            print(f"{name:<18} {ms:>8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""Offline throughput benchmark for the PM loop.
+
+Runs shepherd's side of the delegate -> verify -> retry loop on synthetic
+projects of 5, 50 and 500 tasks, with the model replaced by
+``fake_claude.py`` replaying recorded developer responses: each task's
+first response completes it, except for every ``--fail-every``-th task,
+whose first attempt fails so the retry path runs as well. No network,
+API key or deepagents install is needed. Measured per project size:
+
+- scaffold: scaffolding .deepagents/ into a fresh root, ms;
+- schedule: validating the task DAG and dispatching it with no-op tasks, ms;
+- verify cold / cached: tasks per second through ``run_tasks``;
+- loop: the whole PM loop in seconds, and the median latency of one retry
+  (retry prompt, delegation and re-verification), ms.
+
+Scaffold and schedule times are the median of ``--runs`` repetitions.
+With ``--baseline`` (an earlier ``--json`` output) the run exits 1 when a
+metric is more than ``--tolerance`` worse, for use in CI.
+
+    python benchmarks/bench_loop.py [--sizes 5,50,500] [--json] [--baseline FILE]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from shepherd import scheduler  # noqa: E402
+from shepherd.cache import ResultCache  # noqa: E402
+from shepherd.claude import delegate  # noqa: E402
+from shepherd.init import scaffold  # noqa: E402
+from shepherd.retry import build_prompt  # noqa: E402
+from shepherd.run import run_tasks  # noqa: E402
+from shepherd.state import StateStore, record_verdicts  # noqa: E402
+from shepherd.verify import verify  # noqa: E402
+
+FAKE_CLAUDE = Path(__file__).resolve().parent / "fake_claude.py"
+WORKING_DIR = "ws"
+MAX_RETRIES = 3
+
+# Metrics where larger is better; everything else is a duration.
+THROUGHPUT = ("verify_cold_tps", "verify_cached_tps")
+
+
+def synthetic_project(size: int, max_parallel: int = 4) -> dict:
+    """A project of ``size`` tasks in about ten dependency levels."""
+    width = max(1, size // 10)
+    tasks = []
+    for i in range(size):
+        name = f"t{i:04d}"
+        task = {
+            "name": name,
+            "description": f"Create {name}.txt containing the word done.",
+            "test_command": (
+                f"grep -qx done {WORKING_DIR}/{name}.txt || "
+                f"{{ echo 'AssertionError: {name}.txt is not done'; exit 1; }}"
+            ),
+        }
+        task["depends_on"] = [f"t{i - width:04d}"] if i >= width else []
+        tasks.append(task)
+    return {
+        "name": f"synthetic-{size}",
+        "description": f"Synthetic benchmark project with {size} tasks.",
+        "working_directory": f"./{WORKING_DIR}",
+        "max_parallel": max_parallel,
+        "tasks": tasks,
+    }
+
+
+def responses(config: dict, fail_every: int) -> dict:
+    """Recorded developer responses for ``fake_claude.py``, per task."""
+    script = {}
+    for i, task in enumerate(config["tasks"]):
+        done = {"files": {f"{task['name']}.txt": "done\n"}, "cost_usd": 0.01}
+        if fail_every and i % fail_every == fail_every - 1:
+            script[task["name"]] = [{"files": {f"{task['name']}.txt": "wip\n"}, "cost_usd": 0.01}, done]
+        else:
+            script[task["name"]] = [done]
+    return script
+
+
+def pm_loop(config: dict, root: Path, binary: str) -> dict:
+    """Run the PM loop: dispatch ready tasks, delegate, verify, retry on failure."""
+    tasks = {t["name"]: t for t in config["tasks"]}
+    workdir = root / WORKING_DIR
+    workdir.mkdir(parents=True, exist_ok=True)
+    store = StateStore.for_root(root)
+    cache = ResultCache.for_root(root)
+    lock = threading.Lock()
+    latencies: list[float] = []
+    counts = {"delegations": 0, "retries": 0}
+
+    def dispatch(name: str) -> bool:
+        task = tasks[name]
+        prompt = f"Task: {name}\n{task['description']}"
+        failed_at = None
+        for attempt in range(1, MAX_RETRIES + 2):
+            delegate(name, prompt, workdir, store, binary=binary)
+            verdict = verify(name, task["test_command"], root, WORKING_DIR, cache)
+            record_verdicts(root, WORKING_DIR, [verdict], cache)
+            with lock:
+                counts["delegations"] += 1
+                if failed_at is not None:
+                    counts["retries"] += 1
+                    latencies.append(time.perf_counter() - failed_at)
+            if verdict.passed:
+                return True
+            failed_at = time.perf_counter()
+            previous, current = store.attempts(name)
+            prompt = build_prompt(task, attempt, previous, current)
+        return False
+
+    start = time.perf_counter()
+    try:
+        status = scheduler.run(scheduler.validate(config), dispatch, scheduler.max_parallel(config))
+    finally:
+        store.close()
+        cache.close()
+    return {
+        "loop_s": round(time.perf_counter() - start, 3),
+        "passed": sum(s == "passed" for s in status.values()),
+        **counts,
+        "retry_p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+    }
+
+
+def bench_size(size: int, tmp: Path, binary: str, runs: int, fail_every: int, jobs: int | None) -> dict:
+    config = synthetic_project(size)
+    counter = iter(range(1 << 30))
+    results = {
+        "scaffold_ms": _median_ms(lambda: scaffold(config, tmp / f"scaffold-{size}-{next(counter)}"), runs),
+        "schedule_ms": _median_ms(
+            lambda: scheduler.run(scheduler.validate(config), lambda name: True, scheduler.max_parallel(config)),
+            runs,
+        ),
+    }
+
+    # Verification throughput, with every task complete.
+    root = tmp / f"verify-{size}"
+    (root / WORKING_DIR).mkdir(parents=True)
+    for task in config["tasks"]:
+        (root / WORKING_DIR / f"{task['name']}.txt").write_text("done\n")
+    cache = ResultCache.for_root(root)
+    try:
+        for label in ("verify_cold_tps", "verify_cached_tps"):
+            start = time.perf_counter()
+            verdicts = run_tasks(config, root, None, jobs, cache, reruns=0)
+            results[label] = round(len(verdicts) / (time.perf_counter() - start), 1)
+    finally:
+        cache.close()
+
+    script = tmp / f"script-{size}.json"
+    script.write_text(json.dumps(responses(config, fail_every)))
+    state = tmp / f"sessions-{size}"
+    state.mkdir()
+    os.environ.update(FAKE_CLAUDE_SCRIPT=str(script), FAKE_CLAUDE_STATE=str(state))
+    results.update(pm_loop(config, tmp / f"loop-{size}", binary))
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Metrics of ``results`` more than ``tolerance`` worse than ``baseline``."""
+    regressions = []
+    for size, metrics in results.items():
+        for name, value in metrics.items():
+            before = (baseline.get(size) or {}).get(name)
+            if not isinstance(value, (int, float)) or not before or not name.endswith(("_ms", "_s", "_tps")):
+                continue
+            ratio = before / value if name in THROUGHPUT else value / before
+            if ratio > 1 + tolerance:
+                regressions.append(f"{size} tasks: {name} {before} -> {value} ({ratio:.2f}x worse)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PM loop offline with a scripted model")
+    parser.add_argument("--sizes", default="5,50,500", help="Project sizes in tasks (default: 5,50,500)")
+    parser.add_argument("--runs", type=int, default=5, help="Repetitions for scaffold and schedule (default: 5)")
+    parser.add_argument(
+        "--fail-every",
+        type=int,
+        default=5,
+        help="Every n-th task fails its first attempt, 0 for none (default: 5)",
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Concurrent verifications (default: CPU count)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--baseline", help="Earlier --json output to compare against; exit 1 on regressions")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="With --baseline, fraction a metric may worsen before it counts (default: 0.5)",
+    )
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="shepherd-bench-") as tmp:
+        binary = Path(tmp) / "claude"
+        binary.write_text(f'#!/bin/sh\nexec "{sys.executable}" -S "{FAKE_CLAUDE}" "$@"\n')
+        binary.chmod(0o755)
+        for size in sizes:
+            results[str(size)] = bench_size(size, Path(tmp), str(binary), args.runs, args.fail_every, args.jobs)
+
+    if args.json:
+        print(json.dumps(results, indent=1))
+    else:
+        columns = list(next(iter(results.values())))
+        print(f"{'tasks':>6} " + " ".join(f"{name:>17}" for name in columns))
+        for size, metrics in results.items():
+            print(f"{size:>6} " + " ".join(f"{str(metrics[name]):>17}" for name in columns))
+
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+def _median_ms(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 2)
+
+
+if __name__ == "__main__":
+    main()
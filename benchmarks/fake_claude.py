@@ -0,0 +1,72 @@
+"""Scripted stand-in for ``claude -p --output-format stream-json``.
+
+Replays recorded developer responses instead of calling a model, so the
+delegation loop can be benchmarked offline and deterministically. The
+script is a JSON file named by ``FAKE_CLAUDE_SCRIPT``::
+
+    {"<task>": [{"files": {"path": "content"}, "text": "...", "cost_usd": 0.01}, ...]}
+
+The task is read from the prompt's first line (``Task: <name>...``). The
+n-th call of a session replays the task's n-th response (the last one once
+they run out), writing its files into the working directory and emitting
+the stream events Claude Code would. Call counts per session are kept in
+``FAKE_CLAUDE_STATE``.
+"""
+
+import json
+import os
+import sys
+import uuid
+from pathlib import Path
+
+
+def main():
+    args = sys.argv[1:]
+    prompt = sys.stdin.read()
+    script = json.loads(Path(os.environ["FAKE_CLAUDE_SCRIPT"]).read_text())
+    first = prompt.strip().splitlines()[0] if prompt.strip() else ""
+    task = first.removeprefix("Task:").split(" -- ")[0].strip()
+    session = args[args.index("--resume") + 1] if "--resume" in args else str(uuid.uuid4())
+
+    counter = Path(os.environ["FAKE_CLAUDE_STATE"]) / session
+    calls = int(counter.read_text()) if counter.exists() else 0
+    counter.write_text(str(calls + 1))
+    responses = script.get(task) or [{}]
+    response = responses[min(calls, len(responses) - 1)]
+
+    def emit(event):
+        sys.stdout.write(json.dumps({**event, "session_id": session}) + "\n")
+
+    emit({"type": "system", "subtype": "init", "model": "fake"})
+    turn = 0
+    for path, content in (response.get("files") or {}).items():
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(content)
+        turn += 1
+        emit(
+            {
+                "type": "assistant",
+                "message": {
+                    "id": f"msg-{turn}",
+                    "content": [
+                        {"type": "tool_use", "id": f"tool-{turn}", "name": "Write", "input": {"file_path": path}}
+                    ],
+                    "usage": {"input_tokens": 1000, "output_tokens": len(content) // 4 + 1},
+                },
+            }
+        )
+    text = response.get("text", f"Done with {task}.")
+    emit(
+        {
+            "type": "result",
+            "subtype": "success",
+            "is_error": False,
+            "result": text,
+            "num_turns": turn + 1,
+            "total_cost_usd": response.get("cost_usd", 0.0),
+        }
+    )
+
+
+if __name__ == "__main__":
+    main()
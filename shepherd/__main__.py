@@ -0,0 +1,38 @@
+"""Command-line entry point: ``python -m shepherd <command> [args...]``."""
+
+import importlib
+import sys
+
+COMMANDS = {
+    "init": ("shepherd.init", "Scaffold .deepagents/ from project.yaml"),
+    "plan": ("shepherd.scheduler", "Show the parallel execution plan"),
+    "verify": ("shepherd.verify", "Verify tasks one by one with cached verdicts"),
+    "run": ("shepherd.run", "Run all test commands concurrently, print JSON"),
+    "flaky": ("shepherd.flaky", "Show the flaky-test ledger or release tests"),
+    "state": ("shepherd.state", "Show or update persisted task state"),
+    "retry": ("shepherd.retry", "Build a delta retry prompt for a failed task"),
+    "speculate": ("shepherd.speculate", "Try several fixes at once, keep the first green one"),
+    "snapshot": ("shepherd.snapshots", "List, take or roll back per-task workspace snapshots"),
+    "checkpoint": ("shepherd.checkpoint", "Show the git commits made for verified tasks"),
+    "env": ("shepherd.envcache", "Link cached dependency environments into the workspace"),
+    "claude": ("shepherd.claude", "Delegate to Claude Code in a resumable per-task session"),
+    "report": ("shepherd.telemetry", "Report time, cost and tokens per phase and task"),
+    "batch": ("shepherd.batch", "Run many projects concurrently, print one JSON report"),
+}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print("usage: python -m shepherd <command> [args...]\n\ncommands:")
+        for name, (_, help_text) in COMMANDS.items():
+            print(f"  {name:<10} {help_text}")
+        sys.exit(0 if len(sys.argv) > 1 and sys.argv[1] in ("-h", "--help") else 2)
+
+    command = sys.argv[1]
+    module = importlib.import_module(COMMANDS[command][0])
+    sys.argv = [f"shepherd {command}"] + sys.argv[2:]
+    module.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""Headless batch mode: scaffold, run and verify many projects concurrently.
+
+``shepherd batch`` takes directories or globs of project.yaml files. Every
+project gets an isolated root under ``--out`` holding its own copy of the
+project.yaml, ``.deepagents/``, working directory and ``.shepherd/`` state.
+Up to ``--jobs`` projects run at once: the PM agent runs non-interactively
+in the project's root, then the project's test commands are verified as in
+``shepherd run``. All agents' model calls go through one local proxy with a
+shared requests-per-minute limit (see :mod:`shepherd.ratelimit`). The
+result is a single JSON report covering every project.
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import shlex
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from shepherd.cache import ResultCache
+from shepherd.init import load, scaffold
+from shepherd.output import OutputCapture
+from shepherd.ratelimit import RateLimiter, RateLimitProxy
+from shepherd.run import run_tasks, summarize
+from shepherd.state import record_verdicts
+from shepherd.verify import log_path, run_command
+
+DEFAULT_COMMAND = "deepagents --agent shepherd -n 'Begin working on the project'"
+DEFAULT_JOBS = 4
+DEFAULT_RPM = 50
+DEFAULT_OUT = "shepherd-batch"
+
+
+def find_projects(patterns: list[str]) -> list[Path]:
+    """Expand directories and globs into project files, in a stable order.
+
+    A directory contributes the ``*.yaml``/``*.yml`` files directly inside
+    it and the ``project.yaml`` of each of its subdirectories.
+    """
+    found: dict[Path, None] = {}
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            matches = [*path.glob("*.yaml"), *path.glob("*.yml"), *path.glob("*/project.yaml")]
+        else:
+            matches = [Path(p) for p in glob.glob(pattern, recursive=True)]
+        for match in sorted(matches):
+            if match.is_file():
+                found.setdefault(match.resolve())
+    return list(found)
+
+
+def project_roots(files: list[Path], out: str | Path) -> dict[Path, Path]:
+    """Give every project file its own root directory under ``out``.
+
+    ``foo/project.yaml`` maps to ``out/foo``, ``bar.yaml`` to ``out/bar``;
+    clashing names get a numeric suffix.
+    """
+    roots: dict[Path, Path] = {}
+    used: set[str] = set()
+    for file in files:
+        stem = file.parent.name if file.stem == "project" else file.stem
+        slug = re.sub(r"[^\w.-]+", "-", stem).strip("-").lower() or "project"
+        name, n = slug, 1
+        while name in used:
+            n += 1
+            name = f"{slug}-{n}"
+        used.add(name)
+        roots[file] = Path(out).resolve() / name
+    return roots
+
+
+def run_project(
+    project_file: Path,
+    root: Path,
+    command: str = DEFAULT_COMMAND,
+    env: dict | None = None,
+    timeout: float | None = None,
+    verify_jobs: int | None = None,
+) -> dict:
+    """Scaffold one project into ``root``, run the agent there and verify it."""
+    start = time.monotonic()
+    result = {"project": None, "file": str(project_file), "root": str(root)}
+    try:
+        config, _ = load(project_file)
+    except (SystemExit, OSError) as e:
+        return {**result, "status": "ERROR", "error": str(e)}
+    result["project"] = config["name"]
+
+    # A full disk or an unreadable template must not take the other projects down with it.
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(project_file, root / "project.yaml")
+        scaffold(config, root)
+        capture = OutputCapture(log_path=log_path(root, "agent"))
+        agent_exit, _ = run_command(command, root, timeout, env, capture)
+    except OSError as e:
+        return {**result, "status": "ERROR", "error": str(e)}
+
+    cache = ResultCache.for_root(root)
+    try:
+        verdicts = run_tasks(config, root, jobs=verify_jobs, cache=cache)
+        record_verdicts(root, config.get("working_directory", "./workspace"), verdicts, cache, config)
+        tests = summarize(verdicts, config)
+    except (ValueError, OSError) as e:
+        return {**result, "status": "ERROR", "error": str(e), "agent_exit_code": agent_exit}
+    finally:
+        cache.close()
+
+    if agent_exit == 124:
+        status = "TIMEOUT"
+    elif agent_exit == 0 and tests["failed"] == 0:
+        status = "PASS"
+    else:
+        status = "FAIL"
+    return {
+        **result,
+        "status": status,
+        "agent_exit_code": agent_exit,
+        "duration": round(time.monotonic() - start, 3),
+        "log": str(capture.log_path),
+        "tests": tests,
+    }
+
+
+def run_batch(
+    files: list[Path],
+    out: str | Path = DEFAULT_OUT,
+    command: str = DEFAULT_COMMAND,
+    jobs: int = DEFAULT_JOBS,
+    rpm: float | None = DEFAULT_RPM,
+    timeout: float | None = None,
+) -> dict:
+    """Run every project concurrently and return the aggregated report.
+
+    Args:
+        files: Project files, see :func:`find_projects`.
+        out: Directory holding one root per project.
+        command: Agent command run in each root.
+        jobs: Maximum projects running at once.
+        rpm: Model calls per minute shared by all agents; None for no limit.
+        timeout: Seconds before an agent is killed.
+    """
+    roots = project_roots(files, out)
+    verify_jobs = max(1, (os.cpu_count() or 1) // jobs)
+    start = time.monotonic()
+
+    def run_all(env: dict) -> list[dict]:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            return list(
+                pool.map(lambda f: run_project(f, roots[f], command, env, timeout, verify_jobs), files)
+            )
+
+    if rpm:
+        with RateLimitProxy(RateLimiter(rpm)) as proxy:
+            results = run_all({**os.environ, **proxy.env()})
+        model_calls = proxy.stats()
+    else:
+        results = run_all(dict(os.environ))
+        model_calls = None
+
+    report = {
+        "projects": len(results),
+        "passed": sum(r["status"] == "PASS" for r in results),
+        "failed": sum(r["status"] != "PASS" for r in results),
+        "duration": round(time.monotonic() - start, 3),
+        "results": results,
+    }
+    if model_calls is not None:
+        report["model_calls"] = model_calls
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Scaffold, run and verify many projects concurrently; print one JSON report"
+    )
+    parser.add_argument("projects", nargs="+", help="Directories or globs of project.yaml files")
+    parser.add_argument(
+        "-o",
+        "--out",
+        default=DEFAULT_OUT,
+        help=f"Directory for the per-project roots (default: {DEFAULT_OUT})",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Maximum projects running at once (default: {DEFAULT_JOBS})",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=DEFAULT_RPM,
+        help=f"Model calls per minute across all projects, 0 for no limit (default: {DEFAULT_RPM})",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Seconds before a project's agent is killed (default: none)",
+    )
+    parser.add_argument(
+        "--command",
+        default=DEFAULT_COMMAND,
+        help=f"Agent command run in each project root (default: {shlex.quote(DEFAULT_COMMAND)})",
+    )
+    parser.add_argument("--report", metavar="FILE", help="Also write the report to FILE")
+    args = parser.parse_args()
+
+    files = find_projects(args.projects)
+    if not files:
+        raise SystemExit(f"Error: no project files match {' '.join(args.projects)}")
+    if args.jobs < 1:
+        raise SystemExit("Error: --jobs must be at least 1")
+
+    report = run_batch(files, args.out, args.command, args.jobs, args.rpm or None, args.timeout)
+    text = json.dumps(report, indent=1)
+    if args.report:
+        Path(args.report).write_text(text + "\n")
+    print(text)
+    sys.exit(0 if report["failed"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
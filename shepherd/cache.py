@@ -0,0 +1,167 @@
+"""Content-addressed on-disk cache of test_command verdicts."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+STATE_DIR = ".shepherd"
+DEFAULT_MAX_ENTRIES = 512
+
+# Directories that never affect a test verdict but are expensive to hash.
+IGNORED_DIRS = {
+    ".git",
+    ".hg",
+    ".shepherd",
+    ".venv",
+    "venv",
+    "__pycache__",
+    ".pytest_cache",
+    ".mypy_cache",
+    ".ruff_cache",
+    ".tox",
+    ".nox",
+    "node_modules",
+    "target",
+}
+
+# Environment variables that change which interpreter/toolchain a command uses.
+ENV_KEYS = ("PATH", "PYTHONPATH", "VIRTUAL_ENV", "NODE_ENV", "NODE_PATH", "GOFLAGS", "CARGO_TARGET_DIR")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    verdict TEXT NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS digests (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+"""
+
+
+class ResultCache:
+    """SQLite-backed verdict cache with an LRU cap on the number of entries.
+
+    File digests are memoised by (size, mtime) so hashing an unchanged tree
+    only costs a directory walk and a ``stat`` per file.
+    """
+
+    def __init__(self, path: str | Path, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    @classmethod
+    def for_root(cls, root: str | Path, **kwargs) -> "ResultCache":
+        """Open the cache stored under ``<root>/.shepherd/``."""
+        return cls(Path(root) / STATE_DIR / "cache.db", **kwargs)
+
+    def get(self, key: str) -> dict | None:
+        with self._lock, self._db:
+            row = self._db.execute("SELECT verdict FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, verdict: dict) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, verdict, accessed) VALUES (?, ?, ?)",
+                (key, json.dumps(verdict), time.time()),
+            )
+            self._db.execute(
+                "DELETE FROM results WHERE key NOT IN "
+                "(SELECT key FROM results ORDER BY accessed DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def file_digests(self, root: str | Path) -> dict[str, str]:
+        """Return ``{relative path: sha256}`` for every file under ``root``."""
+        root = Path(root).resolve()
+        digests = {}
+        updates = []
+        with self._lock:
+            prefix = f"{root}{os.sep}"
+            memo = {
+                path: (size, mtime_ns, digest)
+                for path, size, mtime_ns, digest in self._db.execute(
+                    "SELECT path, size, mtime_ns, digest FROM digests "
+                    "WHERE substr(path, 1, ?) = ?",
+                    (len(prefix), prefix),
+                )
+            }
+            for rel, st in _walk(root):
+                key = str(root / rel)
+                row = memo.get(key)
+                if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+                    digests[rel] = row[2]
+                    continue
+                digest = _hash_file(root / rel)
+                digests[rel] = digest
+                updates.append((key, st.st_size, st.st_mtime_ns, digest))
+            if updates:
+                with self._db:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?)", updates
+                    )
+        return digests
+
+    def tree_digest(self, root: str | Path) -> str:
+        """Return a single digest for the content of every file under ``root``."""
+        return tree_digest(self.file_digests(root))
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def tree_digest(file_digests: dict[str, str]) -> str:
+    h = hashlib.sha256()
+    for rel in sorted(file_digests):
+        h.update(f"{rel}\0{file_digests[rel]}\n".encode())
+    return h.hexdigest()
+
+
+def cache_key(command: str, tree: str, env: dict | None = None) -> str:
+    """Combine a command, a tree digest and the relevant environment into a key."""
+    env = os.environ if env is None else env
+    h = hashlib.sha256()
+    h.update(command.encode())
+    h.update(b"\0" + tree.encode())
+    for name in ENV_KEYS:
+        h.update(f"\0{name}={env.get(name, '')}".encode())
+    return h.hexdigest()
+
+
+def _walk(root: Path):
+    if not root.is_dir():
+        return
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        with os.scandir(current) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in IGNORED_DIRS:
+                        stack.append(Path(entry.path))
+                # Worktrees and submodules have a .git file pointing at the repository.
+                elif entry.is_file(follow_symlinks=False) and entry.name != ".git":
+                    yield Path(entry.path).relative_to(root).as_posix(), entry.stat()
+
+
+def _hash_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
@@ -0,0 +1,331 @@
+"""Automatic git commits of verified tasks, and which task made which commit.
+
+When a verification turns a task ``passed``, the working directory's
+changes are committed in its repository (one is initialized, with a
+``.gitignore`` for environment and cache directories, when the working
+directory is not the root of one). Files that usually hold credentials
+(``.env``, ``*.pem``, private keys) are never added. If the working
+directory had no ``.gitignore`` when the first checkpoint is made, that
+commit only holds the files the task's delegations edited, so nothing the
+user keeps out of version control lands in history unasked. The message
+follows the git-workflow skill's conventional format,
+``<type>: <short description>``, with the task's description as body and
+``Shepherd-Task`` / ``Shepherd-Verified`` trailers. The commit is built
+through a temporary index from HEAD and holds the working directory's
+content whatever is staged; the real index is only updated for the
+committed paths, and HEAD moves only if no one else moved it meanwhile.
+While other tasks are still in progress, only the files the task's
+delegations edited are committed (see :mod:`shepherd.snapshots`), so
+their half-done work stays out of it.
+
+Each commit is recorded against its tasks in the state store, with the
+files it changed. :func:`commits`, :func:`task_files`, :func:`task_diff`
+and :func:`tasks_for` answer "what did this task change" and "which tasks
+touched this file" from there, without walking the history.
+Set ``checkpoints: false`` in project.yaml to turn commits off.
+"""
+
+import argparse
+import fcntl
+import fnmatch
+import json
+import os
+import re
+import subprocess
+import tempfile
+import textwrap
+from pathlib import Path
+
+from shepherd import snapshots
+from shepherd.cache import IGNORED_DIRS, STATE_DIR
+from shepherd.config import load_project
+from shepherd.retry import EMPTY_TREE
+from shepherd.state import GIT_TIMEOUT, StateStore, run_git
+
+SUBJECT_LIMIT = 72
+
+# Commit type by the task description's opening words; anything else is a feature.
+COMMIT_TYPES = (
+    ("fix", re.compile(r"^(fix|repair|resolve|correct)\b")),
+    ("refactor", re.compile(r"^(refactor|restructure|clean ?up|simplify|rename)\b")),
+    ("docs", re.compile(r"^(document|(add|write|update) (the )?(docs|documentation|readme))\b")),
+    ("test", re.compile(r"^(add|write|extend) (\w+ )?(unit |integration |e2e )?tests?\b")),
+    ("chore", re.compile(r"^(install|set ?up|configure|pin|bump|upgrade|add \S+ to requirements)\b")),
+)
+
+# Files that commonly hold credentials; never committed automatically,
+# except templates such as .env.example.
+SECRET_PATTERNS = (".env", ".env.*", "*.pem", "*.key", "*.p12", "*.pfx", "id_rsa", "id_dsa", "id_ecdsa", "id_ed25519")
+SECRET_TEMPLATES = ("*.example", "*.sample", "*.template")
+
+# Author used when git has no identity configured.
+IDENTITY = {
+    "GIT_AUTHOR_NAME": "ShepherdAI",
+    "GIT_AUTHOR_EMAIL": "shepherd@localhost",
+    "GIT_COMMITTER_NAME": "ShepherdAI",
+    "GIT_COMMITTER_EMAIL": "shepherd@localhost",
+}
+
+
+def enabled(config: dict | None) -> bool:
+    return config is not None and config.get("checkpoints", True) is not False
+
+
+def commit(
+    root: str | Path,
+    workdir: str | Path,
+    tasks: list[str],
+    config: dict | None = None,
+    commands: dict[str, str] | None = None,
+) -> dict | None:
+    """Commit the working directory's changes for ``tasks``, which just passed.
+
+    Args:
+        commands: Test command that verified each task, for the trailers.
+
+    Returns:
+        ``{"commit", "parent", "tasks", "files", "message"}``, or None when
+        there was nothing to commit or git could not commit.
+    """
+    workdir = Path(workdir)
+    if not tasks or not workdir.is_dir():
+        return None
+    specs = {t["name"]: t for t in (config or {}).get("tasks") or []}
+    lock = Path(root) / STATE_DIR / "checkpoint.lock"
+    lock.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        unguarded = not (workdir / ".gitignore").exists()
+        if not _ensure_repository(workdir):
+            return None
+        store = StateStore.for_root(root)
+        try:
+            running = [n for n, s in store.all().items() if s.status == "in_progress" and n not in tasks]
+            touched = sorted({p for t in tasks for p in snapshots.touched(root, t)})
+            paths = ["."]
+            if unguarded and not store.commits():
+                # Nothing says what the user keeps out of git yet; take only what the task edited.
+                paths = touched
+                if not paths:
+                    return None
+            elif running:
+                paths = touched or paths
+            parent = run_git(workdir, "rev-parse", "--verify", "-q", "HEAD")
+            tree = _stage(workdir, parent, paths)
+            if tree is None:
+                return None
+            files = _changed(workdir, parent or EMPTY_TREE, tree)
+            if not files:
+                return None
+            text = message([specs.get(t) or {"name": t} for t in tasks], commands or {})
+            env = None if run_git(workdir, "var", "GIT_AUTHOR_IDENT") else {**os.environ, **IDENTITY}
+            parents = ["-p", parent] if parent else []
+            sha = run_git(workdir, "commit-tree", tree, *parents, "-m", text, env=env)
+            if sha is None or run_git(workdir, "update-ref", "HEAD", sha, parent or "0" * 40) is None:
+                return None
+            # Match the real index to the new HEAD for the committed paths only.
+            _git_stdin(workdir, ["reset", "-q", "--pathspec-from-file=-", "--pathspec-file-nul"], files)
+            for task in tasks:
+                store.record_commit(task, sha, parent, files)
+        finally:
+            store.close()
+    return {"commit": sha, "parent": parent, "tasks": list(tasks), "files": files, "message": text}
+
+
+def message(tasks: list[dict], commands: dict[str, str]) -> str:
+    """The commit message for ``tasks``: ``<type>: <summary>``, body and trailers."""
+    kinds = {commit_type(t) for t in tasks}
+    kind = kinds.pop() if len(kinds) == 1 else "feat"
+    if len(tasks) == 1:
+        summary = _summary(tasks[0], SUBJECT_LIMIT - len(kind) - 2)
+        # "fix: fix the parser" reads better as "fix: the parser".
+        if summary.startswith(f"{kind} ") and kind != "test":
+            summary = summary[len(kind) + 1 :]
+        subject = f"{kind}: {summary}"
+        body = [textwrap.fill(" ".join(tasks[0].get("description", "").split()), SUBJECT_LIMIT)]
+    else:
+        subject = _shorten(f"{kind}: complete {', '.join(t['name'] for t in tasks)}", SUBJECT_LIMIT)
+        body = [
+            textwrap.fill(
+                f"- {t['name']}: {_summary(t, SUBJECT_LIMIT)}", SUBJECT_LIMIT, subsequent_indent="  "
+            )
+            for t in tasks
+        ]
+    trailers = []
+    for t in tasks:
+        trailers.append(f"Shepherd-Task: {t['name']}")
+        if commands.get(t["name"]):
+            trailers.append(f"Shepherd-Verified: {' '.join(commands[t['name']].split())}")
+    return "\n\n".join(part for part in (subject, "\n".join(filter(None, body)), "\n".join(trailers)) if part)
+
+
+def commit_type(task: dict) -> str:
+    """Conventional-commit type for a task, from the start of its description."""
+    text = " ".join((task.get("description") or task.get("name") or "").lower().split())
+    return next((kind for kind, pattern in COMMIT_TYPES if pattern.search(text)), "feat")
+
+
+def commits(root: str | Path, task: str | None = None) -> list[dict]:
+    """Checkpoint commits of ``task``, or of every task, newest first."""
+    store = StateStore.for_root(root)
+    try:
+        return store.commits(task)
+    finally:
+        store.close()
+
+
+def task_files(root: str | Path, task: str) -> list[str]:
+    """Paths, relative to the working directory, that the task's commits changed."""
+    return sorted({path for c in commits(root, task) for path in c["files"]})
+
+
+def tasks_for(root: str | Path, paths: list[str]) -> list[str]:
+    """Tasks whose commits changed any of ``paths``, in the order they were first committed."""
+    wanted = set(paths)
+    found = {}
+    for c in reversed(commits(root)):
+        if wanted.intersection(c["files"]):
+            found.setdefault(c["task"], None)
+    return list(found)
+
+
+def task_diff(root: str | Path, workdir: str | Path, task: str, stat: bool = False) -> str:
+    """The changes of the task's commits, oldest first, as one diff.
+
+    Commits other tasks made in between are not included.
+    """
+    chunks = []
+    for c in reversed(commits(root, task)):
+        diff = run_git(workdir, "diff", *(["--stat"] if stat else []), c["parent"] or EMPTY_TREE, c["commit"])
+        if diff:
+            chunks.append(diff)
+    return "\n".join(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the git commits made for verified tasks")
+    parser.add_argument(
+        "project_file",
+        nargs="?",
+        default="project.yaml",
+        help="Path to project.yaml (default: project.yaml)",
+    )
+    parser.add_argument("--task", metavar="NAME", help="Only this task's commits")
+    parser.add_argument("--diff", action="store_true", help="With --task, print the task's changes as a diff")
+    parser.add_argument("--stat", action="store_true", help="With --diff, print a diffstat instead")
+    parser.add_argument("--path", nargs="+", metavar="FILE", help="List the tasks that changed these files")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+
+    try:
+        config = load_project(args.project_file)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+    if args.task and args.task not in {t.get("name") for t in config.get("tasks") or []}:
+        raise SystemExit(f"Error: no task named {args.task}")
+    if args.diff and not args.task:
+        raise SystemExit("Error: --diff needs --task")
+    root = Path.cwd()
+    workdir = root / config.get("working_directory", "./workspace")
+
+    if args.path:
+        found = tasks_for(root, args.path)
+        print(json.dumps(found) if args.json else "\n".join(found) or "no task changed these files")
+    elif args.diff:
+        print(task_diff(root, workdir, args.task, args.stat))
+    else:
+        listed = commits(root, args.task)
+        if args.json:
+            print(json.dumps(listed, indent=1))
+        for c in [] if args.json else listed:
+            subject = run_git(workdir, "log", "-1", "--format=%s", c["commit"]) or ""
+            print(f"{c['commit'][:10]}  {c['task']:<20} {len(c['files']):>3} file(s)  {subject}")
+        if not listed and not args.json:
+            print("no checkpoint commits yet")
+
+
+def _ensure_repository(workdir: Path) -> bool:
+    """Make ``workdir`` the root of a git repository; False if git is unavailable."""
+    if run_git(workdir, "rev-parse", "--show-toplevel") == str(workdir.resolve()):
+        return True
+    if run_git(workdir, "init", "-q") is None:
+        return False
+    ignore = workdir / ".gitignore"
+    if not ignore.exists():
+        names = [f"{name}/" for name in sorted(IGNORED_DIRS - {".git", ".hg"})]
+        names += [*SECRET_PATTERNS, *(f"!{pattern}" for pattern in SECRET_TEMPLATES)]
+        ignore.write_text("".join(f"{name}\n" for name in names))
+    return True
+
+
+def _stage(workdir: Path, parent: str | None, paths: list[str]) -> str | None:
+    """Write HEAD plus the working directory's changes under ``paths`` as a tree."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "GIT_INDEX_FILE": os.path.join(tmp, "index")}
+        if parent and run_git(workdir, "read-tree", parent, env=env) is None:
+            return None
+        if paths != ["."]:
+            # Files edited and then deleted again before the task passed.
+            tracked = set((run_git(workdir, "ls-files", "-z", env=env) or "").split("\0"))
+            paths = [p for p in paths if (workdir / p).exists() or p in tracked]
+            if not paths:
+                return None
+        excluded = [f":(exclude,glob)**/{name}/**" for name in sorted(IGNORED_DIRS)]
+        add = ["add", "-A", "--pathspec-from-file=-", "--pathspec-file-nul"]
+        if _git_stdin(workdir, add, paths + excluded, env) is None:
+            return None
+        # Repositories the user set up may not ignore them; keep new ones out regardless.
+        added = run_git(
+            workdir, "diff-index", "--cached", "-z", "--name-only", "--diff-filter=A", parent or EMPTY_TREE, env=env
+        )
+        secrets = [p for p in (added or "").split("\0") if p and _is_secret(p)]
+        rm = ["--literal-pathspecs", "rm", "-q", "--cached", "--pathspec-from-file=-", "--pathspec-file-nul"]
+        if secrets and _git_stdin(workdir, rm, secrets, env) is None:
+            return None
+        return run_git(workdir, "write-tree", env=env)
+
+
+def _is_secret(path: str) -> bool:
+    name = os.path.basename(path)
+    return any(fnmatch.fnmatch(name, p) for p in SECRET_PATTERNS) and not any(
+        fnmatch.fnmatch(name, p) for p in SECRET_TEMPLATES
+    )
+
+
+def _summary(task: dict, limit: int) -> str:
+    """The description's first sentence, lower-cased and cut to ``limit``; else the task name."""
+    text = " ".join((task.get("description") or "").split())
+    text = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0].rstrip(".!?") or task["name"]
+    return _shorten(text[:1].lower() + text[1:], limit)
+
+
+def _shorten(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return text[: limit - 3].rsplit(" ", 1)[0].rstrip(",;:") + "..."
+
+
+def _changed(workdir: Path, old: str, new: str) -> list[str]:
+    diff = run_git(workdir, "diff-tree", "-r", "-z", "--no-renames", "--name-only", old, new)
+    return sorted(p for p in (diff or "").split("\0") if p)
+
+
+def _git_stdin(workdir: Path, args: list[str], items: list[str], env: dict | None = None) -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", *args],
+            cwd=workdir,
+            env=env,
+            input="\0".join(items),
+            capture_output=True,
+            text=True,
+            timeout=GIT_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,500 @@
+"""Delegate to Claude Code in headless mode through one reusable session per task.
+
+``python -m shepherd claude --task NAME -m 'prompt'`` runs ``claude -p`` in the
+project's working directory. The first delegation of a task starts a
+session; its ``session_id`` is kept in the state store (see
+:mod:`shepherd.state`), and every later delegation of the task, retries
+included, resumes it with ``--resume``, so Claude keeps the context it
+built instead of rebuilding it.
+
+Output is read as ``stream-json`` while the call runs. Every tool call is
+reported as it happens, with the turns, files touched and estimated cost
+so far, and the call is stopped early once it exceeds a budget: turns,
+cost, wall time, or the same tool call repeated with no new edit in
+between, the usual sign of a loop. The session survives an early stop and
+the next delegation resumes it. Turns and cost are added to the task's
+totals.
+"""
+
+import argparse
+import asyncio
+import fcntl
+import json
+import os
+import re
+import shlex
+import signal
+import subprocess
+import sys
+import time
+from collections import Counter
+from collections.abc import Callable
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from shepherd import snapshots
+from shepherd.cache import STATE_DIR
+from shepherd.config import load_project
+from shepherd.state import StateStore
+from shepherd.telemetry import span
+
+DEFAULT_MAX_TURNS = 20
+DEFAULT_TIMEOUT = 900
+DEFAULT_BINARY = "claude"
+DEFAULT_MAX_REPEATS = 3
+
+# Tools whose calls change files; a new one counts as progress.
+EDIT_TOOLS = ("Edit", "MultiEdit", "Write", "NotebookEdit")
+
+# USD per million input and output tokens, matched against the model name.
+# Only used to estimate cost while a call runs; the final result carries
+# Claude Code's own total_cost_usd. Unknown models are priced as sonnet.
+PRICES = {"opus": (5.0, 25.0), "sonnet": (3.0, 15.0), "haiku": (1.0, 5.0)}
+
+# Stream lines carry whole tool results, e.g. files Claude read.
+LINE_LIMIT = 16 * 1024 * 1024
+
+# Claude Code's answer when asked to resume a session it no longer has.
+_MISSING_SESSION = ("No conversation found", "session not found")
+
+
+@dataclass
+class Delegation:
+    """Outcome of one ``claude -p`` call."""
+
+    task: str
+    session_id: str | None
+    resumed: bool
+    exit_code: int
+    is_error: bool
+    subtype: str | None
+    result: str
+    turns: int = 0
+    cost_usd: float = 0.0
+    duration: float = 0.0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    tool_calls: int = 0
+    files: list[str] = field(default_factory=list)
+    stopped: str | None = None
+
+
+@dataclass
+class Budget:
+    """Limits past which a running delegation is stopped."""
+
+    max_turns: int = DEFAULT_MAX_TURNS
+    max_cost: float | None = None
+    timeout: float | None = DEFAULT_TIMEOUT
+    max_repeats: int = DEFAULT_MAX_REPEATS
+
+
+@dataclass
+class Progress:
+    """What a delegation has done so far, updated per stream event."""
+
+    session_id: str | None = None
+    model: str | None = None
+    turns: int = 0
+    cost_usd: float = 0.0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    tool_calls: int = 0
+    files: list[str] = field(default_factory=list)
+    last_tool: str | None = None
+    last_text: str = ""
+    result: dict | None = None
+
+
+class StreamMonitor:
+    """Consume ``stream-json`` events of one call and check them against a budget."""
+
+    def __init__(self, budget: Budget):
+        self.budget = budget
+        self.progress = Progress()
+        self._messages: set[str] = set()
+        self._calls: Counter = Counter()
+
+    def feed(self, event: dict) -> str | None:
+        """Apply one event; return why the call must stop, if a budget is exceeded."""
+        progress = self.progress
+        progress.session_id = event.get("session_id") or progress.session_id
+        kind = event.get("type")
+        if kind == "system" and event.get("subtype") == "init":
+            progress.model = event.get("model")
+        elif kind == "result":
+            progress.result = event
+            progress.turns = int(event.get("num_turns") or progress.turns)
+            progress.cost_usd = float(event.get("total_cost_usd") or progress.cost_usd)
+            if event.get("usage"):
+                progress.tokens_in = _input_tokens(event["usage"])
+                progress.tokens_out = event["usage"].get("output_tokens", 0)
+        elif kind == "assistant":
+            message = event.get("message") or {}
+            # A message is streamed once per content block, each repeating its usage.
+            if message.get("id") not in self._messages:
+                self._messages.add(message.get("id"))
+                usage = message.get("usage") or {}
+                progress.turns += 1
+                progress.cost_usd += _cost(usage, progress.model)
+                progress.tokens_in += _input_tokens(usage)
+                progress.tokens_out += usage.get("output_tokens", 0)
+            for block in message.get("content") or []:
+                if block.get("type") == "text" and block.get("text"):
+                    progress.last_text = block["text"]
+                elif block.get("type") == "tool_use":
+                    reason = self._tool(block.get("name") or "?", block.get("input") or {})
+                    if reason:
+                        return reason
+        return self._check()
+
+    def _tool(self, name: str, params: dict) -> str | None:
+        progress = self.progress
+        progress.tool_calls += 1
+        target = params.get("file_path") or params.get("notebook_path")
+        summary = target or params.get("command") or params.get("pattern") or ""
+        progress.last_tool = f"{name} {summary}".strip()
+        if name in EDIT_TOOLS and target and target not in progress.files:
+            progress.files.append(target)
+        key = (name, json.dumps(params, sort_keys=True))
+        if name in EDIT_TOOLS and key not in self._calls:
+            self._calls.clear()
+        self._calls[key] += 1
+        if self._calls[key] > self.budget.max_repeats:
+            return f"{name} called {self._calls[key]} times with the same input and no new edit"
+        return None
+
+    def _check(self) -> str | None:
+        progress, budget = self.progress, self.budget
+        if progress.result is not None:
+            return None
+        if progress.turns > budget.max_turns:
+            return f"turn budget of {budget.max_turns} exceeded"
+        if budget.max_cost is not None and progress.cost_usd > budget.max_cost:
+            return f"cost budget of ${budget.max_cost:g} exceeded (about ${progress.cost_usd:.2f})"
+        return None
+
+
+def build_command(
+    binary: str,
+    session_id: str | None = None,
+    max_turns: int = DEFAULT_MAX_TURNS,
+    model: str | None = None,
+    allowed_tools: str | None = None,
+    extra: list[str] | None = None,
+) -> list[str]:
+    """Argument list for one headless call; the prompt is sent on stdin."""
+    command = [binary, "-p", "--output-format", "stream-json", "--verbose", "--max-turns", str(max_turns)]
+    if session_id:
+        command += ["--resume", session_id]
+    if model:
+        command += ["--model", model]
+    if allowed_tools:
+        command += ["--allowedTools", allowed_tools]
+    return command + list(extra or [])
+
+
+def delegate(
+    task: str,
+    prompt: str,
+    workdir: str | Path,
+    store: StateStore,
+    new_session: bool = False,
+    budget: Budget | None = None,
+    binary: str = DEFAULT_BINARY,
+    on_event: Callable[[Progress, dict], None] | None = None,
+    **options,
+) -> Delegation:
+    """Send ``prompt`` to the task's session, starting one if it has none.
+
+    A session Claude Code no longer knows is dropped and the call repeated
+    in a new session. ``on_event`` is called with the progress after every
+    stream event; ``options`` go to :func:`build_command`.
+    """
+    budget = budget or Budget()
+    previous = None if new_session else store.session(task)
+    session_id = previous["session_id"] if previous else None
+    start = time.monotonic()
+    command = build_command(binary, session_id, budget.max_turns, **options)
+    monitor = StreamMonitor(budget)
+    exit_code, output, stopped = asyncio.run(_stream(command, prompt, workdir, monitor, on_event))
+    if session_id and monitor.progress.result is None and any(m in output for m in _MISSING_SESSION):
+        store.forget_session(task)
+        session_id = None
+        monitor = StreamMonitor(budget)
+        command = build_command(binary, None, budget.max_turns, **options)
+        exit_code, output, stopped = asyncio.run(_stream(command, prompt, workdir, monitor, on_event))
+
+    progress = monitor.progress
+    message = progress.result or {}
+    if stopped:
+        text = "\n\n".join(filter(None, [progress.last_text, f"Stopped early: {stopped}."]))
+    else:
+        text = str(message.get("result") or progress.last_text or output.strip())
+    delegation = Delegation(
+        task=task,
+        session_id=progress.session_id or session_id,
+        resumed=session_id is not None,
+        exit_code=exit_code,
+        is_error=bool(stopped) or exit_code != 0 or bool(message.get("is_error")),
+        subtype="stopped" if stopped else message.get("subtype"),
+        result=text,
+        turns=progress.turns,
+        cost_usd=round(progress.cost_usd, 6),
+        duration=round(time.monotonic() - start, 3),
+        tokens_in=progress.tokens_in,
+        tokens_out=progress.tokens_out,
+        tool_calls=progress.tool_calls,
+        files=progress.files,
+        stopped=stopped,
+    )
+    store.record_session(task, delegation.session_id, delegation.turns, delegation.cost_usd)
+    return delegation
+
+
+def format_progress(progress: Progress) -> str:
+    """One line of live progress, e.g. ``turn 4, 6 tool calls, 2 files, ~$0.08 | Edit app.py``."""
+    line = (
+        f"turn {progress.turns}, {progress.tool_calls} tool calls, "
+        f"{len(progress.files)} files, ~${progress.cost_usd:.2f}"
+    )
+    return f"{line} | {progress.last_tool[:80]}" if progress.last_tool else line
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Delegate to Claude Code in the task's own resumable session"
+    )
+    parser.add_argument(
+        "project_file",
+        nargs="?",
+        default="project.yaml",
+        help="Path to project.yaml (default: project.yaml)",
+    )
+    parser.add_argument("--task", required=True, metavar="NAME", help="Task the work belongs to")
+    parser.add_argument("-m", "--message", help="Prompt to send (default: read from stdin)")
+    parser.add_argument("--prompt-file", help="Read the prompt from this file")
+    parser.add_argument("--new", action="store_true", help="Start a new session for the task")
+    parser.add_argument(
+        "--max-turns",
+        type=int,
+        default=DEFAULT_MAX_TURNS,
+        help=f"Agentic turns allowed for this call (default: {DEFAULT_MAX_TURNS})",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help=f"Seconds before the call is stopped (default: {DEFAULT_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--max-cost",
+        type=float,
+        default=None,
+        help="Stop the call once its estimated cost exceeds this many USD",
+    )
+    parser.add_argument(
+        "--max-repeats",
+        type=int,
+        default=DEFAULT_MAX_REPEATS,
+        help=f"Stop after the same tool call repeats this often without a new edit (default: {DEFAULT_MAX_REPEATS})",
+    )
+    parser.add_argument("--quiet", action="store_true", help="Do not report tool calls while the call runs")
+    parser.add_argument("--model", help="Model for this call, e.g. opus or sonnet")
+    parser.add_argument("--allowed-tools", help="Passed to claude as --allowedTools")
+    parser.add_argument(
+        "--claude",
+        default=DEFAULT_BINARY,
+        help=f"Claude Code executable (default: {DEFAULT_BINARY})",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the outcome as JSON")
+    parser.add_argument(
+        "--claude-args",
+        default="",
+        help="Further claude arguments, as one shell-quoted string",
+    )
+    args = parser.parse_args()
+
+    try:
+        config = load_project(args.project_file)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+    if args.task not in {t.get("name") for t in config.get("tasks") or []}:
+        raise SystemExit(f"Error: no task named {args.task}")
+    if args.max_turns < 1:
+        raise SystemExit("Error: --max-turns must be at least 1")
+    if args.max_repeats < 1:
+        raise SystemExit("Error: --max-repeats must be at least 1")
+    if args.prompt_file:
+        prompt = Path(args.prompt_file).read_text()
+    elif args.message is not None:
+        prompt = args.message
+    else:
+        prompt = sys.stdin.read()
+    if not prompt.strip():
+        raise SystemExit("Error: empty prompt")
+
+    root = Path.cwd()
+    workdir = root / config.get("working_directory", "./workspace")
+    workdir.mkdir(parents=True, exist_ok=True)
+    store = StateStore.for_root(root)
+    try:
+        # One call per task at a time: two calls resuming one session would fork it.
+        with _task_lock(root, args.task), span(root, "delegate", args.task, model=args.model) as attrs:
+            snapshots.take(root, workdir, args.task, "delegate")
+            outcome = delegate(
+                args.task,
+                prompt,
+                workdir,
+                store,
+                new_session=args.new,
+                budget=Budget(args.max_turns, args.max_cost, args.timeout, args.max_repeats),
+                binary=args.claude,
+                on_event=None if args.quiet else _report,
+                model=args.model,
+                allowed_tools=args.allowed_tools,
+                extra=shlex.split(args.claude_args),
+            )
+            attrs.update(
+                session=outcome.session_id,
+                resumed=outcome.resumed,
+                outcome=outcome.subtype,
+                turns=outcome.turns,
+                tool_calls=outcome.tool_calls,
+                tokens_in=outcome.tokens_in,
+                tokens_out=outcome.tokens_out,
+                cost_usd=outcome.cost_usd,
+            )
+            snapshots.touch(root, workdir, args.task, outcome.files)
+        totals = store.session(args.task)
+    finally:
+        store.close()
+
+    if args.json:
+        print(json.dumps({**asdict(outcome), "task_totals": totals}, indent=1))
+    else:
+        print(outcome.result)
+        status = outcome.subtype or ("error" if outcome.is_error else "success")
+        session = (outcome.session_id or "none")[:8]
+        print(
+            f"\n[claude] {status}, session {session}{' (resumed)' if outcome.resumed else ''}: "
+            f"{outcome.turns} turns, {outcome.tool_calls} tool calls, ${outcome.cost_usd:.4f} in {outcome.duration}s; "
+            f"task total {totals['turns']} turns, ${totals['cost_usd']:.4f} over {totals['calls']} call(s)"
+        )
+        if outcome.files:
+            print(f"[claude] files changed: {', '.join(outcome.files)}")
+    sys.exit(1 if outcome.is_error else 0)
+
+
+async def _stream(
+    command: list[str],
+    prompt: str,
+    cwd: str | Path,
+    monitor: StreamMonitor,
+    on_event: Callable[[Progress, dict], None] | None = None,
+) -> tuple[int, str, str | None]:
+    """Run ``command`` and feed its stream to ``monitor`` as it arrives.
+
+    Returns:
+        The exit code, everything the call printed that was not a stream
+        event (stderr included), and why the call was stopped early, or
+        None. A stopped call's process group is killed.
+    """
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *command,
+            cwd=cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+            limit=LINE_LIMIT,
+        )
+    except OSError as e:
+        return 127, str(e), None
+    stderr = asyncio.create_task(proc.stderr.read())
+    try:
+        proc.stdin.write(prompt.encode())
+        await proc.stdin.drain()
+        proc.stdin.close()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+
+    timeout = monitor.budget.timeout
+    deadline = time.monotonic() + timeout if timeout else None
+    other, stopped = [], None
+    while stopped is None:
+        try:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            line = await asyncio.wait_for(proc.stdout.readline(), remaining)
+        except asyncio.TimeoutError:
+            stopped = f"wall time of {timeout:g}s exceeded"
+            break
+        except ValueError:
+            # A line beyond LINE_LIMIT; nothing after it can be parsed reliably.
+            stopped = "stream line too long"
+            break
+        if not line:
+            break
+        try:
+            event = json.loads(line)
+        except ValueError:
+            other.append(line.decode(errors="replace"))
+            continue
+        if not isinstance(event, dict):
+            continue
+        stopped = monitor.feed(event)
+        if on_event is not None:
+            on_event(monitor.progress, event)
+
+    if stopped:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    exit_code = await proc.wait()
+    other.append((await stderr).decode(errors="replace"))
+    return exit_code, "".join(other), stopped
+
+
+def _report(progress: Progress, event: dict) -> None:
+    if event.get("type") == "assistant" and any(
+        block.get("type") == "tool_use" for block in (event.get("message") or {}).get("content") or []
+    ):
+        print(f"[claude] {format_progress(progress)}", file=sys.stderr, flush=True)
+
+
+def _cost(usage: dict, model: str | None) -> float:
+    price_in, price_out = next(
+        (p for name, p in PRICES.items() if name in (model or "")), PRICES["sonnet"]
+    )
+    tokens_in = (
+        usage.get("input_tokens", 0)
+        + 1.25 * usage.get("cache_creation_input_tokens", 0)
+        + 0.1 * usage.get("cache_read_input_tokens", 0)
+    )
+    return (tokens_in * price_in + usage.get("output_tokens", 0) * price_out) / 1_000_000
+
+
+def _input_tokens(usage: dict) -> int:
+    return (
+        usage.get("input_tokens", 0)
+        + usage.get("cache_creation_input_tokens", 0)
+        + usage.get("cache_read_input_tokens", 0)
+    )
+
+
+@contextmanager
+def _task_lock(root: Path, task: str):
+    slug = re.sub(r"[^\w.-]+", "-", task).strip("-").lower() or "task"
+    path = root / STATE_DIR / "sessions" / f"{slug}.lock"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""Loading and validating project.yaml.
+
+:func:`load_project` checks the whole file against the schema in one pass
+and reports every problem with its line and column, e.g.
+``project.yaml:12:5: tasks[2].timeout: expected a positive number``, so
+a bad spec is rejected before the agent spends a turn on it. Parsing uses
+libyaml's CSafeLoader when PyYAML was built with it.
+
+A validated config is cached next to the file, in
+``.shepherd/config/``, in marshal form keyed by the file's mtime and size
+and, when those changed, its content hash. Loading an unchanged file is a
+``stat`` and an unmarshal; PyYAML is not even imported.
+"""
+
+import difflib
+import hashlib
+import marshal
+import os
+from datetime import date, datetime
+from pathlib import Path
+from typing import TypedDict
+
+from shepherd.cache import STATE_DIR
+
+# Bump when validation or normalisation changes, to drop cached configs.
+SCHEMA_VERSION = 2
+
+
+class StageSpec(TypedDict, total=False):
+    """One entry of a task's ``stages``; ``command`` is required."""
+
+    name: str
+    tier: str
+    command: str
+    timeout: float
+
+
+class TaskSpec(TypedDict, total=False):
+    """One entry of ``tasks``; ``name`` and ``description`` are required."""
+
+    name: str
+    description: str
+    test_command: str
+    depends_on: list[str]
+    scope: str
+    timeout: float
+    stages: list[StageSpec]
+    speculative: int
+
+
+class ProjectSpec(TypedDict, total=False):
+    """A project.yaml; ``name`` and ``description`` are required."""
+
+    name: str
+    description: str
+    working_directory: str
+    deadline: str
+    max_parallel: int
+    speculative: int
+    skills: list[str]
+    skill_token_budget: int
+    checkpoints: bool
+    tasks: list[TaskSpec]
+
+
+_PROJECT_KEYS = tuple(ProjectSpec.__annotations__)
+_TASK_KEYS = tuple(TaskSpec.__annotations__)
+_STAGE_KEYS = tuple(StageSpec.__annotations__)
+
+
+class ConfigError(ValueError):
+    """A project.yaml that cannot be used; ``errors`` lists every problem found."""
+
+    def __init__(self, path: str | Path, errors: list[str]):
+        self.path = str(path)
+        self.errors = errors
+        super().__init__("\n".join(errors))
+
+
+def load_project(path: str | Path) -> ProjectSpec:
+    """Load and validate the project file at ``path``, from cache when unchanged.
+
+    Raises:
+        ConfigError: If the file cannot be read or does not match the schema.
+    """
+    path = Path(path)
+    try:
+        stat = path.stat()
+    except OSError as e:
+        raise ConfigError(path, [f"{path}: {e.strerror or e}"])
+    cache = _cache_path(path)
+    entry = _read_cache(cache)
+    if entry and entry[1:3] == (stat.st_mtime_ns, stat.st_size):
+        return entry[4]
+
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    if entry and entry[3] == digest:
+        config = entry[4]
+    else:
+        config = parse(data.decode("utf-8", errors="replace"), path)
+    _write_cache(cache, (SCHEMA_VERSION, stat.st_mtime_ns, stat.st_size, digest, config))
+    return config
+
+
+def parse(text: str, path: str | Path = "project.yaml") -> ProjectSpec:
+    """Parse and validate project.yaml content; nothing is cached.
+
+    Raises:
+        ConfigError: With every schema violation, each prefixed by
+            ``path:line:column``.
+    """
+    import yaml
+
+    loader_class = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    loader = loader_class(text)
+    try:
+        node = loader.get_single_node()
+        config = loader.construct_document(node) if node is not None else None
+    except yaml.YAMLError as e:
+        mark = getattr(e, "problem_mark", None)
+        where = f"{path}:{mark.line + 1}:{mark.column + 1}" if mark else str(path)
+        raise ConfigError(path, [f"{where}: invalid YAML: {getattr(e, 'problem', None) or e}"])
+    finally:
+        loader.dispose()
+
+    checker = _Checker(path, node)
+    if not isinstance(config, dict):
+        checker.error((), "must be a mapping with at least 'name' and 'description'")
+        raise ConfigError(path, checker.errors)
+    config = checker.project(config)
+    if checker.errors:
+        raise ConfigError(path, checker.errors)
+    return config
+
+
+class _Checker:
+    """Validates a constructed config, locating errors through its YAML nodes."""
+
+    def __init__(self, path: str | Path, node):
+        self.path = path
+        self.errors: list[str] = []
+        self.nodes: dict[tuple, object] = {}
+        if node is not None:
+            self._index(node, ())
+
+    def _index(self, node, where: tuple) -> None:
+        self.nodes[where] = node
+        if node.id == "mapping":
+            for key, value in node.value:
+                if key.id == "scalar":
+                    self._index(value, where + (key.value,))
+        elif node.id == "sequence":
+            for i, item in enumerate(node.value):
+                self._index(item, where + (i,))
+
+    def error(self, where: tuple, message: str) -> None:
+        # A missing key has no node; point at the closest enclosing one.
+        for i in range(len(where), -1, -1):
+            node = self.nodes.get(where[:i])
+            if node is not None:
+                mark = node.start_mark
+                location = f"{self.path}:{mark.line + 1}:{mark.column + 1}"
+                break
+        else:
+            location = str(self.path)
+        label = "".join(f"[{p}]" if isinstance(p, int) else f".{p}" for p in where).lstrip(".")
+        self.errors.append(f"{location}: {label + ': ' if label else ''}{message}")
+
+    def project(self, config: dict) -> ProjectSpec:
+        self.keys(config, (), _PROJECT_KEYS)
+        for key in ("name", "description"):
+            self.string(config, key, (), required=True)
+        self.string(config, "working_directory", ())
+        if config.get("deadline") is not None:
+            value = config["deadline"]
+            if isinstance(value, datetime):
+                value = value.date()
+            if isinstance(value, date):
+                config["deadline"] = value.isoformat()
+            elif not isinstance(value, str) or not _is_date(value):
+                self.error(("deadline",), f"expected a date as YYYY-MM-DD, got {value!r}")
+        self.integer(config, "max_parallel", (), minimum=1)
+        self.integer(config, "skill_token_budget", (), minimum=1)
+        self.speculative(config, ())
+        if config.get("checkpoints") is not None and not isinstance(config["checkpoints"], bool):
+            self.error(("checkpoints",), f"expected true or false, got {config['checkpoints']!r}")
+        if config.get("skills") is not None:
+            self.string_list(config, "skills", ())
+
+        tasks = config.get("tasks")
+        if tasks is None:
+            return config
+        if not isinstance(tasks, list):
+            self.error(("tasks",), "expected a list of tasks")
+            return config
+        names = {}
+        for i, task in enumerate(tasks):
+            where = ("tasks", i)
+            if not isinstance(task, dict):
+                self.error(where, "expected a mapping with 'name' and 'description'")
+                continue
+            self.task(task, where)
+            name = task.get("name")
+            if isinstance(name, str) and name:
+                if name in names:
+                    self.error(where + ("name",), f"duplicate task name '{name}' (first at tasks[{names[name]}])")
+                names.setdefault(name, i)
+        for i, task in enumerate(tasks):
+            if isinstance(task, dict) and isinstance(task.get("depends_on"), list):
+                for j, dep in enumerate(task["depends_on"]):
+                    if isinstance(dep, str) and dep not in names:
+                        hint = _did_you_mean(dep, names)
+                        self.error(("tasks", i, "depends_on", j), f"unknown task '{dep}'{hint}")
+        if not self.errors:
+            from shepherd import scheduler, templates
+
+            try:
+                scheduler.validate(config)
+            except ValueError as e:
+                self.error(("tasks",), str(e))
+            try:
+                templates.validate(config)
+            except ValueError as e:
+                self.error(("skills",), str(e))
+        return config
+
+    def task(self, task: dict, where: tuple) -> None:
+        self.keys(task, where, _TASK_KEYS)
+        self.string(task, "name", where, required=True)
+        self.string(task, "description", where, required=True)
+        self.string(task, "test_command", where)
+        self.number(task, "timeout", where)
+        self.speculative(task, where)
+        deps = task.get("depends_on")
+        if isinstance(deps, str):
+            task["depends_on"] = [deps]
+        elif deps is not None:
+            self.string_list(task, "depends_on", where)
+        if task.get("scope") is not None:
+            from shepherd.verify import SCOPE_TIMEOUTS
+
+            if task["scope"] not in SCOPE_TIMEOUTS:
+                self.error(where + ("scope",), f"expected one of {', '.join(SCOPE_TIMEOUTS)}, got {task['scope']!r}")
+        stages = task.get("stages")
+        if stages is None:
+            return
+        if not isinstance(stages, list):
+            self.error(where + ("stages",), "expected a list of stages")
+            return
+        from shepherd.pipeline import TIERS
+
+        for i, stage in enumerate(stages):
+            at = where + ("stages", i)
+            if not isinstance(stage, dict):
+                self.error(at, "expected a mapping with a 'command'")
+                continue
+            self.keys(stage, at, _STAGE_KEYS)
+            self.string(stage, "command", at, required=True)
+            self.string(stage, "name", at)
+            self.number(stage, "timeout", at)
+            if stage.get("tier") is not None and stage["tier"] not in TIERS:
+                self.error(at + ("tier",), f"expected one of {', '.join(TIERS)}, got {stage['tier']!r}")
+
+    def keys(self, mapping: dict, where: tuple, known: tuple) -> None:
+        # Only likely typos are errors; other extra keys are left for the agent to read.
+        for key in mapping:
+            if key not in known and isinstance(key, str):
+                hint = _did_you_mean(key, known)
+                if hint:
+                    self.error(where + (key,), f"unknown field{hint}")
+
+    def string(self, mapping: dict, key: str, where: tuple, required: bool = False) -> None:
+        value = mapping.get(key)
+        if value is None or value == "":
+            if required:
+                self.error(where + (key,), "required")
+            return
+        if isinstance(value, str):
+            return
+        node = self.nodes.get(where + (key,))
+        if node is not None and node.id == "scalar":
+            # YAML read an unquoted 2024 or 1.0 as a number; keep the text as written.
+            mapping[key] = node.value
+        else:
+            self.error(where + (key,), f"expected a string, got {type(value).__name__}")
+
+    def string_list(self, mapping: dict, key: str, where: tuple) -> None:
+        value = mapping[key]
+        if not isinstance(value, list) or not all(isinstance(v, str) and v for v in value):
+            self.error(where + (key,), "expected a list of names")
+
+    def integer(self, mapping: dict, key: str, where: tuple, minimum: int) -> None:
+        value = mapping.get(key)
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < minimum):
+            self.error(where + (key,), f"expected an integer of at least {minimum}, got {value!r}")
+
+    def number(self, mapping: dict, key: str, where: tuple) -> None:
+        value = mapping.get(key)
+        if value is not None and (not isinstance(value, (int, float)) or isinstance(value, bool) or value <= 0):
+            self.error(where + (key,), f"expected a positive number of seconds, got {value!r}")
+
+    def speculative(self, mapping: dict, where: tuple) -> None:
+        value = mapping.get("speculative")
+        if value is None or value is False or value == 0:
+            return
+        if not isinstance(value, int) or isinstance(value, bool) or value < 2:
+            self.error(where + ("speculative",), f"expected an integer of at least 2 (or 0 for off), got {value!r}")
+
+
+def _did_you_mean(name: str, choices) -> str:
+    match = difflib.get_close_matches(name, list(choices), n=1, cutoff=0.75)
+    return f" (did you mean '{match[0]}'?)" if match else ""
+
+
+def _is_date(value: str) -> bool:
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _cache_path(path: Path) -> Path:
+    resolved = path.resolve()
+    key = hashlib.sha256(str(resolved).encode()).hexdigest()[:16]
+    return resolved.parent / STATE_DIR / "config" / f"{resolved.stem}-{key}.bin"
+
+
+def _read_cache(cache: Path) -> tuple | None:
+    try:
+        entry = marshal.loads(cache.read_bytes())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(entry, tuple) or len(entry) != 5 or entry[0] != SCHEMA_VERSION:
+        return None
+    return entry
+
+
+def _write_cache(cache: Path, entry: tuple) -> None:
+    try:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(marshal.dumps(entry))
+        os.replace(tmp, cache)
+    except (OSError, ValueError):
+        # Unwritable directory, or a value marshal cannot hold: just skip the cache.
+        pass
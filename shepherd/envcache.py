@@ -0,0 +1,445 @@
+"""Content-addressed cache of installed environments, shared by every workspace.
+
+Creating a venv and installing requirements.txt, or running ``npm ci``, is
+slow and is repeated for every task, retry, project and batch run that
+uses the same dependencies. ``shepherd env`` builds each environment once,
+keyed by a hash of the lockfile and the interpreter or node version, in a
+per-user cache (``$SHEPHERD_ENV_CACHE``, else ``~/.cache/shepherd/envs``),
+and links it into the working directory as ``.venv`` or ``node_modules``:
+hardlinks where possible, reflinks or copies across filesystems. Linking
+a cached environment takes a fraction of a second and needs no network.
+Files that requirements pull in with ``-r`` or ``-c`` are part of the key.
+
+Cached files are made read-only, so a workspace cannot edit the shared
+copy in place; installing or removing packages in a workspace replaces
+files and leaves the cache alone. Root ignores those permissions, so when
+running as root files are reflinked or copied instead of hardlinked. Every online build also fills a local
+wheelhouse, so with ``--offline`` new requirement sets build from wheels
+already downloaded.
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import platform
+import re
+import shutil
+import stat
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from shepherd.config import load_project
+
+# Linux ioctl that clones a file's extents on copy-on-write filesystems.
+FICLONE = 0x40049409
+
+# Name of the file that records which cached environment a workspace uses.
+MARKER = ".shepherd-env"
+
+PYTHON_LOCKS = ("requirements*.txt",)
+NODE_LOCKS = ("package-lock.json", "npm-shrinkwrap.json")
+
+BUILD_TIMEOUT = 1800
+
+# A requirements line that pulls in another file: -r/--requirement or -c/--constraint.
+_INCLUDE = re.compile(r"^(?:-r|-c|--requirement|--constraint)\s*=?\s*(\S+)")
+
+
+@dataclass
+class EnvResult:
+    """What :func:`ensure` did for one environment of a working directory."""
+
+    kind: str
+    target: str
+    key: str
+    status: str  # "linked", "built", "current", "kept" or "skipped"
+    seconds: float = 0.0
+    note: str | None = None
+
+
+def cache_root() -> Path:
+    if os.environ.get("SHEPHERD_ENV_CACHE"):
+        return Path(os.environ["SHEPHERD_ENV_CACHE"])
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "shepherd" / "envs"
+
+
+def detect(workdir: str | Path, python: str = sys.executable) -> list[dict]:
+    """Environments the working directory's lockfiles call for.
+
+    Returns:
+        One ``{"kind", "target", "key", "files"}`` per environment; ``key``
+        hashes the lockfiles and the toolchain that would install them.
+        Python environments also list, under ``includes``, the files the
+        requirements pull in with ``-r``/``-c``, relative to ``workdir``.
+
+    Raises:
+        ValueError: If ``python`` cannot be run to tag the environment.
+    """
+    workdir = Path(workdir)
+    found = []
+    requirements = sorted(p for pattern in PYTHON_LOCKS for p in workdir.glob(pattern) if p.is_file())
+    if requirements:
+        includes = _includes(workdir, requirements)
+        found.append(
+            {
+                "kind": "python",
+                "target": ".venv",
+                "key": _key("python", workdir, requirements + includes, _python_tag(python)),
+                "files": [p.name for p in requirements],
+                "includes": [os.path.relpath(p, workdir) for p in includes],
+            }
+        )
+    lock = next((workdir / name for name in NODE_LOCKS if (workdir / name).is_file()), None)
+    if lock is not None and (workdir / "package.json").is_file():
+        files = [workdir / "package.json", lock]
+        found.append(
+            {
+                "kind": "node",
+                "target": "node_modules",
+                "key": _key("node", workdir, files, _node_tag()),
+                "files": [p.name for p in files],
+            }
+        )
+    return found
+
+
+def ensure(
+    workdir: str | Path,
+    offline: bool = False,
+    force: bool = False,
+    python: str = sys.executable,
+) -> list[EnvResult]:
+    """Link the cached environments for ``workdir``, building any that are missing.
+
+    An existing ``.venv`` or ``node_modules`` that shepherd did not link is
+    kept unless ``force`` is set.
+
+    Raises:
+        ValueError: If a build fails or ``python`` cannot be run.
+    """
+    workdir = Path(workdir)
+    results = []
+    for env in detect(workdir, python):
+        start = time.monotonic()
+        target = workdir / env["target"]
+        result = EnvResult(env["kind"], str(target), env["key"], "linked")
+        if _marker(target) == env["key"]:
+            result.status = "current"
+        elif target.exists() and _marker(target) is None and not force:
+            result.status = "kept"
+            result.note = f"{env['target']} was not created by shepherd; use --force to replace it"
+        elif any(name.startswith("..") for name in env.get("includes", [])):
+            result.status = "skipped"
+            result.note = "requirements include files outside the working directory, which cannot be shared"
+        elif missing := [name for name in env.get("includes", []) if not (workdir / name).is_file()]:
+            result.status = "skipped"
+            result.note = f"requirements include {', '.join(missing)}, which cannot be found"
+        elif env["kind"] == "python" and _editable(workdir, env["files"] + env["includes"]):
+            result.status = "skipped"
+            result.note = "requirements install local paths (-e or ./...), which cannot be shared"
+        else:
+            entry = cache_root() / env["key"]
+            if not (entry / "complete.json").exists():
+                _build(env, workdir, entry, offline, python)
+                result.status = "built"
+            _touch(entry)
+            if target.is_symlink() or target.is_file():
+                target.unlink()
+            elif target.exists():
+                shutil.rmtree(target)
+            # Root can write to read-only files, so a hardlink would let it edit the cache.
+            _link_tree(entry / "env", target, str(entry / "env"), hardlink=os.geteuid() != 0)
+            (target / MARKER).write_text(env["key"])
+        result.seconds = round(time.monotonic() - start, 3)
+        results.append(result)
+    return results
+
+
+def entries() -> list[dict]:
+    """Every cached environment, most recently used first."""
+    out = []
+    root = cache_root()
+    if not root.is_dir():
+        return out
+    for path in root.iterdir():
+        info = path / "complete.json"
+        if info.exists():
+            out.append({**json.loads(info.read_text()), "key": path.name, "used": info.stat().st_mtime})
+    return sorted(out, key=lambda e: -e["used"])
+
+
+def prune(days: float) -> list[str]:
+    """Remove cached environments unused for ``days``; return their keys.
+
+    Workspaces that hardlinked one keep their files.
+    """
+    cutoff = time.time() - days * 86400
+    removed = []
+    for entry in entries():
+        if entry["used"] < cutoff:
+            path = cache_root() / entry["key"]
+            _make_writable(path)
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(entry["key"])
+    return removed
+
+
+def clone_file(src: str, dst: str) -> None:
+    """Copy a file as a reflink where the filesystem supports it, else normally."""
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        shutil.copystat(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Link cached dependency environments into the working directory"
+    )
+    parser.add_argument(
+        "project_file",
+        nargs="?",
+        default="project.yaml",
+        help="Path to project.yaml (default: project.yaml)",
+    )
+    parser.add_argument("--offline", action="store_true", help="Build only from the local wheelhouse and npm cache")
+    parser.add_argument("--force", action="store_true", help="Replace environments shepherd did not create")
+    parser.add_argument("--python", default=sys.executable, help="Interpreter for Python environments")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--list", action="store_true", help="List the cached environments")
+    action.add_argument("--prune", type=float, metavar="DAYS", help="Remove environments unused for DAYS")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+
+    if args.list:
+        listed = entries()
+        if args.json:
+            print(json.dumps(listed, indent=1))
+        for entry in [] if args.json else listed:
+            used = time.strftime("%Y-%m-%d", time.localtime(entry["used"]))
+            print(f"{entry['key']}  {entry['kind']:<6}  used {used}  {', '.join(entry['files'])}")
+        return
+    if args.prune is not None:
+        removed = prune(args.prune)
+        print(f"removed {len(removed)} environment(s) from {cache_root()}")
+        return
+
+    try:
+        config = load_project(args.project_file)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+    workdir = Path.cwd() / config.get("working_directory", "./workspace")
+    if not workdir.is_dir():
+        raise SystemExit(f"Error: working directory {workdir} does not exist")
+    try:
+        results = ensure(workdir, offline=args.offline, force=args.force, python=args.python)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=1))
+        return
+    if not results:
+        print("No requirements*.txt or package-lock.json in the working directory; nothing to link.")
+    for r in results:
+        print(f"{r.status:<8} {r.kind:<6} {r.target}  [{r.seconds}s] {r.key[:12]}")
+        if r.note:
+            print(f"         {r.note}")
+
+
+def _key(kind: str, workdir: Path, files: list[Path], toolchain: str) -> str:
+    digest = hashlib.sha256(f"{kind}\0{toolchain}\0".encode())
+    for path in files:
+        data = path.read_bytes() if path.is_file() else b"missing"
+        digest.update(os.path.relpath(path, workdir).encode() + b"\0" + data + b"\0")
+    return f"{kind}-{digest.hexdigest()[:32]}"
+
+
+def _includes(workdir: Path, requirements: list[Path]) -> list[Path]:
+    """Files ``requirements`` pull in with ``-r``/``-c``, transitively, excluding ``requirements`` themselves."""
+    seen = {p.resolve() for p in requirements}
+    found = []
+    pending = list(requirements)
+    while pending:
+        path = pending.pop(0)
+        if not path.is_file():
+            continue
+        for line in path.read_text(errors="replace").splitlines():
+            match = _INCLUDE.match(line.split(" #", 1)[0].strip())
+            if match is None or "://" in match.group(1):
+                continue
+            included = Path(os.path.normpath(path.parent / match.group(1)))
+            if included.resolve() not in seen:
+                seen.add(included.resolve())
+                found.append(included)
+                pending.append(included)
+    return found
+
+
+def _python_tag(python: str) -> str:
+    if os.path.realpath(python) == os.path.realpath(sys.executable):
+        return f"{platform.python_implementation()}-{platform.python_version()}-{sys.platform}-{platform.machine()}"
+    try:
+        result = subprocess.run(
+            [python, "-c", "import platform, sys; print(platform.python_implementation(), platform.python_version(), "
+             "sys.platform, platform.machine(), sep='-')"],
+            capture_output=True,
+            text=True,
+        )
+    except OSError as e:
+        raise ValueError(f"cannot run Python interpreter {python}: {e.strerror or e}")
+    if result.returncode != 0 or not result.stdout.strip():
+        raise ValueError(f"Python interpreter {python} failed to report its version: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+
+def _node_tag() -> str:
+    try:
+        result = subprocess.run(["node", "--version"], capture_output=True, text=True)
+    except OSError:
+        return "node-missing"
+    return f"node-{result.stdout.strip()}-{sys.platform}-{platform.machine()}"
+
+
+def _editable(workdir: Path, files: list[str]) -> bool:
+    for name in files:
+        if not (workdir / name).is_file():
+            continue
+        for line in (workdir / name).read_text(errors="replace").splitlines():
+            line = line.strip()
+            if line.startswith(("-e", "--editable", ".", "/", "file:")):
+                return True
+    return False
+
+
+def _build(env: dict, workdir: Path, entry: Path, offline: bool, python: str) -> None:
+    """Build ``env`` into ``entry/env`` under a lock; concurrent builders wait, then reuse it."""
+    root = entry.parent
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / f"{entry.name}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if (entry / "complete.json").exists():
+            return
+        if entry.exists():
+            _make_writable(entry)
+            shutil.rmtree(entry)
+        entry.mkdir()
+        for name in env["files"] + env.get("includes", []):
+            if (workdir / name).is_file():
+                (entry / name).parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(workdir / name, entry / name)
+        try:
+            if env["kind"] == "python":
+                _build_python(entry, env["files"], offline, python)
+            else:
+                _build_node(entry, offline)
+        except (OSError, subprocess.SubprocessError, ValueError) as e:
+            _make_writable(entry)
+            shutil.rmtree(entry, ignore_errors=True)
+            raise ValueError(f"building the {env['kind']} environment failed: {e}")
+        _make_readonly(entry / "env")
+        info = {"kind": env["kind"], "files": env["files"], "created": time.time()}
+        (entry / "complete.json").write_text(json.dumps(info))
+
+
+def _build_python(entry: Path, files: list[str], offline: bool, python: str) -> None:
+    wheels = cache_root() / "wheels"
+    wheels.mkdir(parents=True, exist_ok=True)
+    requirements = [arg for name in files for arg in ("-r", str(entry / name))]
+    _check([python, "-m", "venv", str(entry / "env")])
+    pip = [str(entry / "env" / "bin" / "python"), "-m", "pip", "--disable-pip-version-check", "-q"]
+    if not offline:
+        # Fill the wheelhouse first, so later offline builds find these packages.
+        _check([*pip, "wheel", "--find-links", str(wheels), "-w", str(wheels), *requirements])
+    _check([*pip, "install", "--no-index", "--find-links", str(wheels), *requirements])
+
+
+def _build_node(entry: Path, offline: bool) -> None:
+    _check(["npm", "ci", "--no-audit", "--no-fund", *(["--offline"] if offline else [])], cwd=entry)
+    # npm creates no node_modules for a project without dependencies.
+    (entry / "node_modules").mkdir(exist_ok=True)
+    (entry / "node_modules").rename(entry / "env")
+
+
+def _check(command: list[str], cwd: Path | None = None) -> None:
+    result = subprocess.run(command, cwd=cwd, capture_output=True, text=True, timeout=BUILD_TIMEOUT)
+    if result.returncode != 0:
+        tail = "\n".join((result.stderr or result.stdout).strip().splitlines()[-5:])
+        raise ValueError(f"{' '.join(command[:4])} ... exited {result.returncode}\n{tail}")
+
+
+def _link_tree(source: Path, target: Path, built_at: str, hardlink: bool = True) -> None:
+    """Recreate ``source`` at ``target``, linking files instead of copying them.
+
+    A venv's scripts and pyvenv.cfg name the directory it was built in; files
+    under bin/ or at the top that do are copied with the path rewritten.
+    Without ``hardlink``, files are reflinked or copied so none shares an inode
+    with ``source``.
+    """
+    old, new = built_at.encode(), str(target).encode()
+    for dirpath, dirnames, filenames in os.walk(source):
+        rel = Path(dirpath).relative_to(source)
+        (target / rel).mkdir(parents=True, exist_ok=True)
+        for name in dirnames + filenames:
+            src, dst = Path(dirpath) / name, target / rel / name
+            if src.is_symlink():
+                link = os.readlink(src)
+                dst.symlink_to(link.replace(built_at, str(target)) if link.startswith(built_at) else link)
+            elif name in filenames:
+                if rel.parts[:1] in ((), ("bin",), ("Scripts",)):
+                    data = src.read_bytes()
+                    if old in data:
+                        dst.write_bytes(data.replace(old, new))
+                        shutil.copymode(src, dst)
+                        dst.chmod(dst.stat().st_mode | stat.S_IWUSR)
+                        continue
+                try:
+                    if not hardlink:
+                        raise OSError
+                    os.link(src, dst)
+                except OSError:
+                    clone_file(str(src), str(dst))
+        # Symlinked directories were recreated above; do not descend into them.
+        dirnames[:] = [d for d in dirnames if not (Path(dirpath) / d).is_symlink()]
+
+
+def _marker(target: Path) -> str | None:
+    try:
+        return (target / MARKER).read_text().strip()
+    except OSError:
+        return None
+
+
+def _touch(entry: Path) -> None:
+    try:
+        os.utime(entry / "complete.json")
+    except OSError:
+        pass
+
+
+def _make_readonly(path: Path) -> None:
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            file = Path(dirpath) / name
+            if not file.is_symlink():
+                file.chmod(file.stat().st_mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+def _make_writable(path: Path) -> None:
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            file = Path(dirpath) / name
+            if not file.is_symlink():
+                file.chmod(file.stat().st_mode | stat.S_IWUSR)
+
+
+if __name__ == "__main__":
+    main()
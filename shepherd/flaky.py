@@ -0,0 +1,201 @@
+"""Flaky-test detection with concurrent isolated re-runs and a persistent ledger.
+
+When a pytest task fails, each failing test is re-run on its own several
+times in parallel, in separate processes with no shared pytest cache or
+temp dir. Outcomes accumulate in ``.shepherd/flaky.db``. A test that has
+both passed and failed at least twice without code changes is flaky and
+quarantined, so on later runs its failures no longer fail the task or
+trigger a developer retry. The run that first sees a test pass on a
+re-run still fails, listing it under ``flaky_suspects``. Quarantined tests
+are re-run too, and released when every re-run fails again;
+``shepherd flaky --release`` lifts a quarantine by hand.
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+
+from shepherd.cache import STATE_DIR
+from shepherd.output import OutputCapture
+from shepherd.testmap import is_pytest, plugin_env
+from shepherd.verify import Verdict, run_command
+
+DEFAULT_RERUNS = 3
+
+# Passes and failures a test needs in its history before it is quarantined.
+FLAKY_PASSES = 2
+FLAKY_FAILURES = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tests (
+    test_id TEXT PRIMARY KEY,
+    passes INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    quarantined INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL
+);
+"""
+
+
+class FlakeLedger:
+    """Per-test pass/fail history and quarantine flags, stored in SQLite."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    @classmethod
+    def for_root(cls, root: str | Path) -> "FlakeLedger":
+        return cls(Path(root) / STATE_DIR / "flaky.db")
+
+    def record(self, test_id: str, outcomes: list[bool]) -> bool:
+        """Record re-run outcomes of a test that just failed; return True if it is quarantined.
+
+        The failure that triggered the re-runs counts too. A test is
+        quarantined once it has FLAKY_PASSES passes and FLAKY_FAILURES
+        failures on record, and released when all its re-runs fail: then it
+        is broken, not flaky.
+        """
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT passes, failures, quarantined FROM tests WHERE test_id = ?", (test_id,)
+            ).fetchone()
+            passes = (row[0] if row else 0) + sum(outcomes)
+            failures = (row[1] if row else 0) + 1 + outcomes.count(False)
+            if outcomes and not any(outcomes):
+                quarantined = False
+            else:
+                quarantined = bool(row and row[2]) or (passes >= FLAKY_PASSES and failures >= FLAKY_FAILURES)
+            self._db.execute(
+                "INSERT OR REPLACE INTO tests (test_id, passes, failures, quarantined, updated) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (test_id, passes, failures, int(quarantined), time.time()),
+            )
+        return quarantined
+
+    def quarantined(self) -> set[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT test_id FROM tests WHERE quarantined = 1").fetchall()
+        return {row[0] for row in rows}
+
+    def release(self, test_id: str) -> None:
+        """Lift the quarantine of a test and forget its history, e.g. after its flakiness was fixed."""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE tests SET quarantined = 0, passes = 0, failures = 0 WHERE test_id = ?", (test_id,)
+            )
+
+    def entries(self) -> list[dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT test_id, passes, failures, quarantined FROM tests ORDER BY test_id"
+            ).fetchall()
+        return [
+            {"test_id": t, "passes": p, "failures": f, "quarantined": bool(q)} for t, p, f, q in rows
+        ]
+
+
+def rerun(
+    test_ids: list[str],
+    command: str,
+    root: str | Path,
+    working_dir: str | Path,
+    count: int = DEFAULT_RERUNS,
+    timeout: float | None = None,
+    jobs: int | None = None,
+) -> dict[str, list[bool]]:
+    """Run each test ``count`` times, ``jobs`` at a time (default: CPU count), each in its own process.
+
+    The task's own pytest command is reused with every test but one
+    deselected, so fixtures, rootdir and options match the original run.
+    """
+    workdir = Path(root) / working_dir
+
+    def once(test_id: str) -> bool:
+        with tempfile.TemporaryDirectory(prefix="shepherd-flaky-") as tmp:
+            select_file = Path(tmp) / "select.txt"
+            select_file.write_text(test_id)
+            env = plugin_env(
+                workdir,
+                select_file=select_file,
+                pytest_args=f"-p no:cacheprovider --basetemp={tmp}/basetemp",
+            )
+            exit_code, _ = run_command(command, root, timeout, {**os.environ, **env}, OutputCapture("pytest"))
+        return exit_code == 0
+
+    runs = [test_id for test_id in test_ids for _ in range(count)]
+    with ThreadPoolExecutor(max_workers=min(jobs or os.cpu_count() or 1, len(runs)) or 1) as pool:
+        results = list(pool.map(once, runs))
+    return {test_id: results[i * count : (i + 1) * count] for i, test_id in enumerate(test_ids)}
+
+
+def check(
+    verdict: Verdict,
+    root: str | Path,
+    working_dir: str | Path,
+    ledger: FlakeLedger,
+    count: int = DEFAULT_RERUNS,
+    timeout: float | None = None,
+    jobs: int | None = None,
+) -> Verdict:
+    """Separate flaky from real failures in a failed pytest verdict.
+
+    Every failing test is re-run and its outcomes recorded (see
+    :meth:`FlakeLedger.record`). Failures of tests that were already
+    quarantined and still are are ignored; a test that passed on a re-run
+    but was not quarantined before keeps failing this run and is listed in
+    ``flaky_suspects``. If no real failure is left, the returned verdict is
+    a pass that lists the ignored tests in ``quarantined``. With
+    ``count=0`` nothing is re-run and known quarantined tests are ignored.
+    Re-runs go ``jobs`` at a time, as in :func:`rerun`.
+    """
+    if verdict.passed or not is_pytest(verdict.command):
+        return verdict
+    tests = [f["test"] for f in verdict.failures if f.get("test")]
+    # A failure with no test ID (collection error, crash) is never flaky.
+    if not tests or len(tests) < len(verdict.failures):
+        return verdict
+
+    known = ledger.quarantined()
+    if count <= 0:
+        flaky, suspects = [t for t in tests if t in known], []
+    else:
+        flaky, suspects = [], []
+        for test_id, outcomes in rerun(tests, verdict.command, root, working_dir, count, timeout, jobs).items():
+            if ledger.record(test_id, outcomes) and test_id in known:
+                flaky.append(test_id)
+            elif any(outcomes):
+                suspects.append(test_id)
+    if len(flaky) < len(tests):
+        return replace(verdict, quarantined=flaky, flaky_suspects=suspects)
+    return replace(verdict, passed=True, quarantined=flaky)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show or edit the flaky-test ledger")
+    parser.add_argument("--release", metavar="TEST_ID", action="append", help="Lift a test's quarantine")
+    parser.add_argument("--release-all", action="store_true", help="Lift every quarantine")
+    args = parser.parse_args()
+
+    ledger = FlakeLedger.for_root(Path.cwd())
+    released = sorted(ledger.quarantined()) if args.release_all else args.release or []
+    for test_id in released:
+        ledger.release(test_id)
+        print(f"released: {test_id}")
+    if not args.release and not args.release_all:
+        for entry in ledger.entries():
+            status = "QUARANTINED" if entry["quarantined"] else "suspect" if entry["passes"] else "ok"
+            print(f"{status:<12} {entry['passes']:>3} pass {entry['failures']:>3} fail  {entry['test_id']}")
+
+
+if __name__ == "__main__":
+    main()
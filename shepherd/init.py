@@ -1,85 +1,246 @@
 """Scaffold .deepagents/ directory from project.yaml for use with the DeepAgents CLI."""
 
 import argparse
+import hashlib
+import json
 import os
+from dataclasses import dataclass, field
 from pathlib import Path
 
-import yaml
-
-from shepherd.templates import (
-    CLAUDE_CODE_SKILL_MD,
-    CODE_REVIEW_SKILL_MD,
-    DEBUGGING_SKILL_MD,
-    DEPENDENCY_MANAGEMENT_SKILL_MD,
-    DEVELOPER_AGENTS_MD,
-    ENVIRONMENT_SETUP_SKILL_MD,
-    ERROR_ANALYSIS_SKILL_MD,
-    GIT_WORKFLOW_SKILL_MD,
-    PM_AGENTS_MD,
-    PROGRESS_REPORTING_SKILL_MD,
-    TASK_DECOMPOSITION_SKILL_MD,
-    TEST_RUNNER_SKILL_MD,
-)
-
-
-def init(project_file: str = "project.yaml") -> None:
-    """Scaffold .deepagents/ directory from a project.yaml file.
+from shepherd import scheduler, templates
+from shepherd.cache import STATE_DIR
+from shepherd.config import load_project
+from shepherd.merge import merge3
 
-    Creates the directory structure and configuration files needed to run
-    the ShepherdAI PM agent via ``deepagents --agent shepherd``.
 
-    Args:
-        project_file: Path to the project YAML file.
+@dataclass
+class ScaffoldResult:
+    """What :func:`scaffold` did; paths are relative to the project root."""
+
+    created: list[Path] = field(default_factory=list)
+    updated: list[Path] = field(default_factory=list)
+    # Edited files that took a template change, and those that conflicted with one.
+    merged: list[Path] = field(default_factory=list)
+    conflicts: list[Path] = field(default_factory=list)
+    skipped: list[Path] = field(default_factory=list)
+    removed: list[Path] = field(default_factory=list)
+    # Skill name -> (variant, estimated tokens) for every generated skill.
+    skills: dict[str, tuple[str, int]] = field(default_factory=dict)
+
+    @property
+    def skill_tokens(self) -> int:
+        return sum(tokens for _, tokens in self.skills.values())
+
+
+def load(project_file: str | Path) -> tuple[dict, dict[str, list[str]]]:
+    """Read and validate a project.yaml file (see :mod:`shepherd.config`).
+
+    Returns:
+        The parsed config and its task dependency graph.
+
+    Raises:
+        SystemExit: If the file is not a valid project definition.
     """
-    # Validate project.yaml
-    with open(project_file) as f:
-        config = yaml.safe_load(f)
+    try:
+        config = load_project(project_file)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+    return config, scheduler.validate(config)
 
-    if not isinstance(config, dict) or "name" not in config:
-        raise SystemExit(f"Error: {project_file} must contain at least a 'name' field.")
 
-    project_root = Path.cwd()
-    deepagents_dir = project_root / ".deepagents"
+def scaffold(config: dict, root: str | Path) -> ScaffoldResult:
+    """Render the templates for ``config`` into .deepagents/ under ``root``.
+
+    Missing files are created. For every file it writes, scaffold records
+    in ``.shepherd/scaffold.json`` the hash of what it wrote and a key
+    covering the config, the template's content hash and the variant, and
+    keeps a copy of the rendered text under ``.shepherd/scaffold/``. On a
+    re-run, only files whose key changed are looked at:
+
+    - unedited files are re-rendered;
+    - edited files get a three-way merge of the previous render, the
+      edited file and the new render; on a conflict the file is left
+      alone and the merge, with conflict markers, is written next to it
+      as ``<name>.merge``;
+    - files with no record, written by a release before these records,
+      count as unedited if they match what an earlier release wrote (see
+      :func:`templates.earlier_render`) and are merged against the latest
+      such render otherwise;
+    - other files scaffold did not write are never touched.
 
-    # Create directory structure
+    Only the skills selected by ``skills`` are written, in the variants
+    that fit ``skill_token_budget`` (see :func:`templates.skill_variants`).
+    A previously generated skill that is no longer selected is removed,
+    unless it has been edited.
+    """
+    project_root = Path(root)
+    deepagents_dir = project_root / ".deepagents"
+    base_dir = project_root / STATE_DIR / "scaffold"
+    record_path = project_root / STATE_DIR / "scaffold.json"
+    record = json.loads(record_path.read_text()) if record_path.exists() else {}
+    # Records from before per-file keys hold just the hash; such files count as stale.
     files = {
-        deepagents_dir / "AGENTS.md": PM_AGENTS_MD,
-        deepagents_dir / "agents" / "developer" / "AGENTS.md": DEVELOPER_AGENTS_MD,
-        deepagents_dir / "skills" / "claude-code" / "SKILL.md": CLAUDE_CODE_SKILL_MD,
-        deepagents_dir / "skills" / "test-runner" / "SKILL.md": TEST_RUNNER_SKILL_MD,
-        deepagents_dir / "skills" / "task-decomposition" / "SKILL.md": TASK_DECOMPOSITION_SKILL_MD,
-        deepagents_dir / "skills" / "code-review" / "SKILL.md": CODE_REVIEW_SKILL_MD,
-        deepagents_dir / "skills" / "debugging" / "SKILL.md": DEBUGGING_SKILL_MD,
-        deepagents_dir / "skills" / "environment-setup" / "SKILL.md": ENVIRONMENT_SETUP_SKILL_MD,
-        deepagents_dir / "skills" / "dependency-management" / "SKILL.md": DEPENDENCY_MANAGEMENT_SKILL_MD,
-        deepagents_dir / "skills" / "git-workflow" / "SKILL.md": GIT_WORKFLOW_SKILL_MD,
-        deepagents_dir / "skills" / "progress-reporting" / "SKILL.md": PROGRESS_REPORTING_SKILL_MD,
-        deepagents_dir / "skills" / "error-analysis" / "SKILL.md": ERROR_ANALYSIS_SKILL_MD,
+        path: entry if isinstance(entry, dict) else {"sha": entry}
+        for path, entry in (record.get("files") or {}).items()
     }
+    key = templates.config_key(config)
 
-    created = []
-    skipped = []
+    # One scan of what exists, then only the templates to write are rendered.
+    existing = set()
+    for dirpath, _, filenames in os.walk(deepagents_dir):
+        rel = Path(dirpath).relative_to(deepagents_dir)
+        existing.update((rel / name).as_posix() for name in filenames)
+    variants = templates.skill_variants(config)
+    wanted = {
+        path: templates.render_key(key, path, variants.get(path, "full"))
+        for path in templates.manifest()
+        if not path.startswith("skills/") or path in variants
+    }
+    result = ScaffoldResult()
+    written = dict(files)
 
-    for path, content in files.items():
-        path.parent.mkdir(parents=True, exist_ok=True)
-        if path.exists():
-            skipped.append(path.relative_to(project_root))
+    # Generated files that are no longer wanted go, unless edited since.
+    for path in [path for path in written if path not in wanted]:
+        target = deepagents_dir / path
+        if path not in existing:
+            del written[path]
+        elif written[path]["sha"] == _digest(target):
+            target.unlink()
+            _prune(target.parent, deepagents_dir)
+            (base_dir / path).unlink(missing_ok=True)
+            result.removed.append(path)
+            del written[path]
+        else:
+            result.skipped.append(path)
+
+    stale = []
+    for path, render_key in wanted.items():
+        if path not in existing:
+            result.created.append(path)
+        elif path in written and written[path].get("key") == render_key:
+            result.skipped.append(path)
+        else:
+            stale.append(path)
+
+    for parent in sorted({(deepagents_dir / path).parent for path in result.created}):
+        parent.mkdir(parents=True, exist_ok=True)
+    for path in result.created + stale:
+        data = templates.render(path, config, variants.get(path, "full")).encode()
+        target = deepagents_dir / path
+        base = base_dir / path
+        if path in result.created:
+            target.write_bytes(data)
+            _remember(written, base, path, data, wanted[path])
+            continue
+        digest = _digest(target)
+        if path in written:
+            previous = base.read_bytes() if base.exists() else None
+            unedited = digest == written[path]["sha"]
+        else:
+            previous = templates.earlier_render(path, digest)
+            unedited = previous is not None
+            previous = previous or templates.earlier_render(path)
+        if unedited:
+            if target.read_bytes() == data:
+                result.skipped.append(path)
+            else:
+                target.write_bytes(data)
+                result.updated.append(path)
+        elif target.read_bytes() == data:
+            result.skipped.append(path)
+        elif previous is None:
+            # Edited, with no earlier render to merge against: leave it be.
+            result.skipped.append(path)
+            continue
+        elif previous == data:
+            result.skipped.append(path)
         else:
-            path.write_text(content)
-            created.append(path.relative_to(project_root))
+            merged, conflicts = merge3(previous.decode(), target.read_text(), data.decode())
+            sidecar = target.with_name(target.name + ".merge")
+            if conflicts:
+                sidecar.write_text(merged)
+                result.conflicts.append(path)
+                continue
+            sidecar.unlink(missing_ok=True)
+            target.write_text(merged)
+            result.merged.append(path)
+        _remember(written, base, path, data, wanted[path])
+
+    if written != files:
+        record_path.parent.mkdir(parents=True, exist_ok=True)
+        record_path.write_text(json.dumps({"files": written}, indent=1))
 
     # Create working directory
     working_dir = config.get("working_directory", "./workspace")
-    os.makedirs(working_dir, exist_ok=True)
+    os.makedirs(project_root / working_dir, exist_ok=True)
+    for name in ("created", "updated", "merged", "conflicts", "skipped", "removed"):
+        setattr(result, name, [Path(".deepagents", path) for path in getattr(result, name)])
+    result.skills = {
+        path.split("/")[1]: (variant, templates.estimate_tokens((deepagents_dir / path).read_bytes()))
+        for path, variant in variants.items()
+    }
+    return result
+
+
+def _digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _remember(written: dict, base: Path, path: str, data: bytes, key: str) -> None:
+    """Record ``data`` as what scaffold last rendered to ``path``."""
+    written[path] = {"sha": hashlib.sha256(data).hexdigest(), "key": key}
+    base.parent.mkdir(parents=True, exist_ok=True)
+    base.write_bytes(data)
+
+
+def _prune(directory: Path, top: Path) -> None:
+    """Remove ``directory`` and its parents below ``top`` while they are empty."""
+    while directory != top and not any(directory.iterdir()):
+        directory.rmdir()
+        directory = directory.parent
+
+
+def init(project_file: str = "project.yaml", root: str | Path | None = None) -> None:
+    """Scaffold .deepagents/ directory from a project.yaml file.
+
+    Creates the directory structure and configuration files needed to run
+    the ShepherdAI PM agent via ``deepagents --agent shepherd``.
+
+    Args:
+        project_file: Path to the project YAML file.
+        root: Directory to scaffold into (default: the current directory).
+    """
+    config, graph = load(project_file)
+    result = scaffold(config, Path.cwd() if root is None else root)
 
     # Summary
     print(f"Initialized ShepherdAI for project '{config['name']}'")
-    if created:
-        for p in created:
-            print(f"  created: {p}")
-    if skipped:
-        for p in skipped:
-            print(f"  skipped (exists): {p}")
+    if graph:
+        stages = len(scheduler.topological_levels(graph))
+        print(f"  tasks: {len(graph)} in {stages} stage(s), max_parallel={scheduler.max_parallel(config)}")
+    for p in result.created:
+        print(f"  created: {p}")
+    for p in result.updated:
+        print(f"  updated: {p}")
+    for p in result.merged:
+        print(f"  merged: {p}")
+    for p in result.conflicts:
+        print(f"  conflict: {p} (template changes in {p.name}.merge)")
+    for p in result.skipped:
+        print(f"  skipped (exists): {p}")
+    for p in result.removed:
+        print(f"  removed: {p}")
+
+    print()
+    print("Skills (estimated tokens):")
+    for name, (variant, tokens) in result.skills.items():
+        label = "" if variant == "full" else f"  ({variant})"
+        print(f"  {name:<24} {tokens:>6}{label}")
+    budget = config.get("skill_token_budget")
+    total = f"  {'total':<24} {result.skill_tokens:>6}"
+    print(total + (f" of {budget}" if budget else ""))
+    if budget and result.skill_tokens > budget:
+        print("  warning: skills exceed skill_token_budget even when minimal; select fewer with 'skills'")
     print()
     print("Run:  deepagents --agent shepherd")
 
@@ -94,8 +255,13 @@ def main():
         default="project.yaml",
         help="Path to project.yaml (default: project.yaml)",
     )
+    parser.add_argument(
+        "--root",
+        default=None,
+        help="Directory to scaffold into (default: current directory)",
+    )
     args = parser.parse_args()
-    init(args.project_file)
+    init(args.project_file, args.root)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,77 @@
+"""Line-based three-way merge, used to carry template updates into edited files.
+
+:func:`merge3` combines two revisions of a text that both descend from a
+common base, the way ``diff3``/``git merge-file`` do: a region changed on
+one side only takes that side's change, a region changed identically on
+both sides is taken once, and a region changed differently on both sides
+is a conflict.
+"""
+
+from difflib import SequenceMatcher
+
+MARKER_OURS = "<<<<<<< local"
+MARKER_BASE = "||||||| previous"
+MARKER_SEP = "======="
+MARKER_THEIRS = ">>>>>>> template"
+
+
+def merge3(base: str, ours: str, theirs: str) -> tuple[str, int]:
+    """Merge ``ours`` and ``theirs``, both edited from ``base``.
+
+    Returns:
+        The merged text and the number of conflicts. Conflicting regions
+        are written with ``diff3``-style markers (local, previous, template).
+    """
+    base_lines = base.splitlines(keepends=True)
+    ours_lines = ours.splitlines(keepends=True)
+    theirs_lines = theirs.splitlines(keepends=True)
+    in_ours = _matches(base_lines, ours_lines)
+    in_theirs = _matches(base_lines, theirs_lines)
+
+    out: list[str] = []
+    conflicts = 0
+    i = j = k = 0
+    while True:
+        # Next base line left unchanged by both sides, past the current position.
+        sync = next(
+            (
+                n
+                for n in range(i, len(base_lines))
+                if in_ours.get(n, -1) >= j and in_theirs.get(n, -1) >= k
+            ),
+            None,
+        )
+        if sync is None:
+            end_i, end_j, end_k = len(base_lines), len(ours_lines), len(theirs_lines)
+        else:
+            end_i, end_j, end_k = sync, in_ours[sync], in_theirs[sync]
+
+        b, o, t = base_lines[i:end_i], ours_lines[j:end_j], theirs_lines[k:end_k]
+        if o == b or o == t:
+            out += t
+        elif t == b:
+            out += o
+        else:
+            conflicts += 1
+            out += [MARKER_OURS + "\n", *_terminated(o), MARKER_BASE + "\n", *_terminated(b)]
+            out += [MARKER_SEP + "\n", *_terminated(t), MARKER_THEIRS + "\n"]
+
+        if sync is None:
+            return "".join(out), conflicts
+        out.append(base_lines[sync])
+        i, j, k = sync + 1, end_j + 1, end_k + 1
+
+
+def _matches(a: list[str], b: list[str]) -> dict[int, int]:
+    """Map each line of ``a`` kept unchanged in ``b`` to its index there."""
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    return {
+        block.a + n: block.b + n for block in matcher.get_matching_blocks() for n in range(block.size)
+    }
+
+
+def _terminated(lines: list[str]) -> list[str]:
+    # A last line without a newline would run into the following marker.
+    if lines and not lines[-1].endswith("\n"):
+        return [*lines[:-1], lines[-1] + "\n"]
+    return lines
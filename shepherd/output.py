@@ -0,0 +1,400 @@
+"""Streaming capture of test output with structured failure extraction.
+
+Test output is read line by line: the raw text goes straight to a log file,
+only a bounded tail is kept in memory, and a per-framework parser pulls out
+the fields the error-analysis skill asks for (test name, error type,
+expected vs actual, file:line). The resulting summary has a fixed upper
+size no matter how much the test command prints.
+"""
+
+import re
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import IO
+
+MAX_FAILURES = 20
+TAIL_LINES = 40
+FIELD_LIMIT = 300
+LINE_LIMIT = 1000
+MAX_FRAMES = 8
+
+
+@dataclass
+class Failure:
+    """A single failing test (or a bare traceback when there is no test)."""
+
+    test: str | None = None
+    error_type: str | None = None
+    message: str | None = None
+    expected: str | None = None
+    actual: str | None = None
+    location: str | None = None
+    frames: list[str] = field(default_factory=list)
+
+
+def detect_framework(command: str) -> str:
+    """Guess which parser to use from a test command."""
+    if re.search(r"\b(pytest|py\.test)\b", command):
+        return "pytest"
+    if re.search(r"\b(jest|vitest|npm (run )?test|yarn test|pnpm test)\b", command):
+        return "jest"
+    if re.search(r"\bgo test\b", command):
+        return "go"
+    if re.search(r"\bcargo test\b", command):
+        return "cargo"
+    return "python"
+
+
+_PY_ERROR = re.compile(r"^([A-Za-z_][\w.]*(?:Error|Exception|Exit|Interrupt|Warning|Failure)):?\s*(.*)$")
+_PY_FRAME = re.compile(r'^\s*File "([^"]+)", line (\d+)')
+_ASSERT_EQ = re.compile(r"^assert (.+?) (==|!=|in|not in|is|is not|<=|>=|<|>) (.+)$")
+
+_PYTEST_HEADER = re.compile(r"^_{3,} (.+?) _{3,}$")
+_PYTEST_CONFTEST = re.compile(r"^ImportError while loading conftest '([^']+)'")
+_PYTEST_E = re.compile(r"^E\s+(.*)$")
+_PYTEST_LOC = re.compile(r"^([^\s:]+\.py):(\d+): (?:in \S+|(\w+))")
+_PYTEST_SUMMARY = re.compile(r"^(?:FAILED|ERROR) (\S+)(?: - (.*))?$")
+_PYTEST_COUNTS = re.compile(r"^=+ (.*\d+ (?:passed|failed|error).*) in [\d.]+s")
+
+_JEST_HEADER = re.compile(r"^\s*● (.+)$")
+_JEST_EXPECTED = re.compile(r"^\s*Expected(?: value)?:?\s+(.*)$")
+_JEST_RECEIVED = re.compile(r"^\s*Received(?: value)?:?\s+(.*)$")
+_JEST_ERROR = re.compile(r"^\s*([A-Z]\w*Error):\s*(.*)$")
+_JEST_EXPECT = re.compile(r"^\s*(expect\(.*\)\..*)$")
+_JEST_FRAME = re.compile(r"^\s*at .*?\(?([^\s()]+\.[cm]?[jt]sx?):(\d+):\d+\)?$")
+_JEST_COUNTS = re.compile(r"^Tests:\s+(.*)$")
+
+_GO_RUN = re.compile(r"^=== RUN\s+(\S+)")
+_GO_HEADER = re.compile(r"^\s*--- FAIL: (\S+)")
+_GO_LOC = re.compile(r"^\s+([\w./-]+\.go):(\d+): (.*)$")
+_GO_GOT_WANT = re.compile(r"got:?\s*(.+?),?\s+(?:want|expected):?\s*(.+)$")
+_GO_PANIC = re.compile(r"^panic: (.*)$")
+_GO_COMPILE = re.compile(r"^([\w./-]+\.go):(\d+):\d+: (.*)$")
+
+_CARGO_HEADER = re.compile(r"^---- (\S+) stdout ----$")
+_CARGO_PANIC = re.compile(r"panicked at (?:'(.*)', )?([^\s:']+\.rs):(\d+):\d+:?$")
+_CARGO_LEFT = re.compile(r"^\s*left(?: value)?: (.*)$")
+_CARGO_RIGHT = re.compile(r"^\s*right(?: value)?: (.*)$")
+_CARGO_COMPILE = re.compile(r"^error(?:\[E\d+\])?: (.*)$")
+_CARGO_ARROW = re.compile(r"^\s*--> ([^\s:]+):(\d+):\d+$")
+_CARGO_COUNTS = re.compile(r"^test result: \w+\. (.*)$")
+
+
+class FailureParser:
+    """Incremental, bounded extractor of :class:`Failure` records."""
+
+    def __init__(self, framework: str = "python"):
+        self.framework = framework
+        self.failures: list[Failure] = []
+        self.dropped = 0
+        self.counts: str | None = None
+        self._current: Failure | None = None
+        self._in_traceback = False
+        self._tb = Failure()
+        self._pending: Failure | None = None
+        self._await_message = False
+
+    def feed(self, line: str) -> None:
+        line = line.rstrip("\n")[:LINE_LIMIT]
+        getattr(self, f"_feed_{self.framework}")(line)
+
+    # -- helpers ---------------------------------------------------------
+
+    def _start(self, test: str | None = None, **fields) -> Failure:
+        failure = Failure(test=_clip(test), **{k: _clip(v) for k, v in fields.items()})
+        if len(self.failures) < MAX_FAILURES:
+            self.failures.append(failure)
+        else:
+            self.dropped += 1
+        self._current = failure
+        return failure
+
+    def _find(self, test: str) -> Failure | None:
+        short = test.split("::")[-1]
+        for failure in self.failures:
+            if failure.test in (test, short) or (failure.test and failure.test.replace(".", "::") in test):
+                return failure
+        return None
+
+    def _set(self, failure: Failure, **fields) -> None:
+        for name, value in fields.items():
+            if value is not None and getattr(failure, name) is None:
+                setattr(failure, name, _clip(value))
+
+    def _frame(self, failure: Failure, location: str) -> None:
+        if failure.location is None and not _is_library(location):
+            failure.location = location
+        if location not in failure.frames and len(failure.frames) < MAX_FRAMES:
+            failure.frames.append(location)
+
+    def _error_text(self, failure: Failure, text: str) -> None:
+        m = _PY_ERROR.match(text)
+        if m:
+            self._set(failure, error_type=m[1], message=m[2] or None)
+            text = m[2]
+        elif text.startswith("assert "):
+            self._set(failure, error_type="AssertionError", message=text)
+        m = _ASSERT_EQ.match(text)
+        if m and m[2] == "==":
+            self._set(failure, actual=m[1], expected=m[3])
+
+    def _feed_traceback(self, line: str) -> bool:
+        """Handle plain Python tracebacks; returns True if the line was consumed."""
+        if line.startswith("Traceback (most recent call last):"):
+            self._in_traceback = True
+            self._tb = Failure()
+            return True
+        if not self._in_traceback:
+            return False
+        m = _PY_FRAME.match(line)
+        if m:
+            self._frame(self._tb, f"{m[1]}:{m[2]}")
+            # Tracebacks list the innermost frame last.
+            if not _is_library(m[1]):
+                self._tb.location = f"{m[1]}:{m[2]}"
+            return True
+        if line.startswith(" "):
+            return True
+        self._in_traceback = False
+        m = _PY_ERROR.match(line)
+        if m:
+            failure = self._current if self._current and self._current.error_type is None else None
+            if failure is None:
+                failure = self._start(error_type=m[1], message=m[2] or None)
+            self._error_text(failure, line)
+            failure.location = self._tb.location
+            failure.frames = self._tb.frames
+        return True
+
+    # -- frameworks ------------------------------------------------------
+
+    def _feed_python(self, line: str) -> None:
+        self._feed_traceback(line)
+
+    def _feed_pytest(self, line: str) -> None:
+        m = _PYTEST_HEADER.match(line)
+        if m:
+            name = m[1]
+            if name.startswith("ERROR collecting "):
+                name = name[len("ERROR collecting ") :]
+            self._start(name)
+            return
+        m = _PYTEST_CONFTEST.match(line)
+        if m:
+            self._start(m[1])
+            return
+        m = _PYTEST_SUMMARY.match(line)
+        if m:
+            failure = self._find(m[1])
+            if failure is None:
+                failure = self._start(m[1])
+            failure.test = _clip(m[1])
+            if m[2]:
+                self._error_text(failure, m[2])
+            return
+        m = _PYTEST_COUNTS.match(line)
+        if m:
+            self.counts = m[1]
+            self._current = None
+            return
+        if self._current is None:
+            self._feed_traceback(line)
+            return
+        m = _PYTEST_E.match(line)
+        if m:
+            self._error_text(self._current, m[1])
+            return
+        m = _PYTEST_LOC.match(line)
+        if m:
+            self._frame(self._current, f"{m[1]}:{m[2]}")
+            # The last "file:line: ErrorType" line is the innermost frame.
+            if m[3]:
+                if not _is_library(m[1]):
+                    self._current.location = f"{m[1]}:{m[2]}"
+                self._set(self._current, error_type=m[3])
+
+    def _feed_jest(self, line: str) -> None:
+        m = _JEST_HEADER.match(line)
+        if m:
+            self._start(m[1].strip())
+            return
+        m = _JEST_COUNTS.match(line)
+        if m:
+            self.counts = m[1]
+            return
+        if self._current is None:
+            self._feed_traceback(line)
+            return
+        for pattern, name in ((_JEST_EXPECTED, "expected"), (_JEST_RECEIVED, "actual")):
+            m = pattern.match(line)
+            if m:
+                self._set(self._current, **{name: m[1]})
+                return
+        m = _JEST_ERROR.match(line)
+        if m:
+            self._set(self._current, error_type=m[1], message=m[2])
+            return
+        m = _JEST_EXPECT.match(line)
+        if m:
+            self._set(self._current, error_type="AssertionError", message=m[1])
+            return
+        m = _JEST_FRAME.match(line)
+        if m and "node_modules" not in m[1]:
+            self._frame(self._current, f"{m[1]}:{m[2]}")
+
+    def _feed_go(self, line: str) -> None:
+        # With -v, a test's log lines come between "=== RUN" and "--- FAIL",
+        # so collect them on a pending record that is only kept if it fails.
+        m = _GO_RUN.match(line)
+        if m:
+            self._pending = Failure(test=_clip(m[1]), error_type="TestFailure")
+            self._current = None
+            return
+        m = _GO_HEADER.match(line)
+        if m:
+            pending = self._pending
+            if pending is not None and pending.test == m[1]:
+                self._start(**asdict(pending))
+            else:
+                self._start(m[1], error_type="TestFailure")
+            self._pending = None
+            return
+        m = _GO_PANIC.match(line)
+        if m:
+            failure = self._current or self._start()
+            failure.error_type = "panic"
+            self._set(failure, message=m[1])
+            return
+        m = _GO_LOC.match(line)
+        target = self._current or self._pending
+        if m and target is not None:
+            self._frame(target, f"{m[1]}:{m[2]}")
+            self._set(target, message=m[3])
+            gw = _GO_GOT_WANT.search(m[3])
+            if gw:
+                self._set(target, actual=gw[1], expected=gw[2])
+            return
+        m = _GO_COMPILE.match(line)
+        if m:
+            failure = self._start(error_type="CompileError", message=m[3])
+            self._frame(failure, f"{m[1]}:{m[2]}")
+            self._current = None
+
+    def _feed_cargo(self, line: str) -> None:
+        m = _CARGO_HEADER.match(line)
+        if m:
+            self._start(m[1], error_type="panic")
+            return
+        m = _CARGO_COUNTS.match(line)
+        if m:
+            self.counts = m[1]
+            return
+        m = _CARGO_COMPILE.match(line)
+        if m:
+            self._start(error_type="CompileError", message=m[1])
+            return
+        if self._current is None:
+            return
+        m = _CARGO_ARROW.match(line)
+        if m:
+            self._frame(self._current, f"{m[1]}:{m[2]}")
+            return
+        m = _CARGO_PANIC.search(line)
+        if m:
+            self._frame(self._current, f"{m[2]}:{m[3]}")
+            if m[1]:
+                self._set(self._current, message=m[1])
+            else:
+                # Since Rust 1.73 the message follows on the next line.
+                self._await_message = True
+            return
+        if self._await_message:
+            self._await_message = False
+            self._set(self._current, message=line.strip())
+            return
+        for pattern, name in ((_CARGO_LEFT, "actual"), (_CARGO_RIGHT, "expected")):
+            m = pattern.match(line)
+            if m:
+                self._set(self._current, **{name: m[1]})
+                return
+
+
+class OutputCapture:
+    """Consume a test command's output with bounded memory.
+
+    Args:
+        framework: Parser to use, see :func:`detect_framework`.
+        log_path: File receiving the complete raw output, or None.
+        tail_lines: Number of trailing lines kept in memory.
+    """
+
+    def __init__(self, framework: str = "python", log_path: str | Path | None = None, tail_lines: int = TAIL_LINES):
+        self.parser = FailureParser(framework)
+        self.log_path = Path(log_path) if log_path else None
+        self.tail: deque[str] = deque(maxlen=tail_lines)
+        self.lines = 0
+        self.bytes = 0
+        self._log: IO[str] | None = None
+        if self.log_path:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            self._log = open(self.log_path, "w", errors="replace")
+
+    def feed(self, line: str) -> None:
+        if self._log:
+            self._log.write(line)
+        self.bytes += len(line)
+        # readline() with a limit may split a long line; count real lines only.
+        if line.endswith("\n"):
+            self.lines += 1
+        self.tail.append(line.rstrip("\n")[:LINE_LIMIT])
+        self.parser.feed(line)
+
+    def read(self, stream: IO[str], chunk: int = 1 << 16) -> None:
+        """Feed every line of ``stream``; lines longer than ``chunk`` are split."""
+        for line in iter(lambda: stream.readline(chunk), ""):
+            self.feed(line)
+
+    def note(self, text: str) -> None:
+        """Append a line that did not come from the command (e.g. a timeout)."""
+        self.feed(f"{text}\n")
+
+    def close(self) -> None:
+        if self._log:
+            self._log.close()
+            self._log = None
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.tail)
+
+    def summary(self) -> dict:
+        """Return the fixed-size summary of everything fed so far."""
+        return {
+            "framework": self.parser.framework,
+            "counts": self.parser.counts,
+            "failures": [asdict(f) for f in self.parser.failures],
+            "more_failures": self.parser.dropped,
+            "tail": self.text,
+            "log": str(self.log_path) if self.log_path else None,
+            "lines": self.lines,
+            "bytes": self.bytes,
+        }
+
+
+def parse(text: str, framework: str = "python") -> list[Failure]:
+    """Parse complete output in one go; convenience wrapper for tests and tools."""
+    parser = FailureParser(framework)
+    for line in text.splitlines():
+        parser.feed(line)
+    return parser.failures
+
+
+def _is_library(path: str) -> bool:
+    return any(part in path for part in ("site-packages", "/lib/python", "node_modules", "/.cargo/", "/go/pkg/"))
+
+
+def _clip(value: str | None) -> str | None:
+    if value is None or len(value) <= FIELD_LIMIT:
+        return value
+    return value[: FIELD_LIMIT - 3] + "..."
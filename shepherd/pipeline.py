@@ -0,0 +1,126 @@
+"""Fail-fast tiered verification following the test-runner skill's Test Sequencing.
+
+A task can list verification ``stages`` in project.yaml, each with a
+``tier`` (``import``, ``unit``, ``integration`` or ``e2e``) and a
+``command``::
+
+    stages:
+      - {tier: import, command: "cd workspace && python -c 'import app'"}
+      - {tier: import, command: "cd workspace && python -m pyflakes ."}
+      - {tier: unit, command: "cd workspace && python -m pytest tests/unit -q"}
+      - {tier: e2e, command: "cd workspace && python -m pytest tests/e2e -q"}
+
+Tiers run in that order. Stages in the same tier run in parallel, and the
+pipeline stops after the first tier with a failure, so a broken import never
+reaches a 10-minute end-to-end suite. A task's ``test_command``, if any, is
+appended as one more stage in the tier its scope implies.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from shepherd.verify import SCOPE_TIMEOUTS, Verdict, classify_scope, task_timeout
+
+TIERS = tuple(SCOPE_TIMEOUTS)
+
+
+def stages_for(task: dict) -> list[dict]:
+    """Return a task's normalised stages, including its test_command.
+
+    Raises:
+        ValueError: If a stage has no command or an unknown tier.
+    """
+    stages = []
+    for i, stage in enumerate(task.get("stages") or [], 1):
+        if not isinstance(stage, dict) or not stage.get("command"):
+            raise ValueError(f"task '{task.get('name')}': stage #{i} needs a 'command'")
+        tier = stage.get("tier") or classify_scope(stage["command"])
+        if tier not in TIERS:
+            raise ValueError(
+                f"task '{task.get('name')}': stage #{i} has unknown tier '{tier}' "
+                f"(expected one of {', '.join(TIERS)})"
+            )
+        stages.append(
+            {
+                "name": stage.get("name") or f"{tier} #{i}",
+                "tier": tier,
+                "command": stage["command"],
+                "timeout": float(stage.get("timeout") or SCOPE_TIMEOUTS[tier]),
+            }
+        )
+    if task.get("test_command"):
+        stages.append(
+            {
+                "name": "test_command",
+                "tier": task.get("scope") or classify_scope(task["test_command"]),
+                "command": task["test_command"],
+                "timeout": task_timeout(task),
+            }
+        )
+    return stages
+
+
+def run_pipeline(
+    task: str,
+    stages: list[dict],
+    verify_stage: Callable[[str, str, float], Verdict],
+) -> Verdict:
+    """Run ``stages`` tier by tier and fold the results into one verdict.
+
+    Args:
+        task: Task name.
+        stages: Stages from :func:`stages_for`.
+        verify_stage: Called as ``verify_stage(stage_label, command, timeout)``
+            for every stage; this is where caching, incremental selection and
+            flake detection plug in.
+
+    Returns:
+        A verdict whose ``stages`` lists every stage as passed, failed or
+        skipped. On failure its output and failures are those of the
+        failing stages of the first failing tier.
+    """
+    start = time.monotonic()
+    results: list[tuple[dict, Verdict | None]] = []
+    failed: list[Verdict] = []
+    for tier in TIERS:
+        group = [s for s in stages if s["tier"] == tier]
+        if not group:
+            continue
+        if failed:
+            results.extend((s, None) for s in group)
+            continue
+        with ThreadPoolExecutor(max_workers=len(group)) as pool:
+            verdicts = list(
+                pool.map(lambda s: verify_stage(f"{task} [{s['name']}]", s["command"], s["timeout"]), group)
+            )
+        results.extend(zip(group, verdicts))
+        failed = [v for v in verdicts if not v.passed]
+
+    ran = [v for _, v in results if v is not None]
+    last = failed[0] if failed else ran[-1]
+    return Verdict(
+        task=task,
+        command=last.command,
+        passed=not failed,
+        exit_code=last.exit_code,
+        duration=round(time.monotonic() - start, 3),
+        output="\n".join(v.output for v in failed) if failed else last.output,
+        cached=all(v.cached for v in ran),
+        partial=any(v.partial for v in failed),
+        failures=[f for v in failed for f in v.failures],
+        log=last.log,
+        quarantined=[t for v in ran for t in v.quarantined],
+        flaky_suspects=[t for v in ran for t in v.flaky_suspects],
+        stages=[_stage_result(stage, verdict) for stage, verdict in results],
+    )
+
+
+def _stage_result(stage: dict, verdict: Verdict | None) -> dict:
+    if verdict is None:
+        return {"name": stage["name"], "tier": stage["tier"], "status": "SKIPPED"}
+    status = "PASS" if verdict.passed else "TIMEOUT" if verdict.exit_code == 124 else "FAIL"
+    result = {"name": stage["name"], "tier": stage["tier"], "status": status, "duration": verdict.duration}
+    if verdict.cached:
+        result["cached"] = True
+    return result
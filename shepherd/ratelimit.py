@@ -0,0 +1,170 @@
+"""Rate limiting of model API calls shared by many agent processes.
+
+Each agent is its own process, so the limit is enforced by a local HTTP
+proxy: :meth:`RateLimitProxy.env` points ``ANTHROPIC_BASE_URL`` and
+``OPENAI_BASE_URL`` at it, and every request takes a token from one
+:class:`RateLimiter` before it is forwarded upstream. Responses, streamed
+ones included, are relayed as they arrive. A 429 from upstream pauses the
+limiter for the ``retry-after`` the provider asked for.
+"""
+
+import os
+import threading
+import time
+from http.client import HTTPConnection, HTTPSConnection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# Provider name (first path segment at the proxy) -> (env var, default upstream).
+UPSTREAMS = {
+    "anthropic": ("ANTHROPIC_BASE_URL", "https://api.anthropic.com"),
+    "openai": ("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+}
+
+UPSTREAM_TIMEOUT = 600
+
+_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-connection",
+    "transfer-encoding",
+    "te",
+    "trailer",
+    "upgrade",
+    "host",
+}
+
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` calls per minute in bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int | None = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate / 60.0
+        self.burst = burst or max(1, int(rate // 10))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a call may be made; return the seconds waited."""
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return now - start
+                delay = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller for ``seconds``, e.g. after a 429."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class RateLimitProxy:
+    """Local proxy forwarding model API calls through a shared :class:`RateLimiter`.
+
+    Use as a context manager; the proxy serves on a free localhost port
+    until exit.
+    """
+
+    def __init__(self, limiter: RateLimiter, upstreams: dict[str, str] | None = None):
+        self.limiter = limiter
+        self.upstreams = upstreams or {
+            name: os.environ.get(var) or default for name, (var, default) in UPSTREAMS.items()
+        }
+        self.calls = 0
+        self.throttled = 0
+        self.waited = 0.0
+        self._stats_lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.proxy = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "RateLimitProxy":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> dict[str, str]:
+        """Environment variables that route a process's model calls through the proxy."""
+        return {UPSTREAMS[name][0]: f"{self.url}/{name}" for name in self.upstreams if name in UPSTREAMS}
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "throttled": self.throttled, "waited": round(self.waited, 3)}
+
+    def _record(self, waited: float, status: int) -> None:
+        with self._stats_lock:
+            self.calls += 1
+            self.waited += waited
+            if status == 429:
+                self.throttled += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        proxy: RateLimitProxy = self.server.proxy
+        name, _, rest = self.path.lstrip("/").partition("/")
+        base = proxy.upstreams.get(name)
+        if base is None:
+            self.send_error(404, f"unknown provider '{name}'")
+            return
+        upstream = urlsplit(base)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in _HOP_HEADERS}
+        path = f"{upstream.path.rstrip('/')}/{rest}"
+
+        waited = proxy.limiter.acquire()
+        connection = HTTPSConnection if upstream.scheme == "https" else HTTPConnection
+        conn = connection(upstream.netloc, timeout=UPSTREAM_TIMEOUT)
+        try:
+            conn.request(self.command, path, body or None, headers)
+            response = conn.getresponse()
+        except OSError as e:
+            conn.close()
+            proxy._record(waited, 502)
+            self.send_error(502, f"upstream unreachable: {e}")
+            return
+        proxy._record(waited, response.status)
+        if response.status == 429:
+            try:
+                proxy.limiter.pause(float(response.getheader("retry-after") or 1))
+            except ValueError:
+                proxy.limiter.pause(1)
+
+        try:
+            self.send_response(response.status, response.reason)
+            for key, value in response.getheaders():
+                if key.lower() not in _HOP_HEADERS:
+                    self.send_header(key, value)
+            # Relay the body as it arrives and end it by closing the connection.
+            self.send_header("Connection", "close")
+            self.end_headers()
+            while chunk := response.read1(1 << 16):
+                self.wfile.write(chunk)
+                self.wfile.flush()
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    do_GET = do_PUT = do_PATCH = do_DELETE = do_POST
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,314 @@
+"""Retry prompts that carry only what changed since the developer's last attempt.
+
+Escalating retries by attaching every earlier error output makes each
+prompt larger than the last. Instead, ``shepherd retry`` compares the
+task's latest failed verification with the one before it (both kept by
+:mod:`shepherd.state`) and sends the developer the delta:
+
+- the root cause to fix next, from :mod:`shepherd.triage`;
+- failures that are new, and those whose error changed (with only the
+  traceback frames that differ from last time);
+- tests the last attempt fixed, which must keep passing;
+- the names of tests still failing exactly as before;
+- the git diff of the last attempt, files in the tracebacks first.
+
+The prompt is cut to a fixed token budget, lowest-priority content
+first, so retry latency stays flat however many attempts a task takes.
+"""
+
+import argparse
+import json
+import subprocess
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from shepherd import snapshots
+from shepherd.config import load_project
+from shepherd.state import GIT_TIMEOUT, StateStore
+from shepherd.telemetry import span
+from shepherd.templates import estimate_tokens
+from shepherd.triage import format_fix_list, triage
+
+DEFAULT_BUDGET = 1500
+
+# Git's well-known empty tree, the base for a repository without commits.
+EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+
+
+@dataclass
+class Delta:
+    """How a task's failures changed between two attempts."""
+
+    new: list[dict] = field(default_factory=list)
+    changed: list[tuple[dict, dict]] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    fixed: list[str] = field(default_factory=list)
+
+
+def failure_id(failure: dict) -> str:
+    """Identify a failure across attempts: its test, else its error and location."""
+    return failure.get("test") or f"{failure.get('error_type')} at {failure.get('location')}"
+
+
+def compare(previous: list[dict], current: list[dict]) -> Delta:
+    """Diff the failures of two consecutive attempts."""
+    before = {failure_id(f): f for f in previous}
+    now = {failure_id(f): f for f in current}
+    delta = Delta(fixed=[name for name in before if name not in now])
+    for name, failure in now.items():
+        old = before.get(name)
+        if old is None:
+            delta.new.append(failure)
+        elif _error(old) != _error(failure):
+            delta.changed.append((old, failure))
+        else:
+            delta.unchanged.append(name)
+    return delta
+
+
+def git_diff(workdir: str | Path, base: str | None, tree: str | None) -> str:
+    """Diff of the working directory between two :func:`state.git_snapshot` trees.
+
+    With no ``base``, the diff is against HEAD, so the first retry shows
+    everything the developer's initial attempt changed.
+    """
+    if tree is None:
+        return ""
+    if base is None:
+        head = subprocess.run(
+            ["git", "rev-parse", "--verify", "-q", "HEAD^{tree}"],
+            cwd=workdir,
+            capture_output=True,
+            text=True,
+        )
+        base = head.stdout.strip() if head.returncode == 0 else EMPTY_TREE
+    try:
+        result = subprocess.run(
+            ["git", "diff", "--no-color", "--no-ext-diff", base, tree, "--", "."],
+            cwd=workdir,
+            capture_output=True,
+            text=True,
+            timeout=GIT_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return ""
+    return result.stdout if result.returncode == 0 else ""
+
+
+def build_prompt(
+    task: dict,
+    attempt: int,
+    previous: dict | None,
+    current: dict,
+    diff: str = "",
+    budget: int = DEFAULT_BUDGET,
+) -> str:
+    """Write the retry prompt for ``task`` from its last two failed attempts.
+
+    Args:
+        task: The task from project.yaml.
+        attempt: Number of the attempt that just failed.
+        previous: The attempt before it, or None on the first retry.
+        current: The attempt that just failed.
+        diff: Git diff of what the developer changed in that attempt.
+        budget: Maximum estimated tokens of the prompt.
+    """
+    failures = current.get("failures") or []
+    fixes = triage(failures)
+    header = [f"Task: {task['name']} -- retry after failed attempt {attempt}"]
+    if task.get("description"):
+        header.append(str(task["description"]).strip().splitlines()[0])
+    sections = ["\n".join(header)]
+
+    if fixes:
+        sections.append("Fix this root cause first:\n" + _indent(format_fix_list(fixes, limit=1)))
+    elif not previous or current.get("tail") != previous.get("tail"):
+        tail = _indent(current.get("tail") or "")
+        sections.append(f"Exit code {current.get('exit_code')}. Output:\n{tail}")
+    else:
+        sections.append(f"Exit code {current.get('exit_code')}, same output as the previous attempt.")
+
+    if previous is None:
+        if len(fixes) > 1:
+            others = _indent(format_fix_list(fixes[1:]))
+            sections.append(f"Other failures, fix after the root cause:\n{others}")
+    else:
+        delta = compare(previous.get("failures") or [], failures)
+        # The root cause is already spelled out above.
+        root = set(fixes[0].tests) if fixes else set()
+        new = [f for f in delta.new if failure_id(f) not in root]
+        changed = [(old, f) for old, f in delta.changed if failure_id(f) not in root]
+        if new:
+            sections.append("New since your last attempt:\n" + "\n".join(_describe(f) for f in new))
+        if changed:
+            sections.append(
+                "Now failing differently:\n" + "\n".join(_describe(f, old) for old, f in changed)
+            )
+        if delta.fixed:
+            sections.append("Fixed by your last attempt (keep them passing): " + ", ".join(delta.fixed))
+        if delta.unchanged:
+            sections.append("Still failing with the same error: " + ", ".join(delta.unchanged))
+
+    prompt = _fit(sections, budget)
+    if diff:
+        room = budget - estimate_tokens(prompt) - estimate_tokens("\n\nYour last attempt:\n")
+        involved = {
+            _file(frame)
+            for f in failures
+            for frame in [*(f.get("frames") or []), f.get("location")]
+            if frame
+        }
+        diff = _fit_diff(diff, room, involved)
+        if diff:
+            prompt += "\n\nYour last attempt:\n" + diff
+    return prompt
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build a retry prompt holding only what changed since the last attempt"
+    )
+    parser.add_argument(
+        "project_file",
+        nargs="?",
+        default="project.yaml",
+        help="Path to project.yaml (default: project.yaml)",
+    )
+    parser.add_argument("--task", required=True, metavar="NAME", help="Task to build the prompt for")
+    parser.add_argument(
+        "--budget",
+        type=int,
+        default=DEFAULT_BUDGET,
+        help=f"Maximum size of the prompt in estimated tokens (default: {DEFAULT_BUDGET})",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the prompt and its delta as JSON")
+    args = parser.parse_args()
+
+    try:
+        config = load_project(args.project_file)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+    task = next((t for t in config.get("tasks") or [] if t["name"] == args.task), None)
+    if task is None:
+        raise SystemExit(f"Error: no task named {args.task}")
+    if args.budget < 1:
+        raise SystemExit("Error: --budget must be positive")
+
+    root = Path.cwd()
+    store = StateStore.for_root(root)
+    try:
+        previous, current = store.attempts(task["name"])
+        attempt = store.get(task["name"]).attempts
+    finally:
+        store.close()
+    if current is None:
+        raise SystemExit(f"Error: no failed attempt recorded for {task['name']}; verify it first")
+
+    workdir = root / config.get("working_directory", "./workspace")
+    with span(root, "retry", task["name"], attempt=attempt) as attrs:
+        diff = git_diff(workdir, previous and previous.get("git"), current.get("git"))
+        prompt = build_prompt(task, max(attempt, 1), previous, current, diff, args.budget)
+        attrs["prompt_tokens"] = estimate_tokens(prompt)
+    # The prompt goes out next; keep the failed attempt restorable.
+    snapshots.take(root, workdir, task["name"], "retry")
+    if args.json:
+        delta = compare(previous.get("failures") or [], current.get("failures") or []) if previous else None
+        print(
+            json.dumps(
+                {
+                    "task": task["name"],
+                    "attempt": attempt,
+                    "tokens": estimate_tokens(prompt),
+                    "delta": asdict(delta) if delta else None,
+                    "prompt": prompt,
+                },
+                indent=1,
+            )
+        )
+    else:
+        print(prompt)
+
+
+def _error(failure: dict) -> tuple:
+    return failure.get("error_type"), failure.get("message"), failure.get("location")
+
+
+def _describe(failure: dict, old: dict | None = None) -> str:
+    error = f"{failure.get('error_type') or 'Error'}: {failure.get('message') or ''}".rstrip()
+    line = f"  - {failure_id(failure)}: {error}"
+    if failure.get("location"):
+        line += f" (at {failure['location']})"
+    if old is not None:
+        line += f"; was {old.get('error_type') or 'Error'}: {old.get('message') or ''}".rstrip()
+    if failure.get("expected") is not None or failure.get("actual") is not None:
+        line += f"\n      expected: {failure.get('expected')}  actual: {failure.get('actual')}"
+    frames = failure.get("frames") or []
+    seen = set(old.get("frames") or []) if old is not None else set()
+    fresh = [f for f in frames if f not in seen]
+    if fresh and fresh != [failure.get("location")]:
+        line += "\n      via " + " -> ".join(fresh)
+    if len(fresh) < len(frames):
+        line += f"\n      ({len(frames) - len(fresh)} frame(s) as before)"
+    return line
+
+
+def _fit(sections: list[str], budget: int) -> str:
+    """Join sections, dropping or cutting the last ones to stay within ``budget``."""
+    out: list[str] = []
+    for section in sections:
+        room = budget - estimate_tokens("\n\n".join(out + [""]))
+        if estimate_tokens(section) <= room:
+            out.append(section)
+            continue
+        lines = section.splitlines()
+        while lines and estimate_tokens("\n".join(lines + ["  ..."])) > room:
+            lines.pop()
+        if lines:
+            out.append("\n".join(lines + ["  ..."]))
+        break
+    return "\n\n".join(out)
+
+
+def _fit_diff(diff: str, budget: int, priority: set[str]) -> str:
+    """Cut a diff to ``budget``, whole files first and files in ``priority`` before others."""
+    if budget <= 0:
+        return ""
+    files = ["diff --git" + chunk for chunk in diff.split("diff --git") if chunk]
+    files.sort(key=lambda chunk: not any(path in chunk.split("\n", 1)[0] for path in priority))
+    out: list[str] = []
+    omitted = 0
+    # Room for the truncation marker and the note on omitted files.
+    reserve = estimate_tokens("... (diff truncated)\n") + estimate_tokens(
+        f"... {len(files)} more changed file(s) not shown\n"
+    )
+    for chunk in files:
+        room = budget - estimate_tokens("".join(out)) - reserve
+        if estimate_tokens(chunk) <= room:
+            out.append(chunk)
+            continue
+        lines, used = [], 0
+        for line in chunk.splitlines(keepends=True):
+            used += estimate_tokens(line)
+            if used > room:
+                break
+            lines.append(line)
+        if len(lines) > 4:
+            out.append("".join(lines) + "... (diff truncated)\n")
+        else:
+            omitted += 1
+    if omitted:
+        out.append(f"... {omitted} more changed file(s) not shown\n")
+    return "".join(out).rstrip("\n")
+
+
+def _indent(text: str) -> str:
+    return "\n".join(f"  {line}" if line else line for line in text.splitlines())
+
+
+def _file(location: str) -> str:
+    return location.rsplit(":", 1)[0].rsplit("/", 1)[-1]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Run all pending test_commands from project.yaml in one call.
+
+Test commands run concurrently as subprocesses, bounded by ``--jobs``, each
+with the timeout of its scope (import 30s, unit 2m, integration 5m, e2e 10m)
+unless the task sets ``timeout``. The result is a compact JSON document the
+PM can read in a single turn instead of one ``execute`` call per task.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+
+from shepherd import flaky, telemetry
+from shepherd.cache import ResultCache
+from shepherd.config import load_project
+from shepherd.pipeline import run_pipeline, stages_for
+from shepherd.state import record_verdicts
+from shepherd.testmap import verify_incremental
+from shepherd.triage import triage
+from shepherd.verify import Verdict, classify_scope, verify
+from shepherd.warm import WarmPool
+
+# Lines of output kept per failing task in the summary; the structured
+# failures carry the details and the full log stays on disk.
+TAIL_LINES = 10
+
+
+def run_tasks(
+    config: dict,
+    root: str | Path,
+    names: list[str] | None = None,
+    jobs: int | None = None,
+    cache: ResultCache | None = None,
+    incremental: bool = False,
+    reruns: int = flaky.DEFAULT_RERUNS,
+    warm: WarmPool | None = None,
+    started: dict[str, float] | None = None,
+) -> list[Verdict]:
+    """Verify every task that has a test_command or stages, ``jobs`` at a time.
+
+    Args:
+        config: Parsed project.yaml.
+        root: Project root the commands run from.
+        names: Restrict to these task names (default: all tasks).
+        jobs: Maximum concurrent tasks (default: CPU count).
+        cache: Verdict cache; hits return without running the command.
+        incremental: Use affected-test selection for pytest commands.
+        reruns: Re-runs per failing pytest test to detect flakiness; 0
+            disables detection (known-flaky tests stay quarantined).
+        warm: Pool of preloaded interpreters for Python commands, if any.
+        started: Filled with each task's start time (``time.time()``), for telemetry.
+    """
+    tasks = [t for t in config.get("tasks") or [] if t.get("test_command") or t.get("stages")]
+    if names:
+        unknown = set(names) - {t["name"] for t in tasks}
+        if unknown:
+            raise ValueError(f"no task with a test_command or stages named {', '.join(sorted(unknown))}")
+        tasks = [t for t in tasks if t["name"] in names]
+
+    working_dir = config.get("working_directory", "./workspace")
+    stages = {t["name"]: stages_for(t) for t in tasks}
+    ledger = flaky.FlakeLedger.for_root(root)
+
+    def verify_stage(label: str, command: str, timeout: float) -> Verdict:
+        if incremental:
+            verdict = verify_incremental(label, command, root, working_dir, cache, timeout, warm)
+        else:
+            verdict = verify(label, command, root, working_dir, cache, timeout, warm=warm)
+        if verdict.partial:
+            return verdict
+        # A cached failure was already re-run when it was first seen.
+        return flaky.check(verdict, root, working_dir, ledger, 0 if verdict.cached else reruns, timeout, jobs)
+
+    def run_one(task: dict) -> Verdict:
+        if started is not None:
+            started[task["name"]] = time.time()
+        if not task.get("stages"):
+            stage = stages[task["name"]][0]
+            return verify_stage(task["name"], stage["command"], stage["timeout"])
+        return run_pipeline(task["name"], stages[task["name"]], verify_stage)
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        return list(pool.map(run_one, tasks))
+
+
+def summarize(verdicts: list[Verdict], config: dict) -> dict:
+    """Build the compact result document printed by ``shepherd run``."""
+    scopes = {
+        t["name"]: "pipeline" if t.get("stages") else t.get("scope") or classify_scope(t["test_command"])
+        for t in config.get("tasks") or []
+        if t.get("test_command") or t.get("stages")
+    }
+    results = []
+    for v in verdicts:
+        entry = {
+            "task": v.task,
+            "status": "PASS" if v.passed else "TIMEOUT" if v.exit_code == 124 else "FAIL",
+            "scope": scopes.get(v.task),
+            "duration": v.duration,
+        }
+        if v.cached:
+            entry["cached"] = True
+        if v.partial:
+            entry["partial"] = True
+        if v.quarantined:
+            entry["quarantined"] = v.quarantined
+        if v.flaky_suspects:
+            entry["flaky_suspects"] = v.flaky_suspects
+        if v.stages:
+            entry["stages"] = v.stages
+        if not v.passed:
+            entry["exit_code"] = v.exit_code
+            real = [f for f in v.failures if f.get("test") not in v.quarantined]
+            fixes = [asdict(fix) for fix in triage(real)]
+            if fixes:
+                entry["root_cause"] = fixes[0]
+                entry["other_fixes"] = fixes[1:]
+            entry["tail"] = "\n".join(v.output.strip().splitlines()[-TAIL_LINES:])
+            if v.log and not v.cached:
+                entry["log"] = v.log
+        results.append(entry)
+    return {
+        "passed": sum(v.passed for v in verdicts),
+        "failed": sum(not v.passed for v in verdicts),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run project.yaml test commands concurrently and print a JSON summary"
+    )
+    parser.add_argument(
+        "project_file",
+        nargs="?",
+        default="project.yaml",
+        help="Path to project.yaml (default: project.yaml)",
+    )
+    parser.add_argument(
+        "--task",
+        action="append",
+        dest="tasks",
+        metavar="NAME",
+        help="Only run this task (repeatable; default: all tasks)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Maximum concurrent test commands (default: CPU count)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore cached verdicts and always run the test commands",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="For pytest commands, run the tests affected by changed files first",
+    )
+    parser.add_argument(
+        "--reruns",
+        type=int,
+        default=flaky.DEFAULT_RERUNS,
+        help="Re-runs per failing pytest test to detect flakiness, 0 to disable (default: 3)",
+    )
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="Run Python test commands in a pool of preloaded interpreters",
+    )
+    args = parser.parse_args()
+
+    try:
+        config = load_project(args.project_file)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+    root = Path.cwd()
+    cache = None if args.no_cache else ResultCache.for_root(root)
+    warm = WarmPool() if args.warm else None
+    with telemetry.span(root, "verify") as attrs:
+        started = {}
+        try:
+            verdicts = run_tasks(
+                config, root, args.tasks, args.jobs, cache, args.incremental, args.reruns, warm, started
+            )
+        except ValueError as e:
+            raise SystemExit(f"Error: {args.project_file}: {e}")
+        # Tasks run concurrently, so only their wall time is known, not their CPU or memory.
+        for v in verdicts:
+            telemetry.record(root, "verify", started[v.task], v.duration, v.task, passed=v.passed, cached=v.cached)
+        attrs.update(tasks=len(verdicts), failed=sum(not v.passed for v in verdicts))
+    record_verdicts(root, config.get("working_directory", "./workspace"), verdicts, cache, config)
+
+    summary = summarize(verdicts, config)
+    print(json.dumps(summary, indent=1))
+    sys.exit(0 if summary["failed"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Dependency-aware scheduling of project.yaml tasks."""
+
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable
+
+DEFAULT_MAX_PARALLEL = 3
+
+
+class CycleError(ValueError):
+    """Raised when task dependencies form a cycle."""
+
+
+def task_graph(tasks: list[dict]) -> dict[str, list[str]]:
+    """Build the dependency graph for a list of project tasks.
+
+    Each task may declare ``depends_on`` as a task name or a list of task
+    names. If no task declares ``depends_on`` the tasks keep their original
+    meaning of a strict sequence, i.e. every task depends on the one before it.
+
+    Args:
+        tasks: The ``tasks`` list from project.yaml.
+
+    Returns:
+        Mapping of task name to the names of the tasks it depends on, in
+        declaration order.
+
+    Raises:
+        ValueError: If task names are missing or duplicated, or a dependency
+            refers to an unknown task.
+        CycleError: If the dependencies contain a cycle.
+    """
+    names = []
+    for i, task in enumerate(tasks):
+        if not isinstance(task, dict) or not task.get("name"):
+            raise ValueError(f"task #{i + 1} must be a mapping with a 'name' field")
+        if task["name"] in names:
+            raise ValueError(f"duplicate task name '{task['name']}'")
+        names.append(task["name"])
+
+    if not any("depends_on" in task for task in tasks):
+        graph = {name: names[i - 1 : i] for i, name in enumerate(names)}
+    else:
+        graph = {}
+        for task in tasks:
+            deps = task.get("depends_on") or []
+            if isinstance(deps, str):
+                deps = [deps]
+            for dep in deps:
+                if dep not in names:
+                    raise ValueError(f"task '{task['name']}' depends on unknown task '{dep}'")
+            graph[task["name"]] = list(dict.fromkeys(deps))
+
+    topological_levels(graph)
+    return graph
+
+
+def topological_levels(graph: dict[str, list[str]]) -> list[list[str]]:
+    """Group tasks into levels that can run concurrently.
+
+    Every task in a level depends only on tasks in earlier levels.
+
+    Raises:
+        CycleError: If the graph contains a cycle.
+    """
+    remaining = {name: set(deps) for name, deps in graph.items()}
+    levels = []
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise CycleError(f"dependency cycle: {' -> '.join(_find_cycle(remaining))}")
+        levels.append(ready)
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return levels
+
+
+def _find_cycle(remaining: dict[str, set[str]]) -> list[str]:
+    # Every node left has an unresolved dependency, so walking them must loop.
+    path = [next(iter(remaining))]
+    while True:
+        nxt = sorted(remaining[path[-1]])[0]
+        if nxt in path:
+            return path[path.index(nxt) :] + [nxt]
+        path.append(nxt)
+
+
+def max_parallel(config: dict) -> int:
+    """Return the configured ``max_parallel`` for a project config."""
+    value = config.get("max_parallel", DEFAULT_MAX_PARALLEL)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise ValueError(f"max_parallel must be a positive integer, got {value!r}")
+    return value
+
+
+def speculative(config: dict, task: dict | None = None) -> int:
+    """Return how many candidate fixes to try at once on a retry of ``task``; 0 when off.
+
+    A task's ``speculative`` overrides the project's.
+    """
+    value = (task or {}).get("speculative", config.get("speculative"))
+    if value is None or value is False or value == 0:
+        return 0
+    if not isinstance(value, int) or isinstance(value, bool) or value < 2:
+        raise ValueError(f"speculative must be an integer of at least 2 (or 0 for off), got {value!r}")
+    return value
+
+
+def validate(config: dict) -> dict[str, list[str]]:
+    """Validate the task DAG of a parsed project.yaml and return it."""
+    max_parallel(config)
+    tasks = config.get("tasks") or []
+    if not isinstance(tasks, list):
+        raise ValueError("'tasks' must be a list")
+    speculative(config)
+    for task in tasks:
+        if isinstance(task, dict):
+            speculative(config, task)
+    return task_graph(tasks)
+
+
+def run(
+    graph: dict[str, list[str]],
+    dispatch: Callable[[str], bool],
+    max_parallel: int = DEFAULT_MAX_PARALLEL,
+) -> dict[str, str]:
+    """Dispatch tasks to a bounded pool as soon as their dependencies pass.
+
+    In a real session the PM agent does the dispatching, following the plan
+    ``shepherd plan`` prints, and ``shepherd run`` only verifies. This loop
+    is the same schedule without a model, used by ``benchmarks/bench_loop.py``
+    to drive simulated delegations.
+
+    Args:
+        graph: Dependency graph from :func:`task_graph`.
+        dispatch: Called with a task name; runs the task (delegation plus
+            verification) and returns True if it passed.
+        max_parallel: Maximum number of tasks in flight at once.
+
+    Returns:
+        Mapping of task name to ``"passed"``, ``"failed"`` or ``"skipped"``
+        (a dependency did not pass).
+    """
+    status: dict[str, str] = {}
+    pending = dict(graph)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+        while pending or running:
+            for name, deps in list(pending.items()):
+                if any(status.get(dep) in ("failed", "skipped") for dep in deps):
+                    status[name] = "skipped"
+                    del pending[name]
+            ready = [
+                name
+                for name, deps in pending.items()
+                if all(status.get(dep) == "passed" for dep in deps)
+            ]
+            for name in ready[: max_parallel - len(running)]:
+                running[pool.submit(dispatch, name)] = name
+                del pending[name]
+            if not running:
+                # Everything left was just skipped or becomes ready next pass.
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    status[name] = "passed" if future.result() else "failed"
+                except Exception:
+                    status[name] = "failed"
+
+    return {name: status[name] for name in graph}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Show the parallel execution plan for project.yaml tasks"
+    )
+    parser.add_argument(
+        "project_file",
+        nargs="?",
+        default="project.yaml",
+        help="Path to project.yaml (default: project.yaml)",
+    )
+    args = parser.parse_args()
+
+    from shepherd.config import load_project
+    from shepherd.telemetry import span
+
+    try:
+        config = load_project(args.project_file)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+    with span(Path.cwd(), "plan") as attrs:
+        try:
+            levels = topological_levels(validate(config))
+        except ValueError as e:
+            raise SystemExit(f"Error: {args.project_file}: {e}")
+        attrs.update(tasks=sum(len(level) for level in levels), stages=len(levels))
+
+    print(f"max_parallel: {max_parallel(config)}")
+    for i, level in enumerate(levels, 1):
+        print(f"stage {i}:")
+        for name in level:
+            print(f"  - {name}")
+
+
+if __name__ == "__main__":
+    main()
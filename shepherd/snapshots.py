@@ -0,0 +1,542 @@
+"""Workspace snapshots per task, so a failed task can be rolled back.
+
+A task that ends up blocked after its retries leaves its half-applied
+edits in the working directory, and every later verification then fails
+on them. Before each delegation -- ``shepherd state --set TASK in_progress``,
+``shepherd retry`` and ``shepherd claude`` -- the working directory is
+snapshotted for the task, and ``shepherd state --set TASK blocked`` rolls
+back what the task changed since its first delegation. The working
+directory is restored wholesale only when no other task recorded a status
+or snapshot in the meantime; otherwise only the task's own paths are, and
+files another task's checkpoint holds are never deleted.
+
+Snapshots are git trees when the working directory is inside a repository
+(written through a temporary index, as for retry attempts, so the index
+and HEAD are untouched); rolling back rewrites only the files that differ.
+Elsewhere they are copies under ``.shepherd/snapshots/trees/``, named by
+the tree digest so identical states are stored once, and cloned where the
+filesystem supports reflinks. Snapshots identical to the task's latest one
+are not taken again. A passing verification replaces the task's snapshots
+with one checkpoint of the passing state. Every rollback first snapshots
+the state it discards, so it can be undone with ``--to``.
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from shepherd.cache import IGNORED_DIRS, STATE_DIR, ResultCache
+from shepherd.config import load_project
+from shepherd.envcache import clone_file
+from shepherd.state import GIT_TIMEOUT, git_snapshot, run_git
+
+# Snapshots kept per task; the first, the state the task started from, is never dropped.
+MAX_SNAPSHOTS = 10
+
+
+def snapshot_dir(root: str | Path) -> Path:
+    return Path(root) / STATE_DIR / "snapshots"
+
+
+def entries(root: str | Path, task: str) -> list[dict]:
+    """The task's snapshots, oldest first."""
+    return _read(snapshot_dir(root), task)["snapshots"]
+
+
+def touched(root: str | Path, task: str) -> list[str]:
+    """Files the task's delegations edited since its last checkpoint, relative to the working directory."""
+    return _read(snapshot_dir(root), task)["touched"]
+
+
+def take(
+    root: str | Path,
+    workdir: str | Path,
+    task: str,
+    label: str,
+    cache: ResultCache | None = None,
+) -> dict | None:
+    """Snapshot ``workdir`` for ``task``; return the new entry.
+
+    Returns None, taking nothing, when the working directory is missing or
+    matches the task's latest snapshot.
+    """
+    workdir = Path(workdir)
+    if not workdir.is_dir():
+        return None
+    base = snapshot_dir(root)
+    with _locked(base, task), _digests(root, cache) as digests:
+        manifest = _read(base, task)
+        digest = digests.tree_digest(workdir)
+        if manifest["snapshots"] and manifest["snapshots"][-1]["digest"] == digest:
+            return None
+        entry = _take(base, workdir, label, digest)
+        entry["id"] = max((e["id"] for e in manifest["snapshots"]), default=0) + 1
+        manifest["snapshots"].append(entry)
+        if len(manifest["snapshots"]) > MAX_SNAPSHOTS:
+            del manifest["snapshots"][1]
+        _write(base, task, manifest)
+    _collect(base)
+    return entry
+
+
+def checkpoint(
+    root: str | Path,
+    workdir: str | Path,
+    tasks: list[str],
+    cache: ResultCache | None = None,
+) -> None:
+    """Replace the snapshots of ``tasks``, which just passed, with one of the passing state.
+
+    Tasks that were never snapshotted are left alone.
+    """
+    base = snapshot_dir(root)
+    tasks = [t for t in tasks if _manifest_path(base, t).exists()]
+    if not tasks or not Path(workdir).is_dir():
+        return
+    with _digests(root, cache) as digests:
+        digest = digests.tree_digest(workdir)
+    entry = None
+    for task in tasks:
+        with _locked(base, task):
+            manifest = _read(base, task)
+            latest = manifest["snapshots"][-1] if manifest["snapshots"] else None
+            if latest and latest["label"] == "passed" and latest["digest"] == digest:
+                continue
+            entry = entry or _take(base, Path(workdir), "passed", digest)
+            next_id = max((e["id"] for e in manifest["snapshots"]), default=0) + 1
+            manifest["snapshots"] = [{**entry, "id": next_id}]
+            manifest["touched"] = []
+            _write(base, task, manifest)
+    _collect(base)
+
+
+def touch(root: str | Path, workdir: str | Path, task: str, files: list[str]) -> None:
+    """Note files a delegation of ``task`` edited, for rollbacks limited to them."""
+    base = snapshot_dir(root)
+    if not files or not _manifest_path(base, task).exists():
+        return
+    workdir = Path(workdir).resolve()
+    with _locked(base, task):
+        manifest = _read(base, task)
+        touched = set(manifest["touched"])
+        for name in files:
+            path = Path(name)
+            if path.is_absolute():
+                try:
+                    path = path.resolve().relative_to(workdir)
+                except ValueError:
+                    continue
+            touched.add(path.as_posix())
+        manifest["touched"] = sorted(touched)
+        _write(base, task, manifest)
+
+
+def rollback(
+    root: str | Path,
+    workdir: str | Path,
+    task: str,
+    to: int | None = None,
+    touched: bool = False,
+    cache: ResultCache | None = None,
+) -> dict:
+    """Restore ``workdir`` to one of the task's snapshots.
+
+    Args:
+        to: Snapshot id to restore (default: the task's first snapshot).
+        touched: Restore only files the task's delegations edited, leaving
+            the work of tasks running alongside it alone.
+
+    Returns:
+        ``{"task", "to", "discarded", "restored", "note"}``: the snapshot
+        restored, the id of the snapshot of the state that was replaced
+        (None if nothing changed), the paths rewritten, relative to
+        ``workdir``, and why nothing was restored when that was skipped.
+
+    Raises:
+        ValueError: If the task has no such snapshot.
+    """
+    return _rollback(
+        root,
+        workdir,
+        task,
+        to,
+        lambda manifest, digests: set(manifest["touched"]) if touched else None,
+        set(),
+        cache,
+    )
+
+
+def rollback_blocked(
+    root: str | Path,
+    workdir: str | Path,
+    task: str,
+    updated: dict[str, float | None],
+    cache: ResultCache | None = None,
+) -> dict:
+    """Undo what a blocked task changed, leaving other tasks' work alone.
+
+    The working directory goes back to the task's first snapshot as a whole
+    only if no other task recorded a status or snapshot since it was taken.
+    Otherwise only the task's own paths are restored: files its delegations
+    edited and files that changed between its own snapshots, minus those
+    other tasks' delegations edited. Files another task's checkpoint holds
+    are never deleted.
+
+    Args:
+        updated: When each task's state was last recorded, from the state store.
+    """
+    workdir = Path(workdir)
+    base = snapshot_dir(root)
+    others = [t for t in _tasks(base) if t != task]
+    with _digests(root, cache) as digests:
+        edited, protected = set(), set()
+        for other in others:
+            manifest = _read(base, other)
+            edited.update(manifest["touched"])
+            for entry in manifest["snapshots"]:
+                if entry["label"] == "passed":
+                    protected.update(_files(workdir, base, entry, digests))
+
+        def own_paths(manifest: dict, digests: ResultCache) -> set[str] | None:
+            since = manifest["snapshots"][0]["time"]
+            busy = any(t != task and (u or 0) > since for t, u in updated.items()) or any(
+                e["time"] > since for other in others for e in _read(base, other)["snapshots"]
+            )
+            if not busy:
+                return None
+            paths = set(manifest["touched"])
+            entries = manifest["snapshots"]
+            for old, new in zip(entries, entries[1:]):
+                paths |= _changed_between(workdir, base, old, new, digests)
+            return paths - edited
+
+        return _rollback(root, workdir, task, None, own_paths, protected, digests)
+
+
+def _rollback(root, workdir, task, to, select, keep: set[str], cache) -> dict:
+    """Restore ``workdir`` to a snapshot; ``select(manifest, digests)`` gives the paths to restore (None: all)."""
+    workdir = Path(workdir)
+    base = snapshot_dir(root)
+    with _locked(base, task), _digests(root, cache) as digests:
+        manifest = _read(base, task)
+        if not manifest["snapshots"]:
+            raise ValueError(f"no snapshots of task {task}")
+        target = next((e for e in manifest["snapshots"] if to is None or e["id"] == to), None)
+        if target is None:
+            raise ValueError(f"task {task} has no snapshot {to}")
+        only = select(manifest, digests)
+        result = {"task": task, "to": target["id"], "discarded": None, "restored": [], "note": None}
+        if only == set():
+            result["note"] = "no edits of the task alone were found, so nothing was restored"
+            return result
+        digest = digests.tree_digest(workdir)
+        if digest == target["digest"]:
+            return result
+        current = _take(base, workdir, "discarded", digest)
+        if target["mode"] == "git" and current["mode"] == "git":
+            restored = _restore_git(workdir, current["tree"], target["tree"], only, keep)
+        else:
+            restored = _restore_copy(workdir, base / "trees" / target["digest"], only, keep, digests)
+        if restored:
+            current["id"] = max(e["id"] for e in manifest["snapshots"]) + 1
+            manifest["snapshots"].append(current)
+            _write(base, task, manifest)
+            result.update(discarded=current["id"], restored=restored)
+    _collect(base)
+    return result
+
+
+def discard(root: str | Path, task: str) -> bool:
+    """Forget the task's snapshots; return True if there were any."""
+    base = snapshot_dir(root)
+    path = _manifest_path(base, task)
+    if not path.exists():
+        return False
+    with _locked(base, task):
+        path.unlink()
+    _collect(base)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="List, take or roll back a task's snapshots of the working directory"
+    )
+    parser.add_argument(
+        "project_file",
+        nargs="?",
+        default="project.yaml",
+        help="Path to project.yaml (default: project.yaml)",
+    )
+    parser.add_argument("--task", required=True, metavar="NAME", help="Task the snapshots belong to")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--take", action="store_true", help="Snapshot the working directory now")
+    action.add_argument("--rollback", action="store_true", help="Restore the task's first snapshot")
+    action.add_argument("--discard", action="store_true", help="Forget the task's snapshots")
+    parser.add_argument("--to", type=int, metavar="ID", help="With --rollback, the snapshot to restore")
+    parser.add_argument(
+        "--touched",
+        action="store_true",
+        help="With --rollback, restore only files the task's delegations edited",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+
+    try:
+        config = load_project(args.project_file)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+    if args.task not in {t.get("name") for t in config.get("tasks") or []}:
+        raise SystemExit(f"Error: no task named {args.task}")
+    root = Path.cwd()
+    workdir = root / config.get("working_directory", "./workspace")
+
+    if args.discard:
+        print("removed" if discard(root, args.task) else "nothing to remove")
+        return
+    cache = ResultCache.for_root(root)
+    try:
+        if args.rollback:
+            result = rollback(root, workdir, args.task, args.to, args.touched, cache)
+        elif args.take:
+            result = take(root, workdir, args.task, "manual", cache)
+        else:
+            result = entries(root, args.task)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+    finally:
+        cache.close()
+
+    if args.json:
+        print(json.dumps(result, indent=1))
+    elif args.rollback:
+        print(format_rollback(result))
+    elif args.take:
+        print(f"snapshot {result['id']} ({result['mode']})" if result else "unchanged since the latest snapshot")
+    else:
+        for entry in result:
+            when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["time"]))
+            print(f"{entry['id']:>3}  {when}  {entry['label']:<10} {entry['mode']:<4} {entry['digest'][:12]}")
+        if not result:
+            print(f"no snapshots of task {args.task}")
+
+
+def format_rollback(result: dict) -> str:
+    """One line describing a :func:`rollback`."""
+    if result["note"]:
+        return f"Task {result['task']}: {result['note']}."
+    if not result["restored"]:
+        return f"Task {result['task']}: working directory already matches snapshot {result['to']}."
+    return (
+        f"Task {result['task']}: rolled back {len(result['restored'])} file(s) to snapshot {result['to']}; "
+        f"the replaced state is snapshot {result['discarded']}."
+    )
+
+
+def _take(base: Path, workdir: Path, label: str, digest: str) -> dict:
+    tree = git_snapshot(workdir)
+    copy = base / "trees" / digest
+    if tree is None and not copy.exists():
+        tmp = copy.with_name(f"{digest}.{os.getpid()}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.copytree(
+            workdir,
+            tmp,
+            symlinks=True,
+            ignore=shutil.ignore_patterns(*IGNORED_DIRS),
+            copy_function=clone_file,
+        )
+        os.replace(tmp, copy)
+    return {"label": label, "mode": "git" if tree else "copy", "tree": tree, "digest": digest, "time": time.time()}
+
+
+def _restore_git(workdir: Path, current: str, target: str, only: set[str] | None, keep: set[str]) -> list[str]:
+    top, prefix = _git_location(workdir)
+    changes = [
+        (status, path)
+        for status, path in _diff_trees(top, prefix, current, target)
+        if (only is None or path[len(prefix) :] in only) and not (status == "D" and path[len(prefix) :] in keep)
+    ]
+
+    removed = [path for status, path in changes if status == "D"]
+    for path in removed:
+        _remove(Path(top) / path, workdir)
+    written = [path for status, path in changes if status != "D"]
+    if written:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {**os.environ, "GIT_INDEX_FILE": os.path.join(tmp, "index")}
+            if run_git(top, "read-tree", target, env=env) is None:
+                raise ValueError(f"could not read snapshot tree {target}")
+            subprocess.run(
+                ["git", "checkout-index", "-f", "-z", "--stdin"],
+                cwd=top,
+                env=env,
+                input="\0".join(written),
+                capture_output=True,
+                text=True,
+                timeout=GIT_TIMEOUT,
+                check=True,
+            )
+    return sorted(path[len(prefix):] for _, path in changes)
+
+
+def _restore_copy(
+    workdir: Path, source: Path, only: set[str] | None, keep: set[str], digests: ResultCache
+) -> list[str]:
+    if not source.is_dir():
+        raise ValueError(f"snapshot copy {source} is missing")
+    ours = digests.file_digests(workdir)
+    theirs = digests.file_digests(source)
+    changed = []
+    for rel, digest in theirs.items():
+        if ours.get(rel) != digest and (only is None or rel in only):
+            target = workdir / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if target.exists() or target.is_symlink():
+                target.unlink()
+            clone_file(str(source / rel), str(target))
+            changed.append(rel)
+    for rel in ours:
+        if rel not in theirs and (only is None or rel in only) and rel not in keep:
+            _remove(workdir / rel, workdir)
+            changed.append(rel)
+    return sorted(changed)
+
+
+def _git_location(workdir: Path) -> tuple[str, str]:
+    top = run_git(workdir, "rev-parse", "--show-toplevel")
+    prefix = run_git(workdir, "rev-parse", "--show-prefix")
+    if top is None or prefix is None:
+        raise ValueError(f"{workdir} is no longer in a git repository")
+    return top, prefix
+
+
+def _diff_trees(top: str, prefix: str, old: str, new: str) -> list[tuple[str, str]]:
+    """``(status, path)`` for every file that differs from ``old`` to ``new`` under ``prefix``."""
+    diff = run_git(
+        top,
+        "diff-tree", "-r", "-z", "--no-renames", "--name-status", old, new,
+        "--", prefix or ".", f":(exclude){prefix}{STATE_DIR}",
+    )  # fmt: skip
+    if diff is None:
+        raise ValueError(f"could not compare snapshot trees in {top}")
+    fields = diff.split("\0")
+    return [(fields[i], fields[i + 1]) for i in range(0, len(fields) - 1, 2)]
+
+
+def _changed_between(workdir: Path, base: Path, old: dict, new: dict, digests: ResultCache) -> set[str]:
+    """Paths, relative to ``workdir``, that differ between two snapshots."""
+    if old["mode"] == "git" and new["mode"] == "git":
+        top, prefix = _git_location(workdir)
+        return {path[len(prefix) :] for _, path in _diff_trees(top, prefix, old["tree"], new["tree"])}
+    if old["mode"] == "copy" and new["mode"] == "copy":
+        ours = digests.file_digests(base / "trees" / old["digest"])
+        theirs = digests.file_digests(base / "trees" / new["digest"])
+        return {rel for rel in ours.keys() | theirs.keys() if ours.get(rel) != theirs.get(rel)}
+    return set()
+
+
+def _files(workdir: Path, base: Path, entry: dict, digests: ResultCache) -> set[str]:
+    """Files a snapshot holds, relative to ``workdir``."""
+    if entry["mode"] == "copy":
+        copy = base / "trees" / entry["digest"]
+        return set(digests.file_digests(copy)) if copy.is_dir() else set()
+    top, prefix = _git_location(workdir)
+    listed = run_git(top, "ls-tree", "-r", "-z", "--name-only", entry["tree"], "--", prefix or ".")
+    return {path[len(prefix) :] for path in (listed or "").split("\0") if path}
+
+
+def _tasks(base: Path) -> list[str]:
+    """Tasks that have snapshots."""
+    tasks = []
+    for path in base.glob("*.json"):
+        try:
+            tasks.append(json.loads(path.read_text())["task"])
+        except (OSError, ValueError, KeyError):
+            continue
+    return tasks
+
+
+def _remove(path: Path, workdir: Path) -> None:
+    """Delete a file and the directories it leaves empty, up to ``workdir``."""
+    path.unlink(missing_ok=True)
+    parent = path.parent
+    while parent != workdir and workdir in parent.parents:
+        try:
+            parent.rmdir()
+        except OSError:
+            break
+        parent = parent.parent
+
+
+@contextmanager
+def _digests(root: str | Path, cache: ResultCache | None):
+    digests = cache or ResultCache.for_root(root)
+    try:
+        yield digests
+    finally:
+        if digests is not cache:
+            digests.close()
+
+
+def _slug(task: str) -> str:
+    return re.sub(r"[^\w.-]+", "-", task).strip("-").lower() or "task"
+
+
+def _manifest_path(base: Path, task: str) -> Path:
+    return base / f"{_slug(task)}.json"
+
+
+def _read(base: Path, task: str) -> dict:
+    path = _manifest_path(base, task)
+    if path.exists():
+        return json.loads(path.read_text())
+    return {"task": task, "snapshots": [], "touched": []}
+
+
+def _write(base: Path, task: str, manifest: dict) -> None:
+    path = _manifest_path(base, task)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest, indent=1))
+    os.replace(tmp, path)
+
+
+@contextmanager
+def _locked(base: Path, task: str):
+    # The shared lock on trees.lock keeps _collect from deleting a copy taken but not yet recorded.
+    base.mkdir(parents=True, exist_ok=True)
+    with open(base / f"{_slug(task)}.lock", "w") as f, open(base / "trees.lock", "w") as trees:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        fcntl.flock(trees, fcntl.LOCK_SH)
+        yield
+
+
+def _collect(base: Path) -> None:
+    """Delete snapshot copies no task refers to any more."""
+    trees = base / "trees"
+    if not trees.is_dir():
+        return
+    with open(base / "trees.lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        used = set()
+        for path in base.glob("*.json"):
+            try:
+                used.update(e["digest"] for e in json.loads(path.read_text())["snapshots"] if e["mode"] == "copy")
+            except (OSError, ValueError, KeyError):
+                return
+        for copy in trees.iterdir():
+            if copy.name not in used and not copy.name.endswith(".tmp"):
+                shutil.rmtree(copy, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""Speculative retries: several fix attempts at once, first green result wins.
+
+A sequential retry loop costs one delegation plus one verification per
+attempt. For tasks that fail often, ``shepherd speculate`` trades compute
+for wall-clock time instead:
+
+1. ``--task NAME`` forks N isolated candidates of the working directory
+   under ``.shepherd/speculate/``: git worktrees when the working directory
+   is the root of a git repository, copy-on-write copies otherwise (plain
+   copies where the filesystem cannot clone). Every candidate starts from
+   the working directory's current content, uncommitted changes included;
+   virtualenvs and node_modules are linked, not copied.
+2. The PM sends the same fix prompt to N developer subagents in one turn,
+   each told to work in its own candidate directory.
+3. ``--task NAME --pick`` verifies all candidates in parallel, stops the
+   others as soon as one passes and copies the files that candidate changed
+   since the fork back into the working directory; files the candidate
+   never had (gitignored ones in a worktree, say) are left alone. Verdicts
+   go to the shared cache, so re-verifying the merged tree is instant.
+
+Candidates are removed after ``--pick`` (unless ``--keep``) or with
+``--discard``.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from pathlib import Path
+
+from shepherd import scheduler
+from shepherd.cache import IGNORED_DIRS, STATE_DIR, ResultCache
+from shepherd.config import load_project
+from shepherd.envcache import clone_file
+from shepherd.run import run_tasks, summarize
+from shepherd.state import git_snapshot, record_verdicts, run_git
+from shepherd.telemetry import span
+from shepherd.verify import Verdict, cancel, release
+
+DEFAULT_CANDIDATES = 3
+
+# Environment directories shared with candidates through symlinks; tests
+# need them, and copying them would dwarf the rest of the work.
+LINKED_DIRS = (".venv", "venv", "node_modules")
+
+
+def spec_dir(root: str | Path, task: str) -> Path:
+    slug = re.sub(r"[^\w.-]+", "-", task).strip("-").lower() or "task"
+    return Path(root) / STATE_DIR / "speculate" / slug
+
+
+def prepare(config: dict, task: dict, root: str | Path, count: int, cache: ResultCache) -> dict:
+    """Create ``count`` candidates of the working directory for ``task``.
+
+    Returns:
+        The manifest also stored in the candidates' directory: mode, the
+        working directory's digest at fork time and each candidate's
+        ``root`` and ``workdir``. The candidates' file digests at fork time
+        are stored next to it, for :func:`merge_back`.
+
+    Raises:
+        ValueError: If the working directory is missing or not below ``root``.
+    """
+    root = Path(root).resolve()
+    rel = Path(config.get("working_directory", "./workspace"))
+    workdir = (root / rel).resolve()
+    if not workdir.is_dir():
+        raise ValueError(f"working directory {rel} does not exist")
+    if workdir == root or root not in workdir.parents:
+        raise ValueError("speculative retries need a working_directory inside the project root")
+    rel = workdir.relative_to(root)
+
+    discard(root, task["name"])
+    base = spec_dir(root, task["name"])
+    base.mkdir(parents=True)
+    # Worktrees need the working directory to be a repository's root with a commit to check out.
+    tree = None
+    if run_git(workdir, "rev-parse", "--show-toplevel") == str(workdir):
+        if run_git(workdir, "rev-parse", "--verify", "-q", "HEAD"):
+            tree = git_snapshot(workdir)
+    mode = "worktree" if tree else "copy"
+
+    candidates = []
+    for i in range(1, count + 1):
+        cand_root = base / str(i)
+        cand_workdir = cand_root / rel
+        _mirror(root, rel, cand_root)
+        # Share the flaky-test ledger so quarantined tests stay quarantined.
+        (cand_root / STATE_DIR).mkdir()
+        if (root / STATE_DIR / "flaky.db").exists():
+            (cand_root / STATE_DIR / "flaky.db").symlink_to(root / STATE_DIR / "flaky.db")
+        if mode == "worktree":
+            run_git(workdir, "worktree", "add", "--detach", "--force", str(cand_workdir), "HEAD")
+            if run_git(cand_workdir, "read-tree", "--reset", "-u", tree) is None:
+                raise ValueError(f"could not create a git worktree at {cand_workdir}")
+        else:
+            shutil.copytree(
+                workdir,
+                cand_workdir,
+                symlinks=True,
+                ignore=shutil.ignore_patterns(*IGNORED_DIRS, *LINKED_DIRS),
+                copy_function=clone_file,
+            )
+        for name in LINKED_DIRS:
+            if (workdir / name).is_dir() and not (cand_workdir / name).exists():
+                (cand_workdir / name).symlink_to(workdir / name, target_is_directory=True)
+        candidates.append({"id": i, "root": str(cand_root), "workdir": str(cand_workdir)})
+
+    manifest = {
+        "task": task["name"],
+        "mode": mode,
+        "base": cache.tree_digest(workdir),
+        "candidates": candidates,
+    }
+    (base / "manifest.json").write_text(json.dumps(manifest, indent=1))
+    # Every candidate starts out the same, so the first one's files are the fork base.
+    forked = cache.file_digests(candidates[0]["workdir"]) if candidates else {}
+    (base / "base.json").write_text(json.dumps(forked))
+    return manifest
+
+
+def pick(
+    config: dict,
+    task: dict,
+    root: str | Path,
+    cache: ResultCache,
+    jobs: int | None = None,
+    force: bool = False,
+) -> dict:
+    """Verify every candidate in parallel and merge back the first that passes.
+
+    Args:
+        force: Merge even if the working directory changed since the fork.
+
+    Candidates still running when one passes are killed rather than
+    waited for, and reported as ``CANCELLED``.
+
+    Returns:
+        ``{"task", "winner", "merged", "candidates"}``; ``winner`` is the
+        passing candidate's id, or None when none passed.
+
+    Raises:
+        ValueError: If no candidates were prepared for ``task``.
+    """
+    root = Path(root).resolve()
+    path = spec_dir(root, task["name"]) / "manifest.json"
+    if not path.exists():
+        raise ValueError(f"no speculative candidates for {task['name']}; create them first")
+    manifest = json.loads(path.read_text())
+    forked = json.loads((path.parent / "base.json").read_text())
+    working_dir = config.get("working_directory", "./workspace")
+    workdir = root / working_dir
+
+    def check(candidate: dict) -> Verdict:
+        return run_tasks(config, candidate["root"], [task["name"]], 1, cache, reruns=0)[0]
+
+    winner, merged, verdicts = None, [], {}
+    pool = ThreadPoolExecutor(max_workers=jobs or len(manifest["candidates"]))
+    futures = {pool.submit(check, c): c for c in manifest["candidates"]}
+    try:
+        for future in as_completed(futures):
+            candidate = futures[future]
+            verdict = verdicts[candidate["id"]] = future.result()
+            if verdict.passed:
+                winner = candidate["id"]
+                break
+    finally:
+        # Kill the candidates still running instead of waiting for their suites.
+        pool.shutdown(wait=False, cancel_futures=True)
+        pending = {f: c for f, c in futures.items() if not f.done()}
+        for candidate in pending.values():
+            cancel(candidate["root"])
+        wait(pending)
+        for candidate in pending.values():
+            release(candidate["root"])
+
+    if winner is not None:
+        if not force and cache.tree_digest(workdir) != manifest["base"]:
+            raise ValueError(
+                f"{working_dir} changed since the candidates were created; re-run with --force to overwrite it"
+            )
+        candidate = next(c for c in manifest["candidates"] if c["id"] == winner)
+        merged = merge_back(workdir, Path(candidate["workdir"]), cache, forked)
+        record_verdicts(root, working_dir, [verdicts[winner]], cache, config)
+
+    finished = [c for c in manifest["candidates"] if c["id"] in verdicts]
+    entries = summarize([verdicts[c["id"]] for c in finished], config)["results"]
+    for candidate, entry in zip(finished, entries):
+        entry["candidate"] = candidate["id"]
+    results = {e["candidate"]: e for e in entries}
+    ordered = [
+        results.get(c["id"]) or {"task": task["name"], "status": "CANCELLED", "candidate": c["id"]}
+        for c in manifest["candidates"]
+    ]
+    return {"task": task["name"], "winner": winner, "merged": merged, "candidates": ordered}
+
+
+def merge_back(workdir: Path, candidate: Path, cache: ResultCache, forked: dict[str, str]) -> list[str]:
+    """Apply the candidate's changes since the fork to ``workdir``; return the paths that changed.
+
+    Args:
+        forked: ``{relative path: sha256}`` of the candidate when it was
+            created. Only paths whose content differs from it are written
+            or deleted, so files the candidate never had (gitignored files
+            missing from a worktree, files added to ``workdir`` later) stay
+            as they are. VCS metadata and environment directories are not
+            hashed, so they are never touched either.
+    """
+    ours = cache.file_digests(workdir)
+    theirs = cache.file_digests(candidate)
+    changed = []
+    for rel, digest in theirs.items():
+        if forked.get(rel) != digest and ours.get(rel) != digest:
+            target = workdir / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(candidate / rel, target)
+            changed.append(rel)
+    for rel in forked:
+        if rel not in theirs and rel in ours:
+            (workdir / rel).unlink()
+            changed.append(rel)
+    return sorted(changed)
+
+
+def discard(root: str | Path, task: str) -> bool:
+    """Remove the candidates of ``task``; return True if there were any."""
+    base = spec_dir(root, task)
+    if not base.exists():
+        return False
+    manifest = base / "manifest.json"
+    if manifest.exists():
+        for candidate in json.loads(manifest.read_text())["candidates"]:
+            if (Path(candidate["workdir"]) / ".git").is_file():
+                run_git(Path(candidate["workdir"]), "worktree", "remove", "--force", candidate["workdir"])
+    shutil.rmtree(base, ignore_errors=True)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Try several fixes for a task at once and keep the first that passes"
+    )
+    parser.add_argument(
+        "project_file",
+        nargs="?",
+        default="project.yaml",
+        help="Path to project.yaml (default: project.yaml)",
+    )
+    parser.add_argument("--task", required=True, metavar="NAME", help="Task being retried")
+    parser.add_argument(
+        "-n",
+        "--candidates",
+        type=int,
+        default=None,
+        help=f"Candidates to create (default: project.yaml's speculative, else {DEFAULT_CANDIDATES})",
+    )
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument(
+        "--pick",
+        action="store_true",
+        help="Verify the candidates and merge back the first that passes",
+    )
+    action.add_argument("--discard", action="store_true", help="Remove the task's candidates")
+    parser.add_argument("--keep", action="store_true", help="With --pick, keep the candidates afterwards")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="With --pick, merge even if the working directory changed meanwhile",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+
+    try:
+        config = load_project(args.project_file)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+    task = next((t for t in config.get("tasks") or [] if t.get("name") == args.task), None)
+    if task is None:
+        raise SystemExit(f"Error: no task named {args.task}")
+    root = Path.cwd()
+
+    if args.discard:
+        print("removed" if discard(root, task["name"]) else "nothing to remove")
+        return
+
+    cache = ResultCache.for_root(root)
+    try:
+        if args.pick:
+            with span(root, "retry", task["name"], speculative=True) as attrs:
+                result = pick(config, task, root, cache, force=args.force)
+                attrs.update(candidates=len(result["candidates"]), winner=result["winner"])
+            if not args.keep:
+                discard(root, task["name"])
+        else:
+            count = args.candidates or scheduler.speculative(config, task) or DEFAULT_CANDIDATES
+            if count < 2:
+                raise SystemExit("Error: --candidates must be at least 2")
+            result = prepare(config, task, root, count, cache)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+    finally:
+        cache.close()
+
+    if args.json:
+        print(json.dumps(result, indent=1))
+    elif args.pick:
+        for entry in result["candidates"]:
+            mark = "  <-- merged" if entry["candidate"] == result["winner"] else ""
+            took = f"  [{entry['duration']}s]" if "duration" in entry else ""
+            print(f"{entry['status']:<9} candidate {entry['candidate']}{took}{mark}")
+        if result["winner"] is None:
+            print("No candidate passed; the working directory is unchanged.")
+        else:
+            print(f"Merged candidate {result['winner']}: {len(result['merged'])} file(s) changed.")
+    else:
+        print(f"{len(result['candidates'])} candidates of the working directory ({result['mode']}):")
+        for candidate in result["candidates"]:
+            print(f"  {candidate['id']}: {candidate['workdir']}")
+    if args.pick:
+        sys.exit(0 if result["winner"] is not None else 1)
+
+
+def _mirror(root: Path, rel: Path, dest: Path) -> None:
+    """Recreate the project around ``rel`` in ``dest`` with symlinks, leaving ``rel`` itself to fill.
+
+    Test commands run from the project root (``cd workspace && ...``) and
+    may read other files there, so each candidate gets a root of its own.
+    """
+    source = root
+    for part in rel.parts:
+        dest.mkdir(parents=True, exist_ok=True)
+        for entry in os.scandir(source):
+            if entry.name not in (part, STATE_DIR):
+                (dest / entry.name).symlink_to(entry.path)
+        source, dest = source / part, dest / part
+
+
+if __name__ == "__main__":
+    main()
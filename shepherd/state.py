@@ -0,0 +1,457 @@
+"""Persistent task state, so a resumed PM session does not depend on its transcript.
+
+Every verification through ``shepherd verify`` or ``shepherd run`` updates
+``.shepherd/state.db``: the task's status, attempt count, a one-line
+summary of its last error and the hash of the working tree it was verified
+against. Failed attempts are kept too, for :mod:`shepherd.retry`, and so
+are Claude Code sessions with their turns and cost (:mod:`shepherd.claude`). The PM
+marks tasks ``in_progress`` or ``blocked`` itself. On resume,
+``python -m shepherd state`` prints a snapshot of a few lines per project
+instead of the PM rebuilding its todo list from the conversation.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from shepherd.cache import STATE_DIR, ResultCache
+from shepherd.config import load_project
+from shepherd.verify import Verdict
+
+STATUSES = ("pending", "in_progress", "passed", "failed", "blocked")
+
+# Longest last-error summary kept per task.
+ERROR_LIMIT = 300
+
+# Output lines kept with each failed attempt.
+TAIL_LINES = 10
+
+GIT_TIMEOUT = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    name TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    tree TEXT,
+    note TEXT,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    name TEXT PRIMARY KEY,
+    previous TEXT,
+    current TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    name TEXT PRIMARY KEY,
+    session_id TEXT,
+    calls INTEGER NOT NULL DEFAULT 0,
+    turns INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS commits (
+    name TEXT NOT NULL,
+    commit_id TEXT NOT NULL,
+    parent TEXT,
+    files TEXT NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (name, commit_id)
+);
+"""
+
+
+@dataclass
+class TaskState:
+    """What is known about one task; tasks never seen are ``pending``."""
+
+    name: str
+    status: str = "pending"
+    attempts: int = 0
+    last_error: str | None = None
+    tree: str | None = None
+    note: str | None = None
+    updated: float | None = None
+
+
+class StateStore:
+    """Task states keyed by task name, stored in SQLite."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._db.executescript(_SCHEMA)
+
+    @classmethod
+    def for_root(cls, root: str | Path) -> "StateStore":
+        """Open the store kept under ``<root>/.shepherd/``."""
+        return cls(Path(root) / STATE_DIR / "state.db")
+
+    def get(self, name: str) -> TaskState:
+        return self.all().get(name) or TaskState(name)
+
+    def all(self) -> dict[str, TaskState]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT name, status, attempts, last_error, tree, note, updated FROM tasks"
+            ).fetchall()
+        return {row[0]: TaskState(*row) for row in rows}
+
+    def set_status(self, name: str, status: str, note: str | None = None) -> None:
+        """Set a task's status by hand, e.g. ``in_progress`` when it is delegated."""
+        if status not in STATUSES:
+            raise ValueError(f"unknown status '{status}' (expected one of {', '.join(STATUSES)})")
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO tasks (name, status, note, updated) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET status = excluded.status, "
+                "note = excluded.note, updated = excluded.updated",
+                (name, status, note, time.time()),
+            )
+
+    def record(self, verdict: Verdict, tree: str | None = None) -> None:
+        """Record a verification of ``verdict.task`` against working tree ``tree``.
+
+        A cached verdict means nothing changed since the last run, so it does
+        not count as another attempt. A failure leaves a task the PM marked
+        ``blocked`` blocked, and its note in place; a pass clears both.
+        """
+        status = "passed" if verdict.passed else "failed"
+        error = None if verdict.passed else error_summary(verdict)
+        attempts = 0 if verdict.cached else 1
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO tasks (name, status, attempts, last_error, tree, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET "
+                "status = CASE WHEN excluded.status = 'passed' THEN 'passed' "
+                "WHEN status = 'blocked' THEN 'blocked' ELSE excluded.status END, "
+                "attempts = attempts + excluded.attempts, last_error = excluded.last_error, "
+                "tree = excluded.tree, note = CASE WHEN excluded.status = 'passed' THEN NULL ELSE note END, "
+                "updated = excluded.updated",
+                (verdict.task, status, attempts, error, tree, time.time()),
+            )
+
+    def record_attempt(self, name: str, attempt: dict) -> None:
+        """Keep ``attempt`` as the task's latest failed attempt; the one before becomes previous."""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO attempts (name, current) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET previous = current, current = excluded.current",
+                (name, json.dumps(attempt)),
+            )
+
+    def attempts(self, name: str) -> tuple[dict | None, dict | None]:
+        """Return the task's previous and latest failed attempts."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT previous, current FROM attempts WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None:
+            return None, None
+        return tuple(json.loads(value) if value else None for value in row)
+
+    def session(self, name: str) -> dict | None:
+        """Return the task's Claude Code session and its running totals, if any."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT session_id, calls, turns, cost_usd FROM sessions WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("session_id", "calls", "turns", "cost_usd"), row))
+
+    def record_session(self, name: str, session_id: str | None, turns: int, cost_usd: float) -> None:
+        """Keep ``session_id`` as the task's session and add one call's turns and cost."""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO sessions (name, session_id, calls, turns, cost_usd, updated) "
+                "VALUES (?, ?, 1, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET "
+                "session_id = coalesce(excluded.session_id, session_id), calls = calls + 1, "
+                "turns = turns + excluded.turns, cost_usd = cost_usd + excluded.cost_usd, "
+                "updated = excluded.updated",
+                (name, session_id, turns, cost_usd, time.time()),
+            )
+
+    def forget_session(self, name: str) -> None:
+        """Start the task's next delegation in a new session; totals are kept."""
+        with self._lock, self._db:
+            self._db.execute("UPDATE sessions SET session_id = NULL WHERE name = ?", (name,))
+
+    def record_commit(self, name: str, commit_id: str, parent: str | None, files: list[str]) -> None:
+        """Map a checkpoint commit to the task it was made for (see :mod:`shepherd.checkpoint`)."""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO commits (name, commit_id, parent, files, created) VALUES (?, ?, ?, ?, ?)",
+                (name, commit_id, parent, json.dumps(files), time.time()),
+            )
+
+    def commits(self, name: str | None = None) -> list[dict]:
+        """Checkpoint commits of the task, or of every task, newest first."""
+        query = "SELECT name, commit_id, parent, files, created FROM commits"
+        with self._lock:
+            rows = self._db.execute(
+                query + (" WHERE name = ?" if name else "") + " ORDER BY created DESC, rowid DESC",
+                (name,) if name else (),
+            ).fetchall()
+        return [
+            {"task": task, "commit": commit, "parent": parent, "files": json.loads(files), "created": created}
+            for task, commit, parent, files, created in rows
+        ]
+
+    def reset(self, names: list[str] | None = None) -> None:
+        """Forget the given tasks, or every task."""
+        with self._lock, self._db:
+            for table in ("tasks", "attempts", "sessions", "commits"):
+                if names is None:
+                    self._db.execute(f"DELETE FROM {table}")
+                else:
+                    self._db.executemany(f"DELETE FROM {table} WHERE name = ?", [(n,) for n in names])
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def error_summary(verdict: Verdict) -> str:
+    """One line describing why a verification failed."""
+    if verdict.exit_code == 124:
+        return "timed out"
+    failures = [f for f in verdict.failures if f.get("test") not in verdict.quarantined]
+    if failures:
+        f = failures[0]
+        text = ": ".join(part for part in (f.get("error_type"), f.get("message")) if part)
+        text = text or f"{f.get('test')} failed"
+        if f.get("location"):
+            text += f" ({f['location']})"
+        if len(failures) > 1:
+            text += f" [+{len(failures) - 1} more]"
+    else:
+        lines = verdict.output.strip().splitlines()
+        text = lines[-1].strip() if lines else f"exit code {verdict.exit_code}"
+    return text if len(text) <= ERROR_LIMIT else text[: ERROR_LIMIT - 3] + "..."
+
+
+def record_verdicts(
+    root: str | Path,
+    working_dir: str | Path,
+    verdicts: list[Verdict],
+    cache: ResultCache | None = None,
+    config: dict | None = None,
+) -> None:
+    """Record ``verdicts`` in the store under ``root``, all against the current tree.
+
+    Fresh failures are also kept as attempts for :mod:`shepherd.retry`,
+    with a git snapshot of the working directory when it is in a repository.
+    Tasks that pass get their workspace snapshots replaced by a checkpoint
+    (see :mod:`shepherd.snapshots`). With the project's ``config``, tasks
+    that were not passing before are committed (see :mod:`shepherd.checkpoint`).
+    """
+    digests = cache or ResultCache.for_root(root)
+    try:
+        tree = digests.tree_digest(Path(root) / working_dir)
+    finally:
+        if digests is not cache:
+            digests.close()
+    failed = [v for v in verdicts if not v.passed and not v.cached]
+    git = git_snapshot(Path(root) / working_dir) if failed else None
+    store = StateStore.for_root(root)
+    try:
+        states = store.all()
+        newly = [v.task for v in verdicts if v.passed and (v.task not in states or states[v.task].status != "passed")]
+        for verdict in verdicts:
+            store.record(verdict, tree)
+        for verdict in failed:
+            store.record_attempt(
+                verdict.task,
+                {
+                    "exit_code": verdict.exit_code,
+                    "failures": [f for f in verdict.failures if f.get("test") not in verdict.quarantined],
+                    "tail": "\n".join(verdict.output.strip().splitlines()[-TAIL_LINES:]),
+                    "git": git,
+                },
+            )
+    finally:
+        store.close()
+    from shepherd import checkpoint, snapshots
+
+    if newly and checkpoint.enabled(config):
+        # Before the snapshots' checkpoint, which clears the edited files the commit may be limited to.
+        commands = {v.task: v.command for v in verdicts}
+        checkpoint.commit(root, Path(root) / working_dir, newly, config, commands)
+    passed = [v.task for v in verdicts if v.passed]
+    if passed:
+        snapshots.checkpoint(root, Path(root) / working_dir, passed, cache)
+
+
+def git_snapshot(workdir: str | Path) -> str | None:
+    """Write the working directory's current content to git; return the tree id.
+
+    A copy of the repository's index is used, so neither the index nor
+    HEAD change. Returns None when ``workdir`` is not inside a repository.
+    """
+    workdir = Path(workdir)
+    if not workdir.is_dir():
+        return None
+    index = run_git(workdir, "rev-parse", "--path-format=absolute", "--git-path", "index")
+    if index is None:
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "GIT_INDEX_FILE": os.path.join(tmp, "index")}
+        if os.path.exists(index):
+            shutil.copyfile(index, env["GIT_INDEX_FILE"])
+        if run_git(workdir, "add", "-A", "--", ".", env=env) is None:
+            return None
+        return run_git(workdir, "write-tree", env=env)
+
+
+def run_git(cwd: str | Path, *args: str, env: dict | None = None) -> str | None:
+    """Run git in ``cwd``; return its stripped stdout, or None if it failed."""
+    try:
+        result = subprocess.run(
+            ["git", *args], cwd=cwd, env=env, capture_output=True, text=True, timeout=GIT_TIMEOUT
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def snapshot(config: dict, store: StateStore, tree: str | None = None) -> dict:
+    """Summarize every project task's state, in project.yaml order.
+
+    Args:
+        tree: Digest of the working tree now; when given, the snapshot says
+            whether it still matches the last verification.
+    """
+    states = store.all()
+    tasks = []
+    for task in config.get("tasks") or []:
+        entry = asdict(states.get(task["name"]) or TaskState(task["name"]))
+        del entry["updated"], entry["tree"]
+        session = store.session(task["name"])
+        if session:
+            entry["turns"] = session["turns"]
+            entry["cost_usd"] = round(session["cost_usd"], 4)
+        if task.get("depends_on") and entry["status"] != "passed":
+            entry["depends_on"] = task["depends_on"]
+        tasks.append(entry)
+
+    counts = {status: sum(t["status"] == status for t in tasks) for status in STATUSES}
+    result = {
+        "project": config.get("name"),
+        "counts": {status: n for status, n in counts.items() if n},
+        "tasks": tasks,
+    }
+    verified = [s for s in states.values() if s.tree]
+    if tree is not None and verified:
+        # Every run records one tree for all its tasks; all trees differing means new changes.
+        result["tree_changed"] = all(s.tree != tree for s in verified)
+    return result
+
+
+def format_snapshot(snap: dict) -> str:
+    """Render a :func:`snapshot` as the few lines the PM reads on resume."""
+    counts = ", ".join(f"{n} {status.replace('_', ' ')}" for status, n in snap["counts"].items())
+    lines = [f"Project '{snap['project']}': {counts or 'no tasks'}"]
+    width = max((len(t["name"]) for t in snap["tasks"]), default=0)
+    for t in snap["tasks"]:
+        line = f"  {t['status']:<12} {t['name']:<{width}}"
+        if t["attempts"]:
+            line += f"  {t['attempts']} attempt{'s' if t['attempts'] != 1 else ''}"
+        if t.get("turns"):
+            line += f"  {t['turns']} turns ${t['cost_usd']:.2f}"
+        if t["status"] != "passed" and t["last_error"]:
+            line += f"  {t['last_error']}"
+        if t["note"]:
+            line += f"  note: {t['note']}"
+        if t.get("depends_on"):
+            line += f"  (after {', '.join(t['depends_on'])})"
+        lines.append(line.rstrip())
+    if snap.get("tree_changed"):
+        lines.append("Working tree changed since the last verification; re-verify before relying on it.")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show or update the persisted task state")
+    parser.add_argument(
+        "project_file",
+        nargs="?",
+        default="project.yaml",
+        help="Path to project.yaml (default: project.yaml)",
+    )
+    parser.add_argument(
+        "--set",
+        nargs=2,
+        metavar=("TASK", "STATUS"),
+        help=f"Set a task's status ({', '.join(STATUSES)})",
+    )
+    parser.add_argument("--note", help="Note stored with --set, e.g. why a task is blocked")
+    parser.add_argument(
+        "--keep-changes",
+        action="store_true",
+        help="With --set TASK blocked, leave the task's edits in the working directory",
+    )
+    parser.add_argument(
+        "--reset",
+        nargs="*",
+        metavar="TASK",
+        help="Forget the state of these tasks (no names: all tasks)",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the snapshot as JSON")
+    args = parser.parse_args()
+
+    try:
+        config = load_project(args.project_file)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+    root = Path.cwd()
+    workdir = root / config.get("working_directory", "./workspace")
+    names = {t["name"] for t in config.get("tasks") or []}
+    store = StateStore.for_root(root)
+    try:
+        if args.set:
+            task, status = args.set
+            if task not in names:
+                raise SystemExit(f"Error: no task named {task}")
+            try:
+                store.set_status(task, status, args.note)
+            except ValueError as e:
+                raise SystemExit(f"Error: {e}")
+            from shepherd import snapshots
+
+            if status == "in_progress":
+                snapshots.take(root, workdir, task, "in_progress")
+            elif status == "blocked" and not args.keep_changes and snapshots.entries(root, task):
+                updated = {n: s.updated for n, s in store.all().items()}
+                result = snapshots.rollback_blocked(root, workdir, task, updated)
+                print(snapshots.format_rollback(result), file=sys.stderr)
+        if args.reset is not None:
+            store.reset(args.reset or None)
+
+        cache = ResultCache.for_root(root)
+        try:
+            tree = cache.tree_digest(workdir)
+        finally:
+            cache.close()
+        snap = snapshot(config, store, tree)
+    finally:
+        store.close()
+    print(json.dumps(snap, indent=1) if args.json else format_snapshot(snap))
+
+
+if __name__ == "__main__":
+    main()
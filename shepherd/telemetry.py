@@ -0,0 +1,359 @@
+"""Spans for every phase of a run, to show which tasks cost time and money.
+
+Planning, delegation, verification and retries each record a span in
+``.shepherd/telemetry/spans.jsonl``: wall time, CPU time and peak RSS of
+the subprocesses it ran and, for delegations, model tokens and cost. Spans
+of one run share a run id, which doubles as the trace id. A new run starts
+after an hour without spans, with ``shepherd report --new-run``, or when
+``SHEPHERD_RUN_ID`` names one.
+
+``python -m shepherd report`` aggregates the spans of a run by phase and by
+task; ``--otlp FILE`` exports them as an OpenTelemetry (OTLP/JSON) trace
+file that Jaeger, Tempo or an OTel collector can import.
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import resource
+import secrets
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from shepherd.cache import STATE_DIR
+
+PHASES = ("plan", "delegate", "verify", "retry")
+
+# Seconds without spans after which the next span starts a new run.
+RUN_IDLE = 3600
+
+_parent: ContextVar[str | None] = ContextVar("shepherd_span", default=None)
+_run_id: str | None = None
+
+
+def telemetry_dir(root: str | Path) -> Path:
+    return Path(root) / STATE_DIR / "telemetry"
+
+
+@contextmanager
+def span(root: str | Path, name: str, task: str | None = None, **attrs):
+    """Record the enclosed block as a span named ``name``.
+
+    Yields the span's attribute dict, for the block to add tokens, cost or
+    outcomes to. CPU time covers the subprocesses the block waited for.
+    The kernel only keeps the peak RSS over all of them since the process
+    started, so ``max_rss_kb`` is set only when that peak rose during the
+    block, and is None otherwise. Telemetry never fails the block: write
+    errors are ignored.
+    """
+    span_id = secrets.token_hex(8)
+    entry = {"id": span_id, "parent": _parent.get(), "name": name, "task": task, "attrs": attrs}
+    token = _parent.set(span_id)
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start, clock = time.time(), time.perf_counter()
+    status = "ok"
+    try:
+        yield attrs
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        _parent.reset(token)
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu = after.ru_utime + after.ru_stime - before.ru_utime - before.ru_stime
+        entry.update(
+            start=round(start, 6),
+            duration=round(time.perf_counter() - clock, 6),
+            cpu=max(round(cpu, 6), 0.0),
+            # Kilobytes on Linux. A lifetime maximum, so only a rise is this span's.
+            max_rss_kb=after.ru_maxrss if after.ru_maxrss > before.ru_maxrss else None,
+            status=status,
+        )
+        write(root, entry)
+
+
+def record(
+    root: str | Path,
+    name: str,
+    start: float,
+    duration: float,
+    task: str | None = None,
+    status: str = "ok",
+    **attrs,
+) -> None:
+    """Record a span that was measured elsewhere, e.g. one task of a parallel run."""
+    write(
+        root,
+        {
+            "id": secrets.token_hex(8),
+            "parent": _parent.get(),
+            "name": name,
+            "task": task,
+            "attrs": attrs,
+            "start": round(start, 6),
+            "duration": round(duration, 6),
+            "cpu": None,
+            "max_rss_kb": None,
+            "status": status,
+        },
+    )
+
+
+def write(root: str | Path, entry: dict) -> None:
+    """Append the span ``entry`` to the spans file, assigning the current run id."""
+    global _run_id
+    directory = telemetry_dir(root)
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / "spans.jsonl", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            if _run_id is None:
+                _run_id = _current_run(directory)
+            f.write(json.dumps({"run": _run_id, **entry}, separators=(",", ":")) + "\n")
+            (directory / "run.json").write_text(json.dumps({"id": _run_id, "last": time.time()}))
+    except OSError:
+        pass
+
+
+def new_run(root: str | Path) -> str:
+    """Start a new run; later spans belong to it."""
+    global _run_id
+    directory = telemetry_dir(root)
+    directory.mkdir(parents=True, exist_ok=True)
+    _run_id = secrets.token_hex(16)
+    (directory / "run.json").write_text(json.dumps({"id": _run_id, "last": time.time()}))
+    return _run_id
+
+
+def load(root: str | Path) -> list[dict]:
+    """Every recorded span, oldest first; torn lines are skipped."""
+    path = telemetry_dir(root) / "spans.jsonl"
+    if not path.exists():
+        return []
+    spans = []
+    with open(path) as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except ValueError:
+                continue
+    return spans
+
+
+def runs(spans: list[dict]) -> list[dict]:
+    """One entry per run, oldest first: id, start, wall time, spans, cost."""
+    out: dict[str, dict] = {}
+    for s in spans:
+        run = out.setdefault(s["run"], {"run": s["run"], "start": s["start"], "end": s["start"], "spans": 0, "cost_usd": 0.0})
+        run["start"] = min(run["start"], s["start"])
+        run["end"] = max(run["end"], s["start"] + s["duration"])
+        run["spans"] += 1
+        run["cost_usd"] += s["attrs"].get("cost_usd") or 0
+    for run in out.values():
+        run["wall"] = round(run.pop("end") - run["start"], 3)
+        run["cost_usd"] = round(run["cost_usd"], 6)
+    return sorted(out.values(), key=lambda r: r["start"])
+
+
+def aggregate(spans: list[dict]) -> dict:
+    """Totals by phase (top-level spans only) and by task.
+
+    Returns:
+        ``{"wall", "cost_usd", "tokens_in", "tokens_out", "phases", "tasks"}``;
+        each phase and task holds count, wall, cpu, peak RSS, cost and tokens.
+    """
+    phases: dict[str, dict] = {}
+    tasks: dict[str, dict] = {}
+    for s in spans:
+        if s["parent"] is None:
+            _add(phases.setdefault(s["name"], _totals()), s)
+        if s.get("task"):
+            entry = tasks.setdefault(s["task"], {**_totals(), "phases": {}})
+            _add(entry, s)
+            entry["phases"][s["name"]] = entry["phases"].get(s["name"], 0) + 1
+    top = [s for s in spans if s["parent"] is None]
+    start = min((s["start"] for s in spans), default=0)
+    end = max((s["start"] + s["duration"] for s in spans), default=0)
+    return {
+        "wall": round(end - start, 3),
+        "cost_usd": round(sum(s["attrs"].get("cost_usd") or 0 for s in top), 6),
+        "tokens_in": sum(s["attrs"].get("tokens_in") or 0 for s in top),
+        "tokens_out": sum(s["attrs"].get("tokens_out") or 0 for s in top),
+        "phases": {name: _round(t) for name, t in sorted(phases.items(), key=_phase_order)},
+        "tasks": {
+            name: _round(t)
+            for name, t in sorted(tasks.items(), key=lambda kv: (-kv[1]["cost_usd"], -kv[1]["wall"]))
+        },
+    }
+
+
+def to_otlp(spans: list[dict]) -> dict:
+    """Convert spans to an OTLP/JSON ``TracesData`` document."""
+    out = []
+    for s in spans:
+        attrs = {"shepherd.phase": s["name"], "shepherd.task": s.get("task")}
+        for key, value in s["attrs"].items():
+            attrs[_OTEL_NAMES.get(key, f"shepherd.{key}")] = value
+        attrs["shepherd.cpu_seconds"] = s.get("cpu")
+        attrs["shepherd.max_rss_kb"] = s.get("max_rss_kb")
+        start = int(s["start"] * 1e9)
+        otel = {
+            "traceId": _trace_id(s["run"]),
+            "spanId": s["id"],
+            "name": f"{s['name']} {s['task']}" if s.get("task") else s["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(start),
+            "endTimeUnixNano": str(start + int(s["duration"] * 1e9)),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)} for key, value in attrs.items() if value is not None
+            ],
+            "status": {"code": 2 if s["status"] == "error" else 1},
+        }
+        if s["parent"]:
+            otel["parentSpanId"] = s["parent"]
+        out.append(otel)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "shepherd"}}]},
+                "scopeSpans": [{"scope": {"name": "shepherd"}, "spans": out}],
+            }
+        ]
+    }
+
+
+def format_report(run: str, report: dict) -> str:
+    """Human-readable report of one run's :func:`aggregate`."""
+    lines = [
+        f"Run {run[:12]}: {report['wall']:.0f}s wall, ${report['cost_usd']:.4f}, "
+        f"{report['tokens_in']} tokens in / {report['tokens_out']} out",
+        "",
+        f"{'phase':<10} {'count':>5} {'wall s':>9} {'cpu s':>8} {'peak MB':>8} {'cost $':>9}",
+    ]
+    for name, t in report["phases"].items():
+        lines.append(f"{name:<10} {t['count']:>5} {t['wall']:>9.1f} {t['cpu']:>8.1f} {_mb(t):>8} {t['cost_usd']:>9.4f}")
+    if report["tasks"]:
+        lines += ["", f"{'task':<24} {'calls':>5} {'wall s':>9} {'cpu s':>8} {'peak MB':>8} {'cost $':>9}  phases"]
+        for name, t in report["tasks"].items():
+            phases = ", ".join(f"{p} {n}" for p, n in t["phases"].items())
+            lines.append(
+                f"{name[:24]:<24} {t['count']:>5} {t['wall']:>9.1f} {t['cpu']:>8.1f} {_mb(t):>8} {t['cost_usd']:>9.4f}  {phases}"
+            )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate recorded spans into a cost and time report")
+    which = parser.add_mutually_exclusive_group()
+    which.add_argument("--run", metavar="ID", help="Report this run (a prefix is enough; default: the latest)")
+    which.add_argument("--all", action="store_true", help="Report all runs together")
+    which.add_argument("--runs", action="store_true", help="List the recorded runs")
+    which.add_argument("--new-run", action="store_true", help="Start a new run and exit")
+    parser.add_argument("--otlp", metavar="FILE", help="Also write the spans as an OTLP/JSON trace file")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    root = Path.cwd()
+    if args.new_run:
+        print(new_run(root))
+        return
+    spans = load(root)
+    if not spans:
+        raise SystemExit("Error: no spans recorded yet")
+    listed = runs(spans)
+    if args.runs:
+        if args.json:
+            print(json.dumps(listed, indent=1))
+            return
+        for run in listed:
+            started = time.strftime("%Y-%m-%d %H:%M", time.localtime(run["start"]))
+            print(f"{run['run'][:12]}  {started}  {run['wall']:>8.0f}s  {run['spans']:>5} spans  ${run['cost_usd']:.4f}")
+        return
+
+    if args.all:
+        run = "all"
+    else:
+        matches = [r["run"] for r in listed if r["run"].startswith(args.run or "")]
+        if not matches:
+            raise SystemExit(f"Error: no run {args.run}")
+        run = matches[-1]
+        spans = [s for s in spans if s["run"] == run]
+    if args.otlp:
+        Path(args.otlp).write_text(json.dumps(to_otlp(spans)))
+        print(f"wrote {len(spans)} spans to {args.otlp}", file=sys.stderr)
+    report = aggregate(spans)
+    if args.json:
+        print(json.dumps({"run": run, **report}, indent=1))
+    else:
+        print(format_report(run, report))
+
+
+_OTEL_NAMES = {
+    "model": "gen_ai.request.model",
+    "tokens_in": "gen_ai.usage.input_tokens",
+    "tokens_out": "gen_ai.usage.output_tokens",
+}
+
+
+def _current_run(directory: Path) -> str:
+    env = os.environ.get("SHEPHERD_RUN_ID")
+    if env:
+        return env
+    try:
+        state = json.loads((directory / "run.json").read_text())
+        if time.time() - state["last"] < RUN_IDLE:
+            return state["id"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return secrets.token_hex(16)
+
+
+def _totals() -> dict:
+    return {"count": 0, "wall": 0.0, "cpu": 0.0, "max_rss_kb": 0, "cost_usd": 0.0, "tokens_in": 0, "tokens_out": 0}
+
+
+def _add(totals: dict, span: dict) -> None:
+    totals["count"] += 1
+    totals["wall"] += span["duration"]
+    totals["cpu"] += span.get("cpu") or 0
+    totals["max_rss_kb"] = max(totals["max_rss_kb"], span.get("max_rss_kb") or 0)
+    for key in ("cost_usd", "tokens_in", "tokens_out"):
+        totals[key] += span["attrs"].get(key) or 0
+
+
+def _round(totals: dict) -> dict:
+    return {**totals, "wall": round(totals["wall"], 3), "cpu": round(totals["cpu"], 3), "cost_usd": round(totals["cost_usd"], 6)}
+
+
+def _phase_order(item: tuple[str, dict]) -> tuple:
+    return (PHASES.index(item[0]) if item[0] in PHASES else len(PHASES), item[0])
+
+
+def _mb(totals: dict) -> str:
+    return f"{totals['max_rss_kb'] / 1024:.0f}" if totals["max_rss_kb"] else "-"
+
+
+def _trace_id(run: str) -> str:
+    # OTLP wants 32 hex digits; a SHEPHERD_RUN_ID of another shape is hashed.
+    if len(run) == 32 and all(c in "0123456789abcdef" for c in run):
+        return run
+    return hashlib.md5(run.encode()).hexdigest()
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+if __name__ == "__main__":
+    main()
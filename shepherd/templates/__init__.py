@@ -0,0 +1,415 @@
+"""Templates for .deepagents/ scaffolding, stored as package data.
+
+Each template is a file at the path it is scaffolded to below
+``.deepagents/``. ``manifest.json`` lists them in scaffolding order with
+their size and SHA-256, so :mod:`shepherd.init` knows what to create
+without importing or reading any template. Contents are only read for
+files that are actually written.
+
+Templates are rendered against the project config by :func:`render`:
+
+- ``<working_dir>`` becomes the project's working directory.
+- A ``<!-- project -->`` ... ``<!-- end project -->`` block is replaced by
+  the project's name, description, deadline and tasks, so the PM agent
+  does not spend a turn reading and parsing project.yaml.
+- ``<!-- stack: NAME -->`` ... ``<!-- end stack -->`` blocks are dropped
+  unless the project uses that stack (python, node, go or rust), judged
+  from its commands and descriptions. If no stack is recognised, all
+  blocks are kept.
+
+Skills can be trimmed for cost- and latency-sensitive runs: project.yaml's
+``skills`` lists the skills to generate, and ``skill_token_budget`` caps
+their combined size. To fit the budget, the largest skills are rendered as
+``compact`` variants (prose, lists, tables and one short example per
+section) and then as ``minimal`` ones (headings and the first paragraph of
+each section, with the example or list it introduces). Token counts are estimates, at about four bytes per token.
+
+The module-level ``*_MD`` constants of the former ``templates.py`` are still
+available, loaded on first access and rendered without a config. After
+editing a template, regenerate the manifest with
+``python -m shepherd.templates``.
+
+``history/<n>/`` keeps what releases before per-file scaffold records wrote
+to each path, oldest first; the manifest lists their hashes under
+``history``, so :mod:`shepherd.init` can recognise an unedited file from
+one of them and merge template changes into an edited one.
+"""
+
+import hashlib
+import json
+import re
+from functools import cache
+from pathlib import Path
+
+TEMPLATE_DIR = Path(__file__).parent
+MANIFEST_FILE = "manifest.json"
+HISTORY_DIR = TEMPLATE_DIR / "history"
+
+# Bump when render() output changes for the same templates and config.
+RENDER_VERSION = 2
+
+STACKS = {
+    "python": re.compile(r"\bpython3?\b|\bpytest\b|\bpip\b|\bflask\b|\bdjango\b|\bfastapi\b|\.py\b", re.I),
+    "node": re.compile(
+        r"\bnode\b|\bnpm\b|\bnpx\b|\byarn\b|\bpnpm\b|\bjest\b|\bvitest\b|\bexpress\b|\breact\b"
+        r"|\btypescript\b|\.[jt]sx?\b",
+        re.I,
+    ),
+    "go": re.compile(r"\bgo (test|build|run|vet|mod|get)\b|\bgolang\b|\bgo\.mod\b|\.go\b", re.I),
+    "rust": re.compile(r"\bcargo\b|\brust\b|\.rs\b", re.I),
+}
+
+VARIANTS = ("full", "compact", "minimal")
+
+# Bytes per token used by estimate_tokens().
+BYTES_PER_TOKEN = 4
+
+# Lines of code kept from the one example per section in a compact skill.
+COMPACT_CODE_LINES = 6
+
+_STACK_START = re.compile(r"^<!-- stack: (\w+) -->$")
+_STACK_END = "<!-- end stack -->"
+_PROJECT_START = "<!-- project -->"
+_PROJECT_END = "<!-- end project -->"
+
+# Former constant names -> template paths.
+NAMES = {
+    "PM_AGENTS_MD": "AGENTS.md",
+    "DEVELOPER_AGENTS_MD": "agents/developer/AGENTS.md",
+    "CLAUDE_CODE_SKILL_MD": "skills/claude-code/SKILL.md",
+    "TEST_RUNNER_SKILL_MD": "skills/test-runner/SKILL.md",
+    "TASK_DECOMPOSITION_SKILL_MD": "skills/task-decomposition/SKILL.md",
+    "CODE_REVIEW_SKILL_MD": "skills/code-review/SKILL.md",
+    "DEBUGGING_SKILL_MD": "skills/debugging/SKILL.md",
+    "ENVIRONMENT_SETUP_SKILL_MD": "skills/environment-setup/SKILL.md",
+    "DEPENDENCY_MANAGEMENT_SKILL_MD": "skills/dependency-management/SKILL.md",
+    "GIT_WORKFLOW_SKILL_MD": "skills/git-workflow/SKILL.md",
+    "PROGRESS_REPORTING_SKILL_MD": "skills/progress-reporting/SKILL.md",
+    "ERROR_ANALYSIS_SKILL_MD": "skills/error-analysis/SKILL.md",
+}
+
+
+@cache
+def manifest() -> dict[str, dict]:
+    """Return ``{path: {"size": ..., "sha256": ...}}`` in scaffolding order."""
+    return json.loads((TEMPLATE_DIR / MANIFEST_FILE).read_text())
+
+
+def read_bytes(path: str) -> bytes:
+    """Return the raw content of the template scaffolded to ``path``."""
+    if path not in manifest():
+        raise KeyError(f"no template for '{path}'")
+    return (TEMPLATE_DIR / path).read_bytes()
+
+
+@cache
+def read(path: str) -> str:
+    return read_bytes(path).decode()
+
+
+def earlier_render(path: str, sha256: str | None = None) -> bytes | None:
+    """What an earlier release scaffolded to ``path``: the one with ``sha256``, else the latest.
+
+    Returns None if no earlier release wrote ``path`` (or none with that hash).
+    """
+    history = manifest()[path].get("history") or []
+    if not history or (sha256 is not None and sha256 not in history):
+        return None
+    version = history.index(sha256) if sha256 is not None else len(history) - 1
+    return (_history_versions()[version] / path).read_bytes()
+
+
+def detect_stacks(config: dict) -> set[str] | None:
+    """Return the stacks a project uses, or None if none is recognisable."""
+    texts = [str(config.get("description") or "")]
+    for task in config.get("tasks") or []:
+        texts += [str(task.get("description") or ""), str(task.get("test_command") or "")]
+        texts += [str(stage.get("command") or "") for stage in task.get("stages") or [] if isinstance(stage, dict)]
+    text = "\n".join(texts)
+    stacks = {name for name, pattern in STACKS.items() if pattern.search(text)}
+    return stacks or None
+
+
+def skill_names() -> list[str]:
+    return [path.split("/")[1] for path in manifest() if path.startswith("skills/")]
+
+
+def skill_path(name: str) -> str:
+    return f"skills/{name}/SKILL.md"
+
+
+def validate(config: dict) -> None:
+    """Check the ``skills`` and ``skill_token_budget`` options of a project.
+
+    Raises:
+        ValueError: On an unknown skill or a budget that is not a positive integer.
+    """
+    skills = config.get("skills")
+    if skills is not None:
+        if not isinstance(skills, list):
+            raise ValueError("'skills' must be a list of skill names")
+        unknown = [name for name in skills if name not in skill_names()]
+        if unknown:
+            raise ValueError(
+                f"unknown skill(s) {', '.join(map(str, unknown))} (available: {', '.join(skill_names())})"
+            )
+    budget = config.get("skill_token_budget")
+    if budget is not None and (not isinstance(budget, int) or isinstance(budget, bool) or budget < 1):
+        raise ValueError(f"skill_token_budget must be a positive integer, got {budget!r}")
+
+
+def estimate_tokens(text: str | bytes) -> int:
+    """Rough token count of ``text``; no tokenizer is needed."""
+    size = len(text.encode() if isinstance(text, str) else text)
+    return -(-size // BYTES_PER_TOKEN)
+
+
+def skill_variants(config: dict) -> dict[str, str]:
+    """Choose which skills to generate and in which variant.
+
+    Returns:
+        ``{template path: variant}`` for the selected skills. Without a
+        budget every skill is ``full``; with one, the largest skills are
+        compacted a step at a time until the total fits. If the budget
+        cannot be met even with every skill minimal, minimal variants are
+        returned anyway.
+    """
+    names = config.get("skills")
+    paths = [skill_path(name) for name in (skill_names() if names is None else names)]
+    variants = {path: "full" for path in paths}
+    budget = config.get("skill_token_budget")
+    if not budget:
+        return variants
+
+    sizes: dict[tuple[str, str], int] = {}
+
+    def size(path: str) -> int:
+        key = (path, variants[path])
+        if key not in sizes:
+            sizes[key] = estimate_tokens(render(path, config, variants[path]))
+        return sizes[key]
+
+    while sum(size(path) for path in paths) > budget:
+        shrinkable = [path for path in paths if variants[path] != VARIANTS[-1]]
+        if not shrinkable:
+            break
+        largest = max(shrinkable, key=size)
+        variants[largest] = VARIANTS[VARIANTS.index(variants[largest]) + 1]
+    return variants
+
+
+def compact(text: str, variant: str) -> str:
+    """Shrink a rendered skill; the frontmatter and all headings are kept.
+
+    ``compact`` keeps prose, lists and tables plus the first code example
+    of each section, cut to :data:`COMPACT_CODE_LINES`. ``minimal`` keeps
+    only the first prose or list block of each section, plus the block it
+    introduces when it ends with a colon.
+    """
+    if variant == "full":
+        return text
+    if variant not in VARIANTS:
+        raise ValueError(f"unknown variant '{variant}'")
+    lines = text.split("\n")
+    front: list[str] = []
+    if lines and lines[0] == "---":
+        end = lines.index("---", 1) + 1
+        front, lines = lines[:end], lines[end:]
+
+    out = list(front)
+    for heading, blocks in _sections(lines):
+        if heading is not None:
+            if out and out[-1]:
+                out.append("")
+            out += [heading, ""]
+        kept: list[list[str]] = []
+        code_seen = False
+        lead_in = False
+        for block in blocks:
+            # A kept block ending in ":" ("Run the tests with:") needs the block it introduces.
+            follows, lead_in = lead_in, False
+            if block[0].startswith("```"):
+                if code_seen or (variant == "minimal" and not follows):
+                    continue
+                code_seen = True
+                if len(block) > COMPACT_CODE_LINES + 2:
+                    block = block[: COMPACT_CODE_LINES + 1] + ["...", block[-1]]
+            elif variant == "minimal" and not follows and (kept or block[0].startswith("|")):
+                continue
+            kept.append(block)
+            lead_in = variant == "minimal" and block[-1].rstrip().endswith(":")
+        for block in kept:
+            out += block + [""]
+    while out and not out[-1]:
+        out.pop()
+    return "\n".join(out) + "\n"
+
+
+def config_key(config: dict) -> str:
+    """Hash of the config and renderer version, shared by every template's :func:`render_key`."""
+    h = hashlib.sha256()
+    h.update(json.dumps(config, sort_keys=True, default=str).encode())
+    h.update(str(RENDER_VERSION).encode())
+    return h.hexdigest()
+
+
+def render_key(key: str, path: str, variant: str = "full") -> str:
+    """Hash of everything one rendered file depends on: config, template content, variant."""
+    return hashlib.sha256(f"{key}:{manifest()[path]['sha256']}:{variant}".encode()).hexdigest()
+
+
+def render(path: str, config: dict | None = None, variant: str = "full") -> str:
+    """Render the template at ``path`` for a project, or generically if ``config`` is None.
+
+    ``variant`` selects a :func:`compact` form of the rendered text.
+    """
+    stacks = detect_stacks(config) if config is not None else None
+    out: list[str] = []
+    skipping = False
+    dropped = False
+    in_fence = False
+    lines = iter(read(path).split("\n"))
+    for line in lines:
+        match = _STACK_START.match(line)
+        if match:
+            skipping = stacks is not None and match.group(1) not in stacks
+            dropped = dropped or skipping
+            continue
+        if line == _STACK_END:
+            skipping = False
+            continue
+        if line == _PROJECT_START:
+            block = list(_until(lines, _PROJECT_END))
+            out.extend(block if config is None else project_section(config).split("\n"))
+            continue
+        if skipping:
+            continue
+        if dropped:
+            # Close the gap a dropped block leaves behind.
+            if not line and (not out or not out[-1] or (in_fence and out[-1].startswith("```"))):
+                continue
+            if line.startswith("```") and in_fence and out and not out[-1]:
+                out.pop()
+            dropped = False
+        if line.startswith("```"):
+            in_fence = not in_fence
+        out.append(line)
+    text = "\n".join(out)
+    if config is not None:
+        text = text.replace("<working_dir>", str(config.get("working_directory", "./workspace")))
+    return compact(text, variant)
+
+
+def project_section(config: dict) -> str:
+    """Markdown summary of project.yaml that replaces a ``<!-- project -->`` block."""
+    lines = [
+        "## Project",
+        "",
+        "This is the project specification from project.yaml, inlined when this file was generated, so there "
+        "is no need to read project.yaml. If project.yaml has changed since, re-run "
+        "`python -m shepherd init` to refresh it.",
+        "",
+        f"- **Name**: {config['name']}",
+        f"- **Working directory**: `{config.get('working_directory', './workspace')}`",
+    ]
+    if config.get("deadline"):
+        lines.append(f"- **Deadline**: {config['deadline']}")
+    if config.get("max_parallel"):
+        lines.append(f"- **Max parallel**: {config['max_parallel']}")
+    if config.get("speculative"):
+        lines.append(f"- **Speculative retries**: {config['speculative']} candidates")
+    if config.get("description"):
+        lines += ["", str(config["description"]).strip()]
+    lines += ["", "### Tasks", ""]
+    tasks = config.get("tasks") or []
+    if not tasks:
+        lines.append("No tasks are predefined. Break the description down into tasks yourself.")
+    for i, task in enumerate(tasks, 1):
+        depends_on = task.get("depends_on")
+        if isinstance(depends_on, str):
+            depends_on = [depends_on]
+        after = f" (after: {', '.join(depends_on)})" if depends_on else ""
+        lines.append(f"{i}. **{task['name']}**{after}")
+        for text in str(task.get("description") or "").strip().splitlines():
+            lines.append(f"   {text}".rstrip())
+        for stage in task.get("stages") or []:
+            lines.append(f"   - Stage ({stage.get('tier', 'auto')}): `{stage.get('command')}`")
+        if task.get("test_command"):
+            lines.append(f"   - Test: `{task['test_command']}`")
+        else:
+            lines.append("   - Test: none defined")
+        if "speculative" in task:
+            lines.append(f"   - Speculative retries: {task['speculative'] or 'off'}")
+    return "\n".join(lines)
+
+
+def build_manifest() -> dict[str, dict]:
+    """Compute the manifest from the template files on disk."""
+    entries = {}
+    for path in NAMES.values():
+        data = (TEMPLATE_DIR / path).read_bytes()
+        entries[path] = {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+        history = [hashlib.sha256((v / path).read_bytes()).hexdigest() for v in _history_versions()]
+        if history:
+            entries[path]["history"] = history
+    return entries
+
+
+def _history_versions() -> list[Path]:
+    """``history/<n>/`` directories, oldest first; every one holds every template path."""
+    if not HISTORY_DIR.is_dir():
+        return []
+    return sorted((d for d in HISTORY_DIR.iterdir() if d.name.isdigit()), key=lambda d: int(d.name))
+
+
+def __getattr__(name: str) -> str:
+    if name in NAMES:
+        return render(NAMES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *NAMES])
+
+
+def _until(lines, end: str):
+    for line in lines:
+        if line == end:
+            return
+        yield line
+
+
+def _sections(lines: list[str]):
+    """Yield ``(heading, blocks)`` per Markdown section; blocks are split on blank lines."""
+    heading = None
+    blocks: list[list[str]] = []
+    block: list[str] = []
+    in_fence = False
+    for line in lines:
+        if line.startswith("```"):
+            if not in_fence and block:
+                blocks.append(block)
+                block = []
+            in_fence = not in_fence
+            block.append(line)
+            if not in_fence:
+                blocks.append(block)
+                block = []
+            continue
+        if in_fence:
+            block.append(line)
+        elif line.startswith("#"):
+            if block:
+                blocks.append(block)
+                block = []
+            yield heading, blocks
+            heading, blocks = line, []
+        elif not line.strip():
+            if block:
+                blocks.append(block)
+                block = []
+        else:
+            block.append(line)
+    if block:
+        blocks.append(block)
+    yield heading, blocks
@@ -0,0 +1,9 @@
+"""Regenerate templates/manifest.json: ``python -m shepherd.templates``."""
+
+import json
+
+from shepherd.templates import MANIFEST_FILE, TEMPLATE_DIR, build_manifest
+
+path = TEMPLATE_DIR / MANIFEST_FILE
+path.write_text(json.dumps(build_manifest(), indent=1) + "\n")
+print(f"wrote {path}")
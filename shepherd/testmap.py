@@ -0,0 +1,151 @@
+"""Incremental re-verification: run only the tests a change can affect.
+
+During a full pytest run the :mod:`shepherd.testmap_plugin` records which
+working-directory files each test executed. On the next verification of the
+same task, the files that changed since that run select the affected tests,
+which are run first. Only if they pass is the full test_command run again,
+so a retry that is still broken fails in seconds rather than minutes.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+
+import shepherd
+from shepherd.cache import STATE_DIR, ResultCache
+from shepherd.verify import Verdict, cached_verdict, verify
+from shepherd.warm import WarmPool
+
+_PYTEST = re.compile(r"\b(pytest|py\.test)\b")
+_TEST_FILE = re.compile(r"(^|/)(test_[^/]*|[^/]*_test)\.py$")
+
+
+def is_pytest(command: str) -> bool:
+    return bool(_PYTEST.search(command))
+
+
+def changed_files(before: dict[str, str], after: dict[str, str]) -> set[str]:
+    """Return paths that were added, removed or modified between two digest maps."""
+    return {path for path in before.keys() | after.keys() if before.get(path) != after.get(path)}
+
+
+def affected_tests(tests: dict[str, dict], changed: set[str]) -> list[str] | None:
+    """Select the node IDs whose recorded dependencies intersect ``changed``.
+
+    Returns None when the map cannot answer safely and the full command must
+    run instead: a ``conftest.py`` changed, or a test file the map has never
+    seen was added or modified.
+    """
+    known_files = {entry["file"] for entry in tests.values()}
+    for path in changed:
+        if path.endswith("conftest.py"):
+            return None
+        if _TEST_FILE.search(path) and path not in known_files:
+            return None
+    return sorted(nodeid for nodeid, entry in tests.items() if changed.intersection(entry["deps"]))
+
+
+def verify_incremental(
+    task: str,
+    command: str,
+    root: str | Path,
+    working_dir: str | Path,
+    cache: ResultCache | None = None,
+    timeout: float | None = None,
+    warm: WarmPool | None = None,
+) -> Verdict:
+    """Verify a task, running affected tests before the full command.
+
+    Non-pytest commands fall through to :func:`shepherd.verify.verify`. A
+    failing affected-test run is returned with ``partial=True`` and is not
+    cached, since it is not the verdict of the full command.
+    """
+    if not is_pytest(command):
+        return verify(task, command, root, working_dir, cache, timeout, warm=warm)
+
+    workdir = (Path(root) / working_dir).resolve()
+    memo = cache if cache is not None else ResultCache.for_root(root)
+    state_path = _state_path(root, task, command)
+    state = json.loads(state_path.read_text()) if state_path.exists() else None
+
+    if cache is not None:
+        hit = cached_verdict(task, command, root, working_dir, cache)
+        if hit is not None:
+            return hit
+
+    tests = state["tests"] if state else {}
+    if state:
+        selected = affected_tests(tests, changed_files(state["files"], memo.file_digests(workdir)))
+        if selected:
+            partial, recorded = _run_recorded(task, command, root, working_dir, workdir, timeout, selected, warm=warm)
+            tests.update(recorded)
+            if not partial.passed and partial.exit_code != 5:  # 5: no tests collected
+                partial.partial = True
+                partial.output = f"[incremental: {len(selected)} affected test(s)]\n{partial.output}"
+                _save(state_path, tests, memo.file_digests(workdir))
+                return partial
+
+    verdict, recorded = _run_recorded(task, command, root, working_dir, workdir, timeout, cache=cache, warm=warm)
+    if recorded:
+        tests = recorded
+    _save(state_path, tests, memo.file_digests(workdir))
+    return verdict
+
+
+def plugin_env(
+    workdir: str | Path,
+    record_to: str | Path | None = None,
+    select_file: str | Path | None = None,
+    pytest_args: str = "",
+) -> dict[str, str]:
+    """Environment that loads :mod:`shepherd.testmap_plugin` into a pytest command.
+
+    Args:
+        workdir: Working directory; only files below it are recorded.
+        record_to: Directory to write the per-test file map into, if any.
+        select_file: File listing the node IDs to run, if any.
+        pytest_args: Extra options appended to ``PYTEST_ADDOPTS``.
+    """
+    package_parent = str(Path(shepherd.__file__).resolve().parent.parent)
+    addopts = f"-p shepherd.testmap_plugin {pytest_args} {os.environ.get('PYTEST_ADDOPTS', '')}"
+    env = {
+        "SHEPHERD_WORKDIR": str(Path(workdir).resolve()),
+        "PYTEST_ADDOPTS": " ".join(addopts.split()),
+        "PYTHONPATH": os.pathsep.join(filter(None, [package_parent, os.environ.get("PYTHONPATH")])),
+    }
+    if record_to is not None:
+        env["SHEPHERD_TESTMAP_OUT"] = str(record_to)
+    if select_file is not None:
+        env["SHEPHERD_SELECT"] = str(select_file)
+    return env
+
+
+def _run_recorded(task, command, root, working_dir, workdir, timeout, selected=None, cache=None, warm=None):
+    out = tempfile.mkdtemp(prefix="shepherd-testmap-")
+    try:
+        select_file = None
+        if selected is not None:
+            select_file = Path(out) / "select.txt"
+            select_file.write_text("\n".join(selected))
+        env = plugin_env(workdir, record_to=out, select_file=select_file)
+        verdict = verify(task, command, root, working_dir, cache, timeout, env, warm)
+        recorded = {}
+        for path in Path(out).glob("[0-9]*.json"):
+            recorded.update(json.loads(path.read_text()))
+        return verdict, recorded
+    finally:
+        shutil.rmtree(out, ignore_errors=True)
+
+
+def _state_path(root, task: str, command: str) -> Path:
+    key = hashlib.sha256(f"{task}\0{command}".encode()).hexdigest()[:16]
+    return Path(root) / STATE_DIR / "testmap" / f"{key}.json"
+
+
+def _save(path: Path, tests: dict, files: dict[str, str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"tests": tests, "files": files}))
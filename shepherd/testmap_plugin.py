@@ -0,0 +1,79 @@
+"""Pytest plugin that records the files each test executes and selects tests by ID.
+
+Loaded by :mod:`shepherd.testmap` via ``PYTEST_ADDOPTS="-p shepherd.testmap_plugin"``
+and controlled entirely through environment variables:
+
+- ``SHEPHERD_WORKDIR``: only files under this directory are recorded.
+- ``SHEPHERD_TESTMAP_OUT``: directory to write ``{nodeid: {...}}`` JSON into.
+- ``SHEPHERD_SELECT``: file with one node ID per line; all other tests are
+  deselected.
+"""
+
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+_workdir = os.environ.get("SHEPHERD_WORKDIR")
+_out = os.environ.get("SHEPHERD_TESTMAP_OUT")
+_select = os.environ.get("SHEPHERD_SELECT")
+_recorded: dict[str, dict] = {}
+
+
+def _relative(filename: str) -> str | None:
+    if filename.startswith("<"):
+        return None
+    try:
+        return Path(filename).resolve().relative_to(_workdir).as_posix()
+    except ValueError:
+        return None
+
+
+def pytest_collection_modifyitems(config, items):
+    if not _select:
+        return
+    wanted = set(Path(_select).read_text().split("\n")) - {""}
+    keep = [item for item in items if item.nodeid in wanted]
+    dropped = [item for item in items if item.nodeid not in wanted]
+    if dropped:
+        config.hook.pytest_deselected(items=dropped)
+        items[:] = keep
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    if not (_out and _workdir):
+        yield
+        return
+
+    seen = set()
+
+    # A global trace function only sees "call" events; returning None skips
+    # line tracing inside the frame, which keeps the overhead small.
+    def tracer(frame, event, arg):
+        seen.add(frame.f_code.co_filename)
+
+    previous = sys.gettrace()
+    sys.settrace(tracer)
+    threading.settrace(tracer)
+    try:
+        yield
+    finally:
+        sys.settrace(previous)
+        threading.settrace(None)
+
+    test_file = _relative(str(item.path))
+    files = {rel for rel in map(_relative, seen) if rel}
+    if test_file:
+        files.add(test_file)
+    _recorded[item.nodeid] = {"file": test_file, "deps": sorted(files)}
+
+
+def pytest_sessionfinish(session):
+    if _out and _recorded:
+        os.makedirs(_out, exist_ok=True)
+        with open(os.path.join(_out, f"{os.getpid()}.json"), "w") as f:
+            json.dump(_recorded, f)
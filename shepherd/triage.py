@@ -0,0 +1,160 @@
+"""Deterministic multi-error triage of structured test failures.
+
+Applies the rules of the error-analysis skill's "Multi-Error Triage"
+section without a model turn:
+
+1. Sort by dependency: import/compile errors, then runtime errors, then
+   assertion failures.
+2. Group related failures: failures with the same error type raised at the
+   same frame (or with the same message when there is no frame) are one
+   root cause.
+3. Fold cascades: a failure whose traceback passes through a file that
+   failed to import or compile at collection time is attributed to that
+   error. An import error raised inside one test's body breaks only that
+   test, so other failures in the same file stay independent.
+4. Order what is left, most widespread first within a category, so the
+   first entry is the one thing to fix on the next retry.
+"""
+
+import re
+from dataclasses import dataclass, field
+
+IMPORT_ERRORS = {
+    "ModuleNotFoundError",
+    "ImportError",
+    "SyntaxError",
+    "IndentationError",
+    "TabError",
+    "CompileError",
+}
+ASSERTION_ERRORS = {"AssertionError", "TestFailure"}
+
+CATEGORY_ORDER = ("import", "runtime", "assertion")
+
+# A collection error is reported against the test file itself, not a test in it.
+_TEST_FILE = re.compile(r"\.[A-Za-z]\w*$")
+
+# Digits, hex addresses and quoted values vary between otherwise identical errors.
+_VOLATILE = re.compile(r"0x[0-9a-f]+|\d+(\.\d+)?|'[^']*'|\"[^\"]*\"")
+
+
+@dataclass
+class Fix:
+    """One root cause, with every failing test attributed to it."""
+
+    category: str
+    error_type: str | None
+    message: str | None
+    location: str | None
+    tests: list[str] = field(default_factory=list)
+    expected: str | None = None
+    actual: str | None = None
+    cascades: list[str] = field(default_factory=list)
+
+
+def category(error_type: str | None) -> str:
+    if error_type is None:
+        return "runtime"
+    name = error_type.rsplit(".", 1)[-1]
+    if name in IMPORT_ERRORS:
+        return "import"
+    if name in ASSERTION_ERRORS:
+        return "assertion"
+    return "runtime"
+
+
+def triage(failures: list[dict]) -> list[Fix]:
+    """Turn a run's failures into an ordered, deduplicated fix list.
+
+    Args:
+        failures: Failure dicts as produced by :mod:`shepherd.output`.
+
+    Returns:
+        Fixes, most fundamental first. ``fixes[0]`` is the root cause to
+        hand the developer on the next retry.
+    """
+    clusters: dict[tuple, Fix] = {}
+    frames: dict[tuple, set[str]] = {}
+    loading: set[tuple] = set()
+    for failure in failures:
+        error_type = failure.get("error_type")
+        location = failure.get("location")
+        key = (
+            category(error_type),
+            error_type,
+            location or _VOLATILE.sub("_", failure.get("message") or ""),
+        )
+        fix = clusters.get(key)
+        if fix is None:
+            fix = clusters[key] = Fix(
+                category=key[0],
+                error_type=error_type,
+                message=failure.get("message"),
+                location=location,
+                expected=failure.get("expected"),
+                actual=failure.get("actual"),
+            )
+            frames[key] = set()
+        test = failure.get("test")
+        if test and test not in fix.tests:
+            fix.tests.append(test)
+        frames[key].update(_file(f) for f in failure.get("frames") or [])
+        if location:
+            frames[key].add(_file(location))
+        if _at_import(failure):
+            loading.add(key)
+
+    # Files that fail to import or compile poison every test that touches them.
+    broken = {
+        _file(fix.location): key
+        for key, fix in clusters.items()
+        if fix.category == "import" and fix.location and key in loading
+    }
+    for key, fix in list(clusters.items()):
+        if fix.category == "import":
+            continue
+        cause = next((broken[f] for f in sorted(frames[key]) if f in broken), None)
+        if cause is not None:
+            root = clusters[cause]
+            root.cascades.extend(t for t in fix.tests if t not in root.cascades)
+            del clusters[key]
+
+    order = {key: i for i, key in enumerate(clusters)}
+    ranked = sorted(
+        clusters,
+        key=lambda k: (
+            CATEGORY_ORDER.index(clusters[k].category),
+            -(len(clusters[k].tests) + len(clusters[k].cascades)),
+            order[k],
+        ),
+    )
+    return [clusters[k] for k in ranked]
+
+
+def format_fix_list(fixes: list[Fix], limit: int = 5) -> str:
+    """Render a fix list as plain text for a retry prompt."""
+    lines = []
+    for i, fix in enumerate(fixes[:limit], 1):
+        marker = "  <-- FIX THIS FIRST" if i == 1 else ""
+        lines.append(f"{i}. [{fix.category}] {fix.error_type or 'Error'}: {fix.message or ''}{marker}".rstrip())
+        if fix.location:
+            lines.append(f"   at {fix.location}")
+        if fix.expected is not None or fix.actual is not None:
+            lines.append(f"   expected: {fix.expected}  actual: {fix.actual}")
+        if fix.tests:
+            lines.append(f"   tests: {', '.join(fix.tests[:5])}{' ...' if len(fix.tests) > 5 else ''}")
+        if fix.cascades:
+            lines.append(f"   likely also fixes: {', '.join(fix.cascades[:5])}{' ...' if len(fix.cascades) > 5 else ''}")
+    if len(fixes) > limit:
+        lines.append(f"... {len(fixes) - limit} more independent failure(s)")
+    return "\n".join(lines)
+
+
+def _at_import(failure: dict) -> bool:
+    """Whether a failure happened while loading a module rather than in a test."""
+    test = failure.get("test")
+    return not test or ("::" not in test and bool(_TEST_FILE.search(test)))
+
+
+def _file(location: str) -> str:
+    return location.rsplit(":", 1)[0]
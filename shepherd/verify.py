@@ -0,0 +1,355 @@
+"""Run task test_commands, reusing cached verdicts for unchanged working trees."""
+
+import argparse
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from shepherd.cache import STATE_DIR, ResultCache, cache_key
+from shepherd.config import load_project
+from shepherd.output import OutputCapture, detect_framework
+from shepherd.warm import WarmPool
+
+# Characters of combined output kept in a verdict.
+OUTPUT_LIMIT = 4000
+
+# Timeouts by test scope, as listed in the test-runner skill.
+SCOPE_TIMEOUTS = {
+    "import": 30,
+    "unit": 120,
+    "integration": 300,
+    "e2e": 600,
+}
+
+_SCOPE_PATTERNS = [
+    ("e2e", re.compile(r"e2e|end.to.end|playwright|cypress|selenium|\bcurl\b")),
+    ("integration", re.compile(r"integration")),
+    ("import", re.compile(r"python3? -c|node -e|\bgo (build|vet)\b|cargo (check|build)|tsc\b")),
+    ("unit", re.compile(r"pytest|py\.test|unittest|jest|vitest|mocha|npm (run )?test|go test|cargo test")),
+]
+
+
+# Process groups of running commands by working directory, and directories
+# whose commands were cancelled (see cancel()).
+_running: dict[int, Path] = {}
+_cancelled: set[Path] = set()
+_running_lock = threading.Lock()
+
+
+@dataclass
+class Verdict:
+    """Outcome of running a single test_command."""
+
+    task: str
+    command: str
+    passed: bool
+    exit_code: int
+    duration: float
+    output: str = ""
+    cached: bool = False
+    partial: bool = False
+    failures: list[dict] = field(default_factory=list)
+    log: str | None = None
+    quarantined: list[str] = field(default_factory=list)
+    flaky_suspects: list[str] = field(default_factory=list)
+    stages: list[dict] = field(default_factory=list)
+
+
+def classify_scope(command: str) -> str:
+    """Guess the test scope of a command; unknown commands count as a full suite."""
+    for scope, pattern in _SCOPE_PATTERNS:
+        if pattern.search(command):
+            return scope
+    return "e2e"
+
+
+def task_timeout(task: dict) -> float:
+    """Return the timeout for a task: its ``timeout``, else its (guessed) scope's."""
+    if task.get("timeout"):
+        return float(task["timeout"])
+    scope = task.get("scope") or classify_scope(task.get("test_command", ""))
+    if scope not in SCOPE_TIMEOUTS:
+        raise ValueError(f"task '{task.get('name')}' has unknown scope '{scope}'")
+    return SCOPE_TIMEOUTS[scope]
+
+
+def run_command(
+    command: str,
+    cwd: str | Path,
+    timeout: float | None = None,
+    env: dict | None = None,
+    capture: OutputCapture | None = None,
+) -> tuple[int, OutputCapture]:
+    """Run a shell command, streaming its output into ``capture``.
+
+    stdout and stderr are merged and consumed incrementally, so memory use
+    does not grow with the amount of output. On timeout the whole process
+    group is killed (so ``cd x && pytest`` does not leave pytest running) and
+    exit code 124 is returned, like ``timeout``. Processes the command leaves
+    running in its group are killed when it exits.
+    """
+    if capture is None:
+        capture = OutputCapture(detect_framework(command))
+    where = Path(cwd).resolve()
+    with _running_lock:
+        if _is_cancelled(where):
+            capture.note("[cancelled]")
+            capture.close()
+            return 124, capture
+        proc = subprocess.Popen(
+            command,
+            shell=True,
+            cwd=cwd,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
+            start_new_session=True,
+        )
+        _running[proc.pid] = where
+    reader = threading.Thread(target=capture.read, args=(proc.stdout,), daemon=True)
+    reader.start()
+    try:
+        exit_code = proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+        exit_code = 124
+    with _running_lock:
+        del _running[proc.pid]
+        cancelled = _is_cancelled(where)
+    if cancelled:
+        exit_code = 124
+    # A background process left running by the command (a dev server, say)
+    # would hold the pipe open forever; end the group so the reader sees EOF
+    # and has consumed all output before the capture is closed.
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    reader.join()
+    if cancelled:
+        capture.note("[cancelled]")
+    elif exit_code == 124:
+        capture.note(f"[timed out after {timeout}s]")
+    capture.close()
+    return exit_code, capture
+
+
+def cancel(cwd: str | Path) -> None:
+    """Kill the commands running from ``cwd`` or below it, and refuse new ones there.
+
+    They return exit code 124, like a timeout, so their verdicts are not
+    cached. :func:`release` lets commands run there again.
+    """
+    where = Path(cwd).resolve()
+    with _running_lock:
+        _cancelled.add(where)
+        for pid, dirname in _running.items():
+            if dirname == where or where in dirname.parents:
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+
+def release(cwd: str | Path) -> None:
+    """Undo :func:`cancel` for ``cwd``."""
+    with _running_lock:
+        _cancelled.discard(Path(cwd).resolve())
+
+
+def _is_cancelled(where: Path) -> bool:
+    return any(where == c or c in where.parents for c in _cancelled)
+
+
+def log_path(root: str | Path, task: str) -> Path:
+    """Return where the raw output of a task's latest run is written."""
+    slug = re.sub(r"[^\w.-]+", "-", task).strip("-").lower()[:60] or "task"
+    return Path(root) / STATE_DIR / "logs" / f"{slug}.log"
+
+
+def cached_verdict(
+    task: str,
+    command: str,
+    root: str | Path,
+    working_dir: str | Path,
+    cache: ResultCache,
+) -> Verdict | None:
+    """Return the cached verdict for the current tree, or None on a miss."""
+    hit = cache.get(cache_key(command, cache.tree_digest(Path(root) / working_dir)))
+    if hit is None:
+        return None
+    return Verdict(task=task, command=command, cached=True, **hit)
+
+
+def verify(
+    task: str,
+    command: str,
+    root: str | Path,
+    working_dir: str | Path,
+    cache: ResultCache | None = None,
+    timeout: float | None = None,
+    env: dict | None = None,
+    warm: WarmPool | None = None,
+) -> Verdict:
+    """Verify one task, consulting ``cache`` first when given.
+
+    Args:
+        task: Task name, used for reporting only.
+        command: Shell command run from ``root``; exit code 0 means pass.
+        root: Project root (the directory containing project.yaml).
+        working_dir: Directory whose content determines the verdict.
+        cache: Verdict cache, or None to always run the command.
+        timeout: Seconds before the command is killed and reported as failed.
+        env: Extra variables for instrumentation (plugins, selection files).
+            They are added to the inherited environment and do not affect
+            the cache key.
+        warm: Pool that runs Python commands in preloaded, forked
+            interpreters; other commands still run cold.
+    """
+    if cache is not None:
+        hit = cached_verdict(task, command, root, working_dir, cache)
+        if hit is not None:
+            return hit
+        key = cache_key(command, cache.tree_digest(Path(root) / working_dir))
+
+    start = time.monotonic()
+    capture = OutputCapture(detect_framework(command), log_path(root, task))
+    full_env = {**os.environ, **env} if env else None
+    result = warm.run(command, root, timeout, full_env, capture) if warm is not None else None
+    exit_code, capture = result or run_command(command, root, timeout, full_env, capture)
+    verdict = Verdict(
+        task=task,
+        command=command,
+        passed=exit_code == 0,
+        exit_code=exit_code,
+        duration=round(time.monotonic() - start, 3),
+        output=capture.text[-OUTPUT_LIMIT:],
+        failures=capture.summary()["failures"],
+        log=str(capture.log_path),
+    )
+    # Timeouts say nothing reliable about the tree, so never cache them.
+    if cache is not None and exit_code != 124:
+        entry = {
+            "passed": verdict.passed,
+            "exit_code": verdict.exit_code,
+            "duration": verdict.duration,
+            "output": verdict.output,
+            "failures": verdict.failures,
+        }
+        cache.put(key, entry)
+        # Tests that leave artifacts behind (sqlite files, snapshots) change
+        # the tree; key the verdict on the post-run state as well.
+        after = cache_key(command, cache.tree_digest(Path(root) / working_dir))
+        if after != key:
+            cache.put(after, entry)
+    return verdict
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run project.yaml test commands with a content-addressed result cache"
+    )
+    parser.add_argument(
+        "project_file",
+        nargs="?",
+        default="project.yaml",
+        help="Path to project.yaml (default: project.yaml)",
+    )
+    parser.add_argument(
+        "--task",
+        action="append",
+        dest="tasks",
+        metavar="NAME",
+        help="Only verify this task (repeatable; default: all tasks)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore cached verdicts and always run the test commands",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="For pytest commands, run the tests affected by changed files first",
+    )
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="Run Python test commands in a pool of preloaded interpreters",
+    )
+    parser.add_argument("--json", action="store_true", help="Print verdicts as JSON")
+    args = parser.parse_args()
+
+    try:
+        config = load_project(args.project_file)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+    root = Path.cwd()
+    working_dir = config.get("working_directory", "./workspace")
+    tasks = [t for t in config.get("tasks") or [] if t.get("test_command") or t.get("stages")]
+    if args.tasks:
+        unknown = set(args.tasks) - {t["name"] for t in tasks}
+        if unknown:
+            raise SystemExit(f"Error: no task with a test_command or stages named {', '.join(sorted(unknown))}")
+        tasks = [t for t in tasks if t["name"] in args.tasks]
+
+    cache = None if args.no_cache else ResultCache.for_root(root)
+    warm = WarmPool() if args.warm else None
+
+    def run_one(task: str, command: str, timeout: float | None = None) -> Verdict:
+        if args.incremental:
+            from shepherd.testmap import verify_incremental
+
+            return verify_incremental(task, command, root, working_dir, cache, timeout, warm)
+        return verify(task, command, root, working_dir, cache, timeout, warm=warm)
+
+    def verify_task(task: dict) -> Verdict:
+        if not task.get("stages"):
+            return run_one(task["name"], task["test_command"], task_timeout(task))
+        from shepherd.pipeline import run_pipeline, stages_for
+
+        return run_pipeline(task["name"], stages_for(task), run_one)
+
+    from shepherd.telemetry import span
+
+    def traced(task: dict) -> Verdict:
+        with span(root, "verify", task["name"]) as attrs:
+            verdict = verify_task(task)
+            attrs.update(passed=verdict.passed, cached=verdict.cached, exit_code=verdict.exit_code)
+        return verdict
+
+    try:
+        verdicts = [traced(t) for t in tasks]
+    except ValueError as e:
+        raise SystemExit(f"Error: {args.project_file}: {e}")
+
+    from shepherd.state import record_verdicts
+
+    record_verdicts(root, working_dir, verdicts, cache, config)
+
+    if args.json:
+        print(json.dumps([asdict(v) for v in verdicts], indent=2))
+    else:
+        for v in verdicts:
+            note = " (cached)" if v.cached else " (affected tests only)" if v.partial else ""
+            print(f"{'PASS' if v.passed else 'FAIL'}  {v.task}  [{v.duration}s]{note}")
+            for stage in v.stages:
+                print(f"      {stage['status']:<8} {stage['tier']:<12} {stage['name']}")
+            if not v.passed:
+                print(v.output)
+    sys.exit(0 if all(v.passed for v in verdicts) else 1)
+
+
+if __name__ == "__main__":
+    main()
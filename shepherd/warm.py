@@ -0,0 +1,300 @@
+"""Warm interpreter pool: run Python test commands in forked, preloaded workers.
+
+Every ``python -m pytest`` or ``python -c "import app"`` pays interpreter
+startup, site-packages imports and plugin discovery. With ``--warm``, each
+interpreter and working directory gets a :mod:`shepherd.warm_server` that
+imports pytest, its plugins and the third-party packages the workspace
+imports once, then forks a child per command. The child gets the command's
+argv, environment, cwd, ``sys.path`` and stdio, so the result is that of a
+cold run; workspace modules are never preloaded.
+
+Only ``[cd DIR &&] python (-m MODULE | -c CODE) [ARGS...]`` runs warm.
+Anything else -- pipes, redirects, variables, globs, interpreter flags,
+other programs -- runs cold, as does every command after the dependency
+set changed (a package was installed or removed, or a requirements,
+pyproject or lock file was edited) until a fresh server has started.
+Commands also run cold while their server is starting, and when it does
+not report ready within ``STARTUP_TIMEOUT`` seconds.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import selectors
+import shlex
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from shepherd.output import OutputCapture, detect_framework
+
+SERVER = Path(__file__).with_name("warm_server.py")
+
+# Files whose edits mean the workspace's dependencies changed.
+DEPENDENCY_FILES = (
+    "requirements*.txt",
+    "pyproject.toml",
+    "setup.py",
+    "setup.cfg",
+    "Pipfile.lock",
+    "poetry.lock",
+    "uv.lock",
+)
+
+# Seconds a server may take to preload its imports and report ready.
+STARTUP_TIMEOUT = 60
+
+_PYTHONS = {"python", "python3"}
+_SHELL_CHARS = set("$`\\")
+_GLOB_CHARS = set("*?[~")
+
+
+@dataclass
+class Invocation:
+    """A test command reduced to what a forked interpreter needs."""
+
+    cwd: str
+    python: str
+    mode: str
+    target: str
+    args: list[str]
+
+
+def parse(command: str) -> Invocation | None:
+    """Parse a command that can run warm, or return None if it must run cold."""
+    if _SHELL_CHARS & set(command):
+        return None
+    try:
+        lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+        lexer.whitespace_split = True
+        tokens = list(lexer)
+    except ValueError:
+        return None
+    cwd = ""
+    if len(tokens) > 3 and tokens[0] == "cd" and tokens[2] == "&&":
+        cwd, tokens = tokens[1], tokens[3:]
+    if len(tokens) < 3 or tokens[0] not in _PYTHONS or tokens[1] not in ("-m", "-c"):
+        return None
+    for token in [cwd, *tokens[3:]] if tokens[1] == "-c" else [cwd, *tokens[2:]]:
+        if _GLOB_CHARS & set(token) or token and set(token) <= set("();<>|&"):
+            return None
+    return Invocation(cwd=cwd, python=tokens[0], mode=tokens[1], target=tokens[2], args=tokens[3:])
+
+
+def fingerprint(site_dirs: list[str], workdir: str | Path) -> str:
+    """Hash the installed packages and the workspace's dependency files.
+
+    Installing or removing a package touches its site-packages directory,
+    so directory mtimes are enough for the former.
+    """
+    h = hashlib.sha256()
+    for path in site_dirs:
+        try:
+            h.update(f"{path}:{os.stat(path).st_mtime_ns}\n".encode())
+        except OSError:
+            h.update(f"{path}:missing\n".encode())
+    for pattern in DEPENDENCY_FILES:
+        for path in sorted(Path(workdir).glob(pattern)):
+            h.update(path.name.encode() + b"\0" + path.read_bytes())
+    return h.hexdigest()
+
+
+class WarmPool:
+    """Fork servers keyed by interpreter, working directory and interpreter settings."""
+
+    def __init__(self):
+        self._servers: dict[tuple, _Server] = {}
+        self._starting: set[tuple] = set()
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def run(
+        self,
+        command: str,
+        cwd: str | Path,
+        timeout: float | None = None,
+        env: dict | None = None,
+        capture: OutputCapture | None = None,
+    ) -> tuple[int, OutputCapture] | None:
+        """Run ``command`` in a warm worker, like :func:`shepherd.verify.run_command`.
+
+        Returns None, without running anything, if the command has to run
+        cold instead.
+        """
+        invocation = parse(command)
+        if invocation is None:
+            return None
+        env = dict(os.environ if env is None else env)
+        workdir = (Path(cwd) / invocation.cwd).resolve()
+        python = shutil.which(invocation.python, path=env.get("PATH"))
+        if python is None or not workdir.is_dir():
+            return None
+        server = self._server(python, workdir, env)
+        if server is None:
+            return None
+        if capture is None:
+            capture = OutputCapture(detect_framework(command))
+        return server.run(invocation, workdir, timeout, env, capture)
+
+    def close(self) -> None:
+        with self._lock:
+            for server in self._servers.values():
+                server.close()
+            self._servers.clear()
+
+    def _server(self, python: str, workdir: Path, env: dict) -> "_Server | None":
+        # PYTHON* variables other than PYTHONPATH are read at interpreter
+        # startup, so they need a server of their own.
+        settings = tuple(sorted((k, v) for k, v in env.items() if k.startswith("PYTHON") and k != "PYTHONPATH"))
+        key = (python, str(workdir), settings)
+        with self._lock:
+            if key in self._starting:
+                # Another thread is starting it; don't wait, run this one cold.
+                return None
+            server = self._servers.get(key)
+            if server is not None and server.alive() and server.fingerprint == fingerprint(server.site_dirs, workdir):
+                return server
+            if server is None:
+                self._starting.add(key)
+            else:
+                del self._servers[key]
+        if server is not None:
+            # Dependencies changed (or the server died): this command
+            # runs cold, the next one starts a fresh server.
+            server.close()
+            return None
+        # Started outside the lock so that commands for other servers are not held up.
+        server = None
+        try:
+            server = _Server.start(python, workdir, env)
+        finally:
+            with self._lock:
+                self._starting.discard(key)
+                if server is not None:
+                    self._servers[key] = server
+        return server
+
+
+class _Server:
+    def __init__(self, proc: subprocess.Popen, tmp: str, site_dirs: list[str], workdir: Path):
+        self.proc = proc
+        self.tmp = tmp
+        self.socket_path = os.path.join(tmp, "sock")
+        self.site_dirs = site_dirs
+        self.fingerprint = fingerprint(site_dirs, workdir)
+
+    @classmethod
+    def start(cls, python: str, workdir: Path, env: dict) -> "_Server | None":
+        """Start a server and wait for its hello; None if it fails or is not ready within STARTUP_TIMEOUT."""
+        tmp = tempfile.mkdtemp(prefix="shepherd-warm-")
+        server_env = {k: v for k, v in env.items() if k != "PYTHONPATH"}
+        proc = subprocess.Popen(
+            [python, str(SERVER), os.path.join(tmp, "sock")],
+            cwd=workdir,
+            env=server_env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        try:
+            hello = json.loads(_read_line(proc.stdout, STARTUP_TIMEOUT))
+        except (TimeoutError, ValueError):
+            proc.kill()
+            proc.wait()
+            shutil.rmtree(tmp, ignore_errors=True)
+            return None
+        return cls(proc, tmp, hello["site_dirs"], workdir)
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def run(
+        self,
+        invocation: Invocation,
+        workdir: Path,
+        timeout: float | None,
+        env: dict,
+        capture: OutputCapture,
+    ) -> tuple[int, OutputCapture] | None:
+        read_fd, write_fd = os.pipe()
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        request = {
+            "cwd": str(workdir),
+            "mode": invocation.mode,
+            "target": invocation.target,
+            "args": invocation.args,
+            "env": env,
+        }
+        try:
+            conn.connect(self.socket_path)
+            socket.send_fds(conn, [json.dumps(request).encode() + b"\n"], [write_fd])
+            conn.settimeout(timeout)
+            replies = conn.makefile("r")
+            pid = json.loads(replies.readline())["pid"]
+        except (OSError, ValueError):
+            os.close(read_fd)
+            conn.close()
+            return None
+        finally:
+            os.close(write_fd)
+
+        reader = threading.Thread(
+            target=capture.read, args=(os.fdopen(read_fd, "r", errors="replace"),), daemon=True
+        )
+        reader.start()
+        try:
+            exit_code = json.loads(replies.readline())["exit_code"]
+        except TimeoutError:
+            exit_code = 124
+        except (OSError, ValueError):
+            capture.note("[warm worker lost]")
+            exit_code = 1
+        finally:
+            conn.close()
+        # Kill what the worker left running too, so the pipe closes and every
+        # line is read before the capture is closed.
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        reader.join()
+        if exit_code == 124:
+            capture.note(f"[timed out after {timeout}s]")
+        capture.close()
+        return exit_code, capture
+
+    def close(self) -> None:
+        if self.alive():
+            self.proc.stdin.close()
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def _read_line(stream, timeout: float) -> str:
+    """Read one line from a pipe, raising TimeoutError after ``timeout`` seconds."""
+    deadline = time.monotonic() + timeout
+    fd = stream.fileno()
+    data = b""
+    with selectors.DefaultSelector() as selector:
+        selector.register(fd, selectors.EVENT_READ)
+        while not data.endswith(b"\n"):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not selector.select(remaining):
+                raise TimeoutError
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                break
+            data += chunk
+    return data.split(b"\n", 1)[0].decode(errors="replace")
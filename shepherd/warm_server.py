@@ -0,0 +1,271 @@
+"""Fork server for :mod:`shepherd.warm`, run inside the workspace's interpreter.
+
+Started by path (``python warm_server.py SOCKET``) from the working
+directory, so it needs nothing but the standard library and works in any
+virtualenv. It imports pytest, its plugins and the third-party packages the
+workspace imports, prints one JSON line describing itself, then serves
+requests on a Unix socket. Each request carries a pipe for the command's
+output and is run in a forked child; the server replies with the child's
+pid and, once it exits, its exit code. It exits when its stdin is closed.
+"""
+
+import ast
+import atexit
+import importlib
+import importlib.util
+import io
+import json
+import os
+import runpy
+import select
+import signal
+import socket
+import sys
+import threading
+import types
+
+# Import paths of a cold interpreter: everything but the script directory.
+BASE_PATH = sys.path[:] if getattr(sys.flags, "safe_path", False) else sys.path[1:]
+
+# Never preloaded: modules with import-time side effects, and shepherd's own
+# pytest plugin, which reads its environment at import.
+_SKIP = {"__future__", "__main__", "antigravity", "this", "shepherd"}
+_SKIP_DIRS = {".git", ".hg", ".shepherd", ".venv", "venv", "node_modules", "__pycache__", "site-packages"}
+_MAX_FILES = 2000
+
+
+def preload(workdir: str) -> list[str]:
+    """Import pytest, its plugins and every non-local package the workspace imports."""
+    names = {"pytest"} | _workspace_imports(workdir)
+    try:
+        from importlib.metadata import entry_points
+
+        names.update(ep.module for ep in entry_points(group="pytest11"))
+    except Exception:
+        pass
+    loaded = []
+    for name in sorted(names - _SKIP):
+        if name in sys.modules or name.split(".")[0] in _SKIP:
+            continue
+        try:
+            spec = importlib.util.find_spec(name)
+        except (ImportError, ValueError):
+            continue
+        if spec is None or _is_local(spec, workdir):
+            continue
+        try:
+            importlib.import_module(name)
+        except Exception:
+            continue
+        loaded.append(name)
+    return loaded
+
+
+def serve(listener: socket.socket) -> None:
+    control = sys.stdin.fileno()
+    # SIGCHLD wakes the loop so exit codes are sent as soon as a child exits.
+    wakeup, wakeup_w = os.pipe()
+    os.set_blocking(wakeup, False)
+    os.set_blocking(wakeup_w, False)
+    signal.set_wakeup_fd(wakeup_w)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    children: dict[int, socket.socket] = {}
+    while True:
+        ready, _, _ = select.select([listener, control, wakeup], [], [], 1.0)
+        if control in ready and not os.read(control, 1024):
+            break
+        if wakeup in ready:
+            while True:
+                try:
+                    os.read(wakeup, 512)
+                except BlockingIOError:
+                    break
+        if listener in ready:
+            conn, _ = listener.accept()
+            pid = _start(conn, listener)
+            if pid is not None:
+                children[pid] = conn
+        _reap(children)
+    for pid in children:
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+def _start(conn: socket.socket, listener: socket.socket) -> int | None:
+    try:
+        msg, fds, _, _ = socket.recv_fds(conn, 1 << 16, 1)
+        while msg and not msg.endswith(b"\n"):
+            chunk = conn.recv(1 << 16)
+            if not chunk:
+                break
+            msg += chunk
+        request = json.loads(msg)
+    except (OSError, ValueError):
+        conn.close()
+        return None
+    if len(fds) != 1:
+        conn.close()
+        return None
+    pid = os.fork()
+    if pid == 0:
+        listener.close()
+        conn.close()
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        _child(request, fds[0])
+    os.close(fds[0])
+    try:
+        conn.sendall(json.dumps({"pid": pid}).encode() + b"\n")
+    except OSError:
+        pass
+    return pid
+
+
+def _reap(children: dict[int, socket.socket]) -> None:
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        code = os.waitstatus_to_exitcode(status)
+        conn = children.pop(pid, None)
+        if conn is None:
+            continue
+        try:
+            # Like a shell: death by signal N is exit code 128 + N.
+            conn.sendall(json.dumps({"exit_code": code if code >= 0 else 128 - code}).encode() + b"\n")
+        except OSError:
+            pass
+        conn.close()
+
+
+def _child(request: dict, out_fd: int) -> None:
+    """Turn this fork into what ``python -m/-c ...`` would be, run it and exit."""
+    code = 1
+    try:
+        os.setsid()
+        null = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(null, 0)
+        os.dup2(out_fd, 1)
+        os.dup2(out_fd, 2)
+        os.close(null)
+        os.close(out_fd)
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        pythonpath = [os.path.abspath(p) for p in request["env"].get("PYTHONPATH", "").split(os.pathsep) if p]
+        first = [] if getattr(sys.flags, "safe_path", False) else [os.getcwd() if request["mode"] == "-m" else ""]
+        sys.path[:] = first + pythonpath + BASE_PATH
+        sys.stdin = sys.__stdin__ = open(0, closefd=False)
+        sys.stdout = sys.__stdout__ = _stream(1, sys.stdout)
+        sys.stderr = sys.__stderr__ = _stream(2, sys.stderr)
+        if "random" in sys.modules:
+            # Forks share the server's generator state; a cold start reseeds.
+            sys.modules["random"].seed()
+        code = _run(request["mode"], request["target"], request["args"])
+        for thread in threading.enumerate():
+            if thread is not threading.main_thread() and not thread.daemon:
+                thread.join()
+        atexit._run_exitfuncs()
+    except BaseException:
+        pass
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+        os._exit(code)
+
+
+def _run(mode: str, target: str, args: list[str]) -> int:
+    try:
+        if mode == "-m":
+            sys.argv = [target, *args]
+            runpy.run_module(target, run_name="__main__", alter_sys=True)
+        else:
+            sys.argv = ["-c", *args]
+            main = types.ModuleType("__main__")
+            sys.modules["__main__"] = main
+            exec(compile(target, "<string>", "exec"), main.__dict__)
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code & 0xFF
+        print(e.code, file=sys.stderr)
+        return 1
+    except BaseException:
+        sys.excepthook(*sys.exc_info())
+        return 1
+    return 0
+
+
+def _stream(fd: int, like: io.TextIOWrapper) -> io.TextIOWrapper:
+    unbuffered = bool(os.environ.get("PYTHONUNBUFFERED"))
+    return io.TextIOWrapper(
+        open(fd, "wb", closefd=False),
+        encoding=like.encoding,
+        errors=like.errors,
+        line_buffering=like.line_buffering or unbuffered,
+        write_through=unbuffered,
+    )
+
+
+def _workspace_imports(workdir: str) -> set[str]:
+    names: set[str] = set()
+    seen = 0
+    for dirpath, dirnames, filenames in os.walk(workdir):
+        dirnames[:] = [d for d in dirnames if d not in _SKIP_DIRS and not d.startswith(".")]
+        for filename in filenames:
+            if not filename.endswith(".py"):
+                continue
+            seen += 1
+            if seen > _MAX_FILES:
+                return names
+            try:
+                with open(os.path.join(dirpath, filename), "rb") as f:
+                    tree = ast.parse(f.read())
+            except (OSError, SyntaxError, ValueError):
+                continue
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
+                    names.update(alias.name.split(".")[0] for alias in node.names)
+                elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                    names.add(node.module.split(".")[0])
+    return names
+
+
+def _is_local(spec, workdir: str) -> bool:
+    """True for modules that live in the workspace and may change between runs."""
+    locations = [spec.origin] if spec.origin else []
+    locations += list(spec.submodule_search_locations or [])
+    root = os.path.realpath(workdir) + os.sep
+    return any(os.path.realpath(loc).startswith(root) for loc in locations if loc)
+
+
+def main():
+    socket_path = sys.argv[1]
+    # Keep import-time prints of preloaded modules off the reply channel.
+    reply = os.fdopen(os.dup(1), "w")
+    null = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(null, 1)
+    os.close(null)
+    loaded = preload(os.getcwd())
+    sys.stdout.flush()
+    site_dirs = [p for p in BASE_PATH if os.path.isdir(p)]
+    # Bind before replying: the reply tells the client it may connect.
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(64)
+    reply.write(json.dumps({"pid": os.getpid(), "site_dirs": site_dirs, "preloaded": loaded}) + "\n")
+    reply.close()
+    serve(listener)
+
+
+if __name__ == "__main__":
+    main()
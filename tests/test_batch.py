@@ -0,0 +1,32 @@
+from shepherd.batch import run_project
+
+PROJECT = """\
+name: demo
+description: A demo project
+tasks:
+  - name: api
+    description: Build the API
+    test_command: "true"
+"""
+
+
+def test_an_unwritable_root_is_reported_as_an_error(tmp_path):
+    project = tmp_path / "project.yaml"
+    project.write_text(PROJECT)
+    (tmp_path / "taken").write_text("a file, not a directory\n")
+
+    result = run_project(project, tmp_path / "taken" / "demo", command="true")
+
+    assert result["status"] == "ERROR"
+    assert result["project"] == "demo"
+    assert "taken" in result["error"]
+
+
+def test_a_passing_project(tmp_path):
+    project = tmp_path / "project.yaml"
+    project.write_text(PROJECT + "checkpoints: false\n")
+
+    result = run_project(project, tmp_path / "out", command="true")
+
+    assert result["status"] == "PASS"
+    assert result["tests"]["passed"] == 1
@@ -0,0 +1,65 @@
+import os
+
+from shepherd.cache import ResultCache, cache_key
+from shepherd.verify import verify
+
+
+def test_verdicts_are_found_by_key_until_evicted(tmp_path):
+    cache = ResultCache(tmp_path / "cache.db", max_entries=2)
+    assert cache.get("a") is None
+
+    cache.put("a", {"passed": True})
+    cache.put("b", {"passed": False})
+    assert cache.get("a") == {"passed": True}
+    cache.put("c", {"passed": True})
+
+    # "b" was the least recently used once "a" was read.
+    assert cache.get("b") is None
+    assert cache.get("a") == {"passed": True}
+    assert cache.get("c") == {"passed": True}
+    cache.close()
+
+
+def test_keys_change_with_the_tree_command_and_toolchain(tmp_path):
+    cache = ResultCache(tmp_path / ".shepherd" / "cache.db")
+    (tmp_path / "app.py").write_text("x = 1\n")
+    tree = cache.tree_digest(tmp_path)
+    key = cache_key("pytest", tree, {"PATH": "/usr/bin"})
+
+    assert cache.tree_digest(tmp_path) == tree
+    assert cache_key("pytest -x", tree, {"PATH": "/usr/bin"}) != key
+    assert cache_key("pytest", tree, {"PATH": "/opt/bin"}) != key
+    (tmp_path / "app.py").write_text("x = 2\n")
+    assert cache_key("pytest", cache.tree_digest(tmp_path), {"PATH": "/usr/bin"}) != key
+    cache.close()
+
+
+def test_ignored_directories_do_not_affect_the_digest(tmp_path):
+    cache = ResultCache(tmp_path / "cache.db")
+    (tmp_path / "ws").mkdir()
+    (tmp_path / "ws" / "app.py").write_text("x = 1\n")
+    before = cache.file_digests(tmp_path / "ws")
+    (tmp_path / "ws" / "__pycache__").mkdir()
+    (tmp_path / "ws" / "__pycache__" / "app.pyc").write_bytes(b"\0")
+    os.makedirs(tmp_path / "ws" / "node_modules" / "left-pad")
+
+    assert cache.file_digests(tmp_path / "ws") == before == {"app.py": before["app.py"]}
+    cache.close()
+
+
+def test_verify_reuses_a_verdict_until_the_working_directory_changes(tmp_path):
+    (tmp_path / "ws").mkdir()
+    (tmp_path / "ws" / "app.py").write_text("x = 1\n")
+    (tmp_path / "runs").write_text("")
+    cache = ResultCache.for_root(tmp_path)
+    command = "echo run >> runs"
+
+    first = verify("t", command, tmp_path, "ws", cache)
+    second = verify("t", command, tmp_path, "ws", cache)
+    (tmp_path / "ws" / "app.py").write_text("x = 2\n")
+    third = verify("t", command, tmp_path, "ws", cache)
+
+    assert (first.cached, second.cached, third.cached) == (False, True, False)
+    assert second.passed
+    assert (tmp_path / "runs").read_text() == "run\nrun\n"
+    cache.close()
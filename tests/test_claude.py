@@ -0,0 +1,136 @@
+import sys
+import time
+
+from shepherd.claude import Budget, StreamMonitor, delegate, format_progress
+from shepherd.state import StateStore
+
+FAKE = """\
+import json, sys
+args = sys.argv[1:]
+with open("calls.log", "a") as f:
+    f.write(" ".join(args) + "\\n")
+session = args[args.index("--resume") + 1] if "--resume" in args else "s-new"
+if session == "s-gone":
+    print("No conversation found with session ID: s-gone", file=sys.stderr)
+    sys.exit(1)
+sys.stdin.read()
+print(json.dumps({"type": "system", "subtype": "init", "session_id": session, "model": "sonnet"}))
+print(json.dumps({"type": "result", "subtype": "success", "session_id": session, "num_turns": 2,
+                  "total_cost_usd": 0.5, "result": "done", "is_error": False}))
+"""
+
+
+def _binary(tmp_path):
+    path = tmp_path / "fake_claude"
+    path.write_text(f"#!{sys.executable}\n{FAKE}")
+    path.chmod(0o755)
+    return str(path)
+
+
+def test_delegations_of_a_task_share_one_session(tmp_path):
+    store = StateStore(tmp_path / "state.db")
+    binary = _binary(tmp_path)
+
+    first = delegate("api", "build it", tmp_path, store, binary=binary)
+    second = delegate("api", "fix it", tmp_path, store, binary=binary)
+
+    assert (first.session_id, first.resumed, first.result) == ("s-new", False, "done")
+    assert (second.session_id, second.resumed) == ("s-new", True)
+    assert "--resume s-new" in (tmp_path / "calls.log").read_text().splitlines()[1]
+    assert store.session("api") == {"session_id": "s-new", "calls": 2, "turns": 4, "cost_usd": 1.0}
+
+
+def test_a_session_claude_no_longer_has_is_replaced(tmp_path):
+    store = StateStore(tmp_path / "state.db")
+    store.record_session("api", "s-gone", 3, 0.25)
+
+    outcome = delegate("api", "fix it", tmp_path, store, binary=_binary(tmp_path))
+
+    assert (outcome.session_id, outcome.resumed, outcome.is_error) == ("s-new", False, False)
+    assert store.session("api")["session_id"] == "s-new"
+    assert store.session("api")["turns"] == 5
+
+
+def test_a_new_session_can_be_forced(tmp_path):
+    store = StateStore(tmp_path / "state.db")
+    store.record_session("api", "s-old", 1, 0.0)
+
+    outcome = delegate("api", "start over", tmp_path, store, new_session=True, binary=_binary(tmp_path))
+
+    assert not outcome.resumed
+    assert "--resume" not in (tmp_path / "calls.log").read_text()
+    assert store.session("api")["calls"] == 2
+
+
+def _assistant(message_id, *blocks, usage=None):
+    usage = usage or {"input_tokens": 1000, "output_tokens": 100}
+    message = {"id": message_id, "content": list(blocks), "usage": usage}
+    return {"type": "assistant", "session_id": "s1", "message": message}
+
+
+def _tool(name, **params):
+    return {"type": "tool_use", "name": name, "input": params}
+
+
+def test_the_monitor_counts_turns_once_per_message():
+    monitor = StreamMonitor(Budget())
+    monitor.feed({"type": "system", "subtype": "init", "session_id": "s1", "model": "claude-haiku"})
+    monitor.feed(_assistant("m1", {"type": "text", "text": "Reading"}))
+    monitor.feed(_assistant("m1", _tool("Read", file_path="app.py")))
+    monitor.feed(_assistant("m2", _tool("Edit", file_path="app.py", old_string="a", new_string="b")))
+
+    progress = monitor.progress
+    assert (progress.session_id, progress.model) == ("s1", "claude-haiku")
+    assert (progress.turns, progress.tool_calls) == (2, 2)
+    assert (progress.tokens_in, progress.tokens_out, progress.files) == (2000, 200, ["app.py"])
+    assert progress.cost_usd == 2 * (1000 * 1.0 + 100 * 5.0) / 1_000_000
+    assert format_progress(progress) == "turn 2, 2 tool calls, 1 files, ~$0.00 | Edit app.py"
+
+
+def test_the_result_event_has_the_final_totals():
+    monitor = StreamMonitor(Budget(max_turns=1))
+    monitor.feed(_assistant("m1"))
+    stop = monitor.feed(
+        {"type": "result", "num_turns": 5, "total_cost_usd": 0.25, "usage": {"input_tokens": 7, "output_tokens": 3}}
+    )
+
+    assert stop is None
+    assert (monitor.progress.turns, monitor.progress.cost_usd, monitor.progress.tokens_in) == (5, 0.25, 7)
+
+
+def test_the_monitor_stops_a_call_over_budget():
+    turns = StreamMonitor(Budget(max_turns=1))
+    turns.feed(_assistant("m1"))
+    assert turns.feed(_assistant("m2")) == "turn budget of 1 exceeded"
+
+    cost = StreamMonitor(Budget(max_cost=0.005))
+    assert cost.feed(_assistant("m1", usage={"input_tokens": 1000, "output_tokens": 0})) is None
+    assert cost.feed(_assistant("m2", usage={"input_tokens": 1000, "output_tokens": 0})).startswith(
+        "cost budget of $0.005 exceeded"
+    )
+
+
+def test_repeated_calls_without_an_edit_are_a_loop():
+    monitor = StreamMonitor(Budget(max_repeats=2))
+    run = _tool("Bash", command="pytest")
+
+    assert monitor.feed(_assistant("m1", run)) is None
+    assert monitor.feed(_assistant("m2", run)) is None
+    assert monitor.feed(_assistant("m3", _tool("Edit", file_path="a.py", old_string="x", new_string="y"))) is None
+    assert monitor.feed(_assistant("m4", run)) is None
+    assert monitor.feed(_assistant("m5", run)) is None
+    assert monitor.feed(_assistant("m6", run)) == "Bash called 3 times with the same input and no new edit"
+
+
+def test_a_call_past_its_wall_time_is_killed(tmp_path):
+    path = tmp_path / "slow_claude"
+    path.write_text("#!/bin/sh\nsleep 30\n")
+    path.chmod(0o755)
+    store = StateStore(tmp_path / "state.db")
+    start = time.monotonic()
+
+    outcome = delegate("api", "build it", tmp_path, store, budget=Budget(timeout=0.5), binary=str(path))
+
+    assert time.monotonic() - start < 10
+    assert outcome.stopped == "wall time of 0.5s exceeded"
+    assert outcome.is_error and outcome.subtype == "stopped"
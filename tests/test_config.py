@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from shepherd.config import ConfigError, load_project, parse
+
+VALID = """\
+name: demo
+description: A demo project
+deadline: 2026-01-31
+tasks:
+  - name: db
+    description: Set up the database
+    test_command: pytest tests/test_db.py
+  - name: api
+    description: Build the API
+    depends_on: db
+    timeout: 90
+"""
+
+
+def test_valid_config_is_normalised():
+    config = parse(VALID)
+
+    assert config["deadline"] == "2026-01-31"
+    assert config["tasks"][1]["depends_on"] == ["db"]
+
+
+def test_every_error_is_reported_with_its_location():
+    text = """\
+name: demo
+tasks:
+  - name: db
+    description: Set up the database
+    timeout: -1
+  - name: api
+    description: Build the API
+    depends_on: [dbb]
+    scope: huge
+"""
+    with pytest.raises(ConfigError) as info:
+        parse(text)
+
+    assert info.value.errors == [
+        "project.yaml:1:1: description: required",
+        "project.yaml:5:14: tasks[0].timeout: expected a positive number of seconds, got -1",
+        "project.yaml:9:12: tasks[1].scope: expected one of import, unit, integration, e2e, got 'huge'",
+        "project.yaml:8:18: tasks[1].depends_on[0]: unknown task 'dbb' (did you mean 'db'?)",
+    ]
+
+
+def test_typos_get_a_suggestion_and_other_extra_keys_are_allowed():
+    text = VALID.replace("deadline:", "dedline:") + "notes: free text for the agent\n"
+
+    with pytest.raises(ConfigError, match=r"project.yaml:3:10: dedline: unknown field \(did you mean 'deadline'\?\)"):
+        parse(text)
+    parse(VALID + "notes: free text for the agent\n")
+
+
+def test_numbers_written_for_strings_keep_their_text():
+    config = parse(VALID.replace("name: demo", "name: 2024"))
+
+    assert config["name"] == "2024"
+
+
+def test_invalid_yaml_and_cycles():
+    with pytest.raises(ConfigError, match=r"project.yaml:\d+:\d+: invalid YAML"):
+        parse("name: [demo\n")
+    cyclic = VALID.replace("    test_command: pytest tests/test_db.py\n", "    depends_on: api\n")
+    with pytest.raises(ConfigError, match="dependency cycle"):
+        parse(cyclic)
+
+
+def test_load_project_caches_until_the_file_changes(tmp_path):
+    path = tmp_path / "project.yaml"
+    path.write_text(VALID)
+
+    first = load_project(path)
+    assert load_project(path) == first
+    assert list((tmp_path / ".shepherd" / "config").iterdir())
+
+    path.write_text(VALID.replace("A demo project", "Changed"))
+    os.utime(path, ns=(0, 0))
+    assert load_project(path)["description"] == "Changed"
+
+
+def test_missing_file(tmp_path):
+    with pytest.raises(ConfigError, match="No such file"):
+        load_project(tmp_path / "missing.yaml")
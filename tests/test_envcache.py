@@ -0,0 +1,56 @@
+import pytest
+
+from shepherd import envcache
+
+
+def test_included_requirements_are_part_of_the_key(tmp_path):
+    (tmp_path / "requirements.txt").write_text("-r base.txt\nrequests\n")
+    (tmp_path / "base.txt").write_text("--constraint=pins/constraints.txt  # pinned\n")
+    (tmp_path / "pins").mkdir()
+    (tmp_path / "pins" / "constraints.txt").write_text("requests==2.31.0\n")
+
+    [env] = envcache.detect(tmp_path)
+    (tmp_path / "pins" / "constraints.txt").write_text("requests==2.32.0\n")
+    [changed] = envcache.detect(tmp_path)
+
+    assert env["files"] == ["requirements.txt"]
+    assert env["includes"] == ["base.txt", "pins/constraints.txt"]
+    assert changed["key"] != env["key"]
+
+
+def test_link_tree_can_avoid_sharing_inodes(tmp_path):
+    source = tmp_path / "env"
+    (source / "lib").mkdir(parents=True)
+    (source / "lib" / "mod.py").write_text("x = 1\n")
+
+    envcache._link_tree(source, tmp_path / "linked", str(source))
+    envcache._link_tree(source, tmp_path / "copied", str(source), hardlink=False)
+
+    inode = (source / "lib" / "mod.py").stat().st_ino
+    assert (tmp_path / "linked" / "lib" / "mod.py").stat().st_ino == inode
+    assert (tmp_path / "copied" / "lib" / "mod.py").stat().st_ino != inode
+    assert (tmp_path / "copied" / "lib" / "mod.py").read_text() == "x = 1\n"
+
+
+def test_missing_and_outside_includes_are_skipped(tmp_path, monkeypatch):
+    monkeypatch.setenv("SHEPHERD_ENV_CACHE", str(tmp_path / "cache"))
+    workdir = tmp_path / "ws"
+    workdir.mkdir()
+    (workdir / "requirements.txt").write_text("-r missing.txt\n")
+
+    [missing] = envcache.ensure(workdir)
+    (workdir / "requirements.txt").write_text("-r ../shared.txt\n")
+    [outside] = envcache.ensure(workdir)
+
+    assert (missing.status, missing.note) == ("skipped", "requirements include missing.txt, which cannot be found")
+    assert outside.status == "skipped" and "outside the working directory" in outside.note
+    assert not (tmp_path / "cache").exists()
+
+
+def test_an_interpreter_that_cannot_run_is_an_error(tmp_path):
+    (tmp_path / "requirements.txt").write_text("requests\n")
+
+    with pytest.raises(ValueError, match="cannot run Python interpreter .*/nope"):
+        envcache.detect(tmp_path, python=str(tmp_path / "nope"))
+    with pytest.raises(ValueError, match="failed to report its version"):
+        envcache.detect(tmp_path, python="false")
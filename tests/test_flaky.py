@@ -0,0 +1,50 @@
+import threading
+
+from shepherd import flaky
+from shepherd.flaky import FlakeLedger
+
+
+def test_one_lucky_pass_does_not_quarantine(tmp_path):
+    ledger = FlakeLedger(tmp_path / "flaky.db")
+
+    assert not ledger.record("t::a", [True, False, False])
+    assert ledger.record("t::a", [True, False, False])
+    assert ledger.quarantined() == {"t::a"}
+
+
+def test_consistent_failures_release_a_quarantine(tmp_path):
+    ledger = FlakeLedger(tmp_path / "flaky.db")
+    assert ledger.record("t::a", [True, True, False])
+
+    assert not ledger.record("t::a", [False, False, False])
+    assert ledger.quarantined() == set()
+
+
+def test_release_forgets_the_history(tmp_path):
+    ledger = FlakeLedger(tmp_path / "flaky.db")
+    ledger.record("t::a", [True, True, False])
+
+    ledger.release("t::a")
+
+    assert not ledger.record("t::a", [True, False, False])
+
+
+def test_reruns_are_bounded_by_jobs(tmp_path, monkeypatch):
+    lock = threading.Lock()
+    running, peak = 0, 0
+
+    def run_command(command, cwd, timeout, env, capture):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        threading.Event().wait(0.05)
+        with lock:
+            running -= 1
+        return 0, capture
+
+    monkeypatch.setattr(flaky, "run_command", run_command)
+    outcomes = flaky.rerun(["t.py::a", "t.py::b"], "pytest", tmp_path, ".", count=3, jobs=2)
+
+    assert outcomes == {"t.py::a": [True] * 3, "t.py::b": [True] * 3}
+    assert peak == 2
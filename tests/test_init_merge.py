@@ -0,0 +1,79 @@
+from shepherd import templates
+from shepherd.init import scaffold
+from shepherd.merge import MARKER_BASE, MARKER_OURS, MARKER_SEP, MARKER_THEIRS, merge3
+
+CONFIG = {"name": "demo", "tasks": [{"name": "api", "description": "Build the API", "test_command": "pytest"}]}
+
+
+def test_merge3_takes_one_sided_changes():
+    base = "a\nb\nc\nd\n"
+
+    assert merge3(base, "A\nb\nc\nd\n", "a\nb\nc\nD\n") == ("A\nb\nc\nD\n", 0)
+    assert merge3(base, "a\nB\nc\nd\n", "a\nB\nc\nd\n") == ("a\nB\nc\nd\n", 0)
+
+
+def test_merge3_marks_conflicting_changes():
+    merged, conflicts = merge3("a\nb\nc\n", "a\nlocal\nc\n", "a\ntemplate\nc\n")
+
+    assert conflicts == 1
+    lines = ("a", MARKER_OURS, "local", MARKER_BASE, "b", MARKER_SEP, "template", MARKER_THEIRS, "c")
+    assert merged == "".join(f"{line}\n" for line in lines)
+
+
+def test_merge3_terminates_a_last_line_without_newline():
+    merged, conflicts = merge3("a\nb", "a\nx", "a\ny")
+
+    assert conflicts == 1
+    assert f"x\n{MARKER_BASE}\nb\n{MARKER_SEP}\ny\n{MARKER_THEIRS}\n" in merged
+
+
+def _legacy(tmp_path):
+    """A .deepagents/ written by a release from before scaffold.json."""
+    for path in templates.manifest():
+        target = tmp_path / ".deepagents" / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(templates.earlier_render(path))
+    return tmp_path / ".deepagents"
+
+
+def test_unedited_legacy_files_are_updated(tmp_path):
+    deepagents = _legacy(tmp_path)
+
+    result = scaffold(CONFIG, tmp_path)
+
+    assert ".deepagents/AGENTS.md" in {str(p) for p in result.updated}
+    assert (deepagents / "AGENTS.md").read_text() == templates.render("AGENTS.md", CONFIG)
+
+
+def test_edited_legacy_files_are_merged_or_left_with_a_sidecar(tmp_path):
+    deepagents = _legacy(tmp_path)
+    review = deepagents / "skills/code-review/SKILL.md"
+    review.write_text(review.read_text() + "\nLocal note.\n")
+    custom = deepagents / "skills/debugging/SKILL.md"
+    custom.write_text("Our own debugging notes.\n")
+
+    result = scaffold(CONFIG, tmp_path)
+
+    assert [str(p) for p in result.merged] == [".deepagents/skills/code-review/SKILL.md"]
+    assert review.read_text().endswith("Local note.\n")
+    assert [str(p) for p in result.conflicts] == [".deepagents/skills/debugging/SKILL.md"]
+    assert custom.read_text() == "Our own debugging notes.\n"
+    assert MARKER_OURS in (deepagents / "skills/debugging/SKILL.md.merge").read_text()
+
+
+def test_rescaffold_merges_template_changes_into_edits(tmp_path, monkeypatch):
+    scaffold(CONFIG, tmp_path)
+    agents = tmp_path / ".deepagents/AGENTS.md"
+    agents.write_text(agents.read_text() + "\nLocal note.\n")
+    original = templates.render
+
+    def render(path, config=None, variant="full"):
+        text = original(path, config, variant)
+        return "Template update.\n" + text if path == "AGENTS.md" else text
+
+    monkeypatch.setattr(templates, "render", render)
+    result = scaffold({**CONFIG, "description": "changed"}, tmp_path)
+
+    assert ".deepagents/AGENTS.md" in {str(p) for p in result.merged}
+    text = agents.read_text()
+    assert text.startswith("Template update.\n") and text.endswith("Local note.\n")
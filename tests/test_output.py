@@ -0,0 +1,126 @@
+import io
+
+from shepherd.output import MAX_FAILURES, OutputCapture, detect_framework, parse
+
+PYTEST = """\
+FF                                                                       [100%]
+=================================== FAILURES ===================================
+___________________________________ test_add ___________________________________
+
+    def test_add():
+>       assert add(1, 2) == 3
+E       assert -1 == 3
+E        +  where -1 = add(1, 2)
+
+test_calc.py:4: AssertionError
+___________________________________ test_key ___________________________________
+
+    def test_key():
+>       {}["x"]
+E       KeyError: 'x'
+
+test_calc.py:7: KeyError
+=========================== short test summary info ============================
+FAILED test_calc.py::test_add - assert -1 == 3
+FAILED test_calc.py::test_key - KeyError: 'x'
+============================== 2 failed in 0.02s ===============================
+"""
+
+JEST = """\
+ FAIL  src/sum.test.js
+  ● sum › adds numbers
+
+    expect(received).toBe(expected) // Object.is equality
+
+    Expected: 3
+    Received: -1
+
+      3 | test('adds numbers', () => {
+    > 4 |   expect(sum(1, 2)).toBe(3);
+        |                     ^
+
+      at Object.<anonymous> (src/sum.test.js:4:21)
+
+Tests:       1 failed, 1 total
+"""
+
+GO = """\
+=== RUN   TestAdd
+    calc_test.go:9: Add(1, 2): got 1, want 3
+--- FAIL: TestAdd (0.00s)
+=== RUN   TestSub
+--- PASS: TestSub (0.00s)
+FAIL
+"""
+
+CARGO = """\
+running 1 test
+test tests::adds ... FAILED
+
+failures:
+
+---- tests::adds stdout ----
+thread 'tests::adds' panicked at src/lib.rs:10:9:
+assertion `left == right` failed
+  left: -1
+ right: 3
+
+test result: FAILED. 0 passed; 1 failed; 0 ignored; 0 measured; 0 filtered out
+"""
+
+
+def test_frameworks_are_detected_from_the_command():
+    assert detect_framework("python -m pytest -x") == "pytest"
+    assert detect_framework("npm test") == "jest"
+    assert detect_framework("go test ./...") == "go"
+    assert detect_framework("cargo test") == "cargo"
+    assert detect_framework("python manage.py test") == "python"
+
+
+def test_pytest_failures():
+    [add, key] = parse(PYTEST, "pytest")
+
+    assert (add.test, add.error_type, add.location) == ("test_calc.py::test_add", "AssertionError", "test_calc.py:4")
+    assert (add.expected, add.actual) == ("3", "-1")
+    assert (key.test, key.error_type, key.message) == ("test_calc.py::test_key", "KeyError", "'x'")
+    assert key.location == "test_calc.py:7"
+
+
+def test_jest_failures():
+    [failure] = parse(JEST, "jest")
+
+    assert failure.test == "sum › adds numbers"
+    assert (failure.expected, failure.actual, failure.location) == ("3", "-1", "src/sum.test.js:4")
+
+
+def test_go_failures_keep_the_log_lines_of_the_failing_test_only():
+    [failure] = parse(GO, "go")
+
+    assert (failure.test, failure.message) == ("TestAdd", "Add(1, 2): got 1, want 3")
+    assert (failure.expected, failure.actual, failure.location) == ("3", "1", "calc_test.go:9")
+
+
+def test_cargo_failures_with_the_message_on_its_own_line():
+    [failure] = parse(CARGO, "cargo")
+
+    assert (failure.test, failure.error_type, failure.location) == ("tests::adds", "panic", "src/lib.rs:10")
+    assert (failure.message, failure.expected, failure.actual) == ("assertion `left == right` failed", "3", "-1")
+
+
+def test_capture_is_bounded_and_logs_everything(tmp_path):
+    block = "_____ test_{0} _____\n\n>       assert f({0}) == 0\nE       assert 1 == 0\n\n"
+    block += "test_f.py:{0}: AssertionError\n"
+    text = "noise\n" * 5000 + "".join(block.format(i) for i in range(40)) + "===== 40 failed in 1.00s =====\n"
+    capture = OutputCapture("pytest", log_path=tmp_path / "run.log", tail_lines=10)
+
+    capture.read(io.StringIO(text))
+    capture.close()
+    summary = capture.summary()
+
+    assert (tmp_path / "run.log").read_text() == text
+    assert summary["lines"] == text.count("\n")
+    assert len(capture.tail) == 10
+    assert len(summary["failures"]) == MAX_FAILURES
+    assert summary["more_failures"] == 40 - MAX_FAILURES
+    assert summary["failures"][0]["location"] == "test_f.py:0"
+    assert summary["counts"] == "40 failed"
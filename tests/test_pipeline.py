@@ -0,0 +1,63 @@
+import pytest
+
+from shepherd.pipeline import run_pipeline, stages_for
+from shepherd.verify import Verdict
+
+TASK = {
+    "name": "api",
+    "test_command": "pytest tests/e2e",
+    "scope": "e2e",
+    "stages": [
+        {"tier": "unit", "command": "pytest tests/unit"},
+        {"tier": "import", "command": "python -c 'import app'", "timeout": 5},
+        {"name": "lint", "tier": "import", "command": "pyflakes ."},
+    ],
+}
+
+
+def test_stages_are_normalised_and_include_the_test_command():
+    stages = stages_for(TASK)
+
+    assert [(s["name"], s["tier"]) for s in stages] == [
+        ("unit #1", "unit"),
+        ("import #2", "import"),
+        ("lint", "import"),
+        ("test_command", "e2e"),
+    ]
+    assert stages[1]["timeout"] == 5.0
+
+
+@pytest.mark.parametrize(
+    "stage, message",
+    [({"tier": "unit"}, "needs a 'command'"), ({"tier": "smoke", "command": "true"}, "unknown tier 'smoke'")],
+)
+def test_invalid_stages_are_rejected(stage, message):
+    with pytest.raises(ValueError, match=message):
+        stages_for({"name": "api", "stages": [stage]})
+
+
+def test_tiers_run_in_order_and_stop_at_the_first_failure():
+    ran = []
+
+    def verify_stage(label, command, timeout):
+        ran.append(command)
+        passed = command != "pyflakes ."
+        return Verdict(label, command, passed, exit_code=0 if passed else 1, duration=0.0, output=f"{command} output")
+
+    verdict = run_pipeline("api", stages_for(TASK), verify_stage)
+
+    assert sorted(ran) == ["pyflakes .", "python -c 'import app'"]
+    assert not verdict.passed
+    assert verdict.output == "pyflakes . output"
+    assert [s["status"] for s in verdict.stages] == ["PASS", "FAIL", "SKIPPED", "SKIPPED"]
+
+
+def test_a_passing_pipeline_reports_the_last_stage():
+    def verify_stage(label, command, timeout):
+        return Verdict(label, command, True, exit_code=0, duration=0.0, cached=True)
+
+    verdict = run_pipeline("api", stages_for(TASK), verify_stage)
+
+    assert verdict.passed and verdict.cached
+    assert verdict.command == "pytest tests/e2e"
+    assert {s["status"] for s in verdict.stages} == {"PASS"}
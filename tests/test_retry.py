@@ -0,0 +1,66 @@
+from shepherd.retry import build_prompt, compare
+from shepherd.templates import estimate_tokens
+
+TASK = {"name": "api", "description": "Build the API"}
+
+
+def _failure(test, error_type, message, location, frames=()):
+    return {"test": test, "error_type": error_type, "message": message, "location": location, "frames": list(frames)}
+
+
+PREVIOUS = {
+    "exit_code": 1,
+    "failures": [
+        _failure("t.py::a", "KeyError", "'id'", "app.py:10"),
+        _failure("t.py::b", "AssertionError", "assert 1 == 2", "t.py:8"),
+        _failure("t.py::c", "AssertionError", "assert 0 == 1", "t.py:12"),
+    ],
+}
+CURRENT = {
+    "exit_code": 1,
+    "failures": [
+        _failure("t.py::b", "AssertionError", "assert 1 == 2", "t.py:8"),
+        _failure("t.py::c", "AssertionError", "assert 2 == 1", "t.py:12", frames=["t.py:12", "app.py:20"]),
+        _failure("t.py::d", "ValueError", "empty", "app.py:30"),
+    ],
+}
+
+
+def test_compare_sorts_failures_into_new_changed_unchanged_and_fixed():
+    delta = compare(PREVIOUS["failures"], CURRENT["failures"])
+
+    assert [f["test"] for f in delta.new] == ["t.py::d"]
+    assert [(old["message"], new["message"]) for old, new in delta.changed] == [("assert 0 == 1", "assert 2 == 1")]
+    assert delta.unchanged == ["t.py::b"]
+    assert delta.fixed == ["t.py::a"]
+
+
+def test_a_retry_prompt_holds_only_the_delta():
+    prompt = build_prompt(TASK, 2, PREVIOUS, CURRENT)
+
+    assert prompt.startswith("Task: api -- retry after failed attempt 2\nBuild the API")
+    assert "Fix this root cause first:\n  1. [runtime] ValueError: empty" in prompt
+    assert "Fixed by your last attempt (keep them passing): t.py::a" in prompt
+    assert "Still failing with the same error: t.py::b" in prompt
+    assert "assert 1 == 2" not in prompt
+    assert "New since your last attempt" not in prompt
+    assert "Now failing differently:\n  - t.py::c: AssertionError: assert 2 == 1 (at t.py:12); was " in prompt
+    assert "via t.py:12 -> app.py:20" in prompt
+
+
+def test_the_first_retry_lists_every_failure():
+    prompt = build_prompt(TASK, 1, None, CURRENT)
+
+    assert "Other failures, fix after the root cause:" in prompt
+    assert "assert 1 == 2" in prompt
+
+
+def test_prompts_stay_within_the_budget():
+    diff = "".join(f"diff --git a/f{i}.py b/f{i}.py\n" + "+x = 1\n" * 200 for i in range(20))
+    diff += "diff --git a/app.py b/app.py\n+fix = True\n"
+
+    prompt = build_prompt(TASK, 5, PREVIOUS, CURRENT, diff, budget=400)
+
+    assert estimate_tokens(prompt) <= 400
+    assert "Your last attempt:\ndiff --git a/app.py b/app.py" in prompt
+    assert "more changed file(s) not shown" in prompt
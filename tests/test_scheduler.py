@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+from shepherd import scheduler
+
+
+def test_tasks_without_depends_on_run_in_sequence():
+    graph = scheduler.task_graph([{"name": "a"}, {"name": "b"}, {"name": "c"}])
+
+    assert graph == {"a": [], "b": ["a"], "c": ["b"]}
+    assert scheduler.topological_levels(graph) == [["a"], ["b"], ["c"]]
+
+
+def test_independent_tasks_share_a_level():
+    graph = scheduler.task_graph(
+        [
+            {"name": "db"},
+            {"name": "api", "depends_on": "db"},
+            {"name": "ui"},
+            {"name": "e2e", "depends_on": ["api", "ui", "api"]},
+        ]
+    )
+
+    assert graph["e2e"] == ["api", "ui"]
+    assert scheduler.topological_levels(graph) == [["db", "ui"], ["api"], ["e2e"]]
+
+
+@pytest.mark.parametrize(
+    "tasks, message",
+    [
+        ([{"name": "a"}, {"name": "a"}], "duplicate task name 'a'"),
+        ([{"name": "a", "depends_on": "nope"}], "unknown task 'nope'"),
+        ([{"description": "no name"}], "task #1"),
+    ],
+)
+def test_invalid_graphs_are_rejected(tasks, message):
+    with pytest.raises(ValueError, match=message):
+        scheduler.task_graph(tasks)
+
+
+def test_cycles_are_reported_with_their_path():
+    tasks = [{"name": "a", "depends_on": "c"}, {"name": "b", "depends_on": "a"}, {"name": "c", "depends_on": "b"}]
+
+    with pytest.raises(scheduler.CycleError, match="a -> c -> b -> a"):
+        scheduler.task_graph(tasks)
+
+
+def test_run_skips_dependents_of_failed_tasks():
+    graph = {"a": [], "b": ["a"], "c": ["b"], "d": []}
+
+    status = scheduler.run(graph, lambda name: name != "a")
+
+    assert status == {"a": "failed", "b": "skipped", "c": "skipped", "d": "passed"}
+
+
+def test_run_counts_exceptions_as_failures():
+    def dispatch(name):
+        raise RuntimeError(name)
+
+    assert scheduler.run({"a": [], "b": ["a"]}, dispatch) == {"a": "failed", "b": "skipped"}
+
+
+def test_run_respects_max_parallel():
+    lock = threading.Lock()
+    running, peak = 0, 0
+
+    def dispatch(name):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        threading.Event().wait(0.05)
+        with lock:
+            running -= 1
+        return True
+
+    status = scheduler.run({name: [] for name in "abcdef"}, dispatch, max_parallel=2)
+
+    assert set(status.values()) == {"passed"}
+    assert peak == 2
+
+
+@pytest.mark.parametrize("value", [0, -1, True, "3"])
+def test_max_parallel_must_be_a_positive_integer(value):
+    with pytest.raises(ValueError, match="max_parallel"):
+        scheduler.max_parallel({"max_parallel": value})
@@ -0,0 +1,87 @@
+import subprocess
+import time
+
+from shepherd import snapshots
+
+
+def _workspace(tmp_path, git=False):
+    workdir = tmp_path / "ws"
+    workdir.mkdir()
+    (workdir / "keep.txt").write_text("base\n")
+    if git:
+        subprocess.run(["git", "init", "-q"], cwd=workdir, check=True)
+    return workdir
+
+
+def test_solo_task_is_restored_wholesale(tmp_path):
+    workdir = _workspace(tmp_path)
+    snapshots.take(tmp_path, workdir, "a", "in_progress")
+    (workdir / "keep.txt").write_text("mangled\n")
+    (workdir / "sub").mkdir()
+    (workdir / "sub" / "new.txt").write_text("x\n")
+
+    result = snapshots.rollback_blocked(tmp_path, workdir, "a", {"a": time.time()})
+
+    assert result["restored"] == ["keep.txt", "sub/new.txt"]
+    assert (workdir / "keep.txt").read_text() == "base\n"
+    assert not (workdir / "sub").exists()
+
+
+def test_other_task_finishing_meanwhile_keeps_its_files(tmp_path):
+    workdir = _workspace(tmp_path)
+    snapshots.take(tmp_path, workdir, "a", "in_progress")
+    snapshots.take(tmp_path, workdir, "b", "in_progress")
+    (workdir / "b.txt").write_text("b\n")
+    (workdir / "a.txt").write_text("a\n")
+    later = time.time() + 1
+
+    result = snapshots.rollback_blocked(tmp_path, workdir, "a", {"a": later, "b": later})
+
+    assert result["restored"] == []
+    assert (workdir / "b.txt").exists()
+
+
+def test_only_the_blocked_tasks_paths_are_restored(tmp_path):
+    workdir = _workspace(tmp_path, git=True)
+    snapshots.take(tmp_path, workdir, "a", "in_progress")
+    snapshots.take(tmp_path, workdir, "b", "in_progress")
+    (workdir / "b.txt").write_text("b\n")
+    snapshots.checkpoint(tmp_path, workdir, ["b"])
+    (workdir / "a.txt").write_text("attempt 1\n")
+    snapshots.take(tmp_path, workdir, "a", "retry")
+    later = time.time() + 1
+
+    result = snapshots.rollback_blocked(tmp_path, workdir, "a", {"a": later, "b": later})
+
+    assert result["restored"] == ["a.txt"]
+    assert not (workdir / "a.txt").exists()
+    assert (workdir / "b.txt").read_text() == "b\n"
+
+
+def test_checkpointed_files_are_never_deleted(tmp_path):
+    workdir = _workspace(tmp_path)
+    snapshots.take(tmp_path, workdir, "a", "in_progress")
+    (workdir / "shared.txt").write_text("from b\n")
+    snapshots.take(tmp_path, workdir, "b", "in_progress")
+    snapshots.checkpoint(tmp_path, workdir, ["b"])
+    (workdir / "a.txt").write_text("a\n")
+    snapshots.take(tmp_path, workdir, "a", "retry")
+    snapshots.touch(tmp_path, workdir, "a", ["a.txt", "shared.txt"])
+    later = time.time() + 1
+
+    snapshots.rollback_blocked(tmp_path, workdir, "a", {"a": later, "b": later})
+
+    assert (workdir / "shared.txt").exists()
+    assert not (workdir / "a.txt").exists()
+
+
+def test_rollback_can_be_undone(tmp_path):
+    workdir = _workspace(tmp_path)
+    snapshots.take(tmp_path, workdir, "a", "in_progress")
+    (workdir / "a.txt").write_text("a\n")
+
+    result = snapshots.rollback(tmp_path, workdir, "a")
+    assert not (workdir / "a.txt").exists()
+
+    snapshots.rollback(tmp_path, workdir, "a", to=result["discarded"])
+    assert (workdir / "a.txt").read_text() == "a\n"
@@ -0,0 +1,83 @@
+import json
+import subprocess
+import time
+
+from shepherd import speculate
+from shepherd.cache import ResultCache
+
+
+def _project(tmp_path, command="true"):
+    workdir = tmp_path / "ws"
+    workdir.mkdir()
+    (workdir / "app.py").write_text("x = 1\n")
+    (workdir / "old.py").write_text("y = 1\n")
+    config = {
+        "working_directory": "./ws",
+        "checkpoints": False,
+        "tasks": [{"name": "t", "test_command": command, "timeout": 60}],
+    }
+    return workdir, config
+
+
+def _git(workdir):
+    (workdir / ".gitignore").write_text(".env\nlocal.db\n")
+    for args in (["init", "-q"], ["add", "-A"], ["-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "base"]):
+        subprocess.run(["git", *args], cwd=workdir, check=True)
+    (workdir / ".env").write_text("SECRET=1\n")
+    (workdir / "local.db").write_text("rows\n")
+
+
+def test_merge_back_leaves_ignored_files_alone(tmp_path):
+    workdir, config = _project(tmp_path, "cd ws && test -f new.py")
+    _git(workdir)
+    cache = ResultCache.for_root(tmp_path)
+    manifest = speculate.prepare(config, config["tasks"][0], tmp_path, 2, cache)
+    assert manifest["mode"] == "worktree"
+    candidate = tmp_path / manifest["candidates"][0]["workdir"]
+    assert not (candidate / ".env").exists()
+    (candidate / "app.py").write_text("x = 2\n")
+    (candidate / "old.py").unlink()
+    (candidate / "new.py").write_text("z = 1\n")
+
+    result = speculate.pick(config, config["tasks"][0], tmp_path, cache)
+
+    assert result["merged"] == ["app.py", "new.py", "old.py"]
+    assert (workdir / "app.py").read_text() == "x = 2\n"
+    assert not (workdir / "old.py").exists()
+    assert (workdir / ".env").read_text() == "SECRET=1\n"
+    assert (workdir / "local.db").exists()
+    cache.close()
+
+
+def test_merge_back_only_writes_what_the_candidate_changed(tmp_path):
+    workdir, config = _project(tmp_path)
+    cache = ResultCache.for_root(tmp_path)
+    manifest = speculate.prepare(config, config["tasks"][0], tmp_path, 2, cache)
+    assert manifest["mode"] == "copy"
+    candidate = tmp_path / manifest["candidates"][0]["workdir"]
+    (candidate / "app.py").write_text("x = 2\n")
+    (workdir / "notes.txt").write_text("added after the fork\n")
+
+    forked = json.loads((speculate.spec_dir(tmp_path, "t") / "base.json").read_text())
+    merged = speculate.merge_back(workdir, candidate, cache, forked)
+
+    assert merged == ["app.py"]
+    assert (workdir / "notes.txt").exists()
+    assert (workdir / "old.py").exists()
+    cache.close()
+
+
+def test_pick_kills_the_losing_candidates(tmp_path):
+    workdir, config = _project(tmp_path, "cd ws && test -f ok || sleep 60")
+    cache = ResultCache.for_root(tmp_path)
+    manifest = speculate.prepare(config, config["tasks"][0], tmp_path, 2, cache)
+    (tmp_path / manifest["candidates"][0]["workdir"] / "ok").write_text("")
+
+    start = time.monotonic()
+    result = speculate.pick(config, config["tasks"][0], tmp_path, cache)
+
+    assert time.monotonic() - start < 30
+    assert result["winner"] == 1
+    assert [c["status"] for c in result["candidates"]] == ["PASS", "CANCELLED"]
+    assert (workdir / "ok").exists()
+    cache.close()
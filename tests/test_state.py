@@ -0,0 +1,47 @@
+from shepherd.state import StateStore
+from shepherd.verify import Verdict
+
+
+def _verdict(passed, cached=False):
+    return Verdict("api", "pytest", passed, exit_code=0 if passed else 1, duration=0.1, cached=cached)
+
+
+def test_verdicts_update_status_and_count_attempts(tmp_path):
+    store = StateStore(tmp_path / "state.db")
+
+    store.record(_verdict(False), tree="t1")
+    store.record(_verdict(False, cached=True), tree="t1")
+    store.record(_verdict(True), tree="t2")
+
+    state = store.get("api")
+    assert (state.status, state.attempts, state.tree, state.last_error) == ("passed", 2, "t2", None)
+    assert store.get("db").status == "pending"
+
+
+def test_a_failure_keeps_a_blocked_task_and_its_note(tmp_path):
+    store = StateStore(tmp_path / "state.db")
+    store.set_status("api", "blocked", "needs an API key from the user")
+
+    store.record(_verdict(False))
+
+    state = store.get("api")
+    assert (state.status, state.note, state.attempts) == ("blocked", "needs an API key from the user", 1)
+    assert state.last_error is not None
+
+
+def test_a_pass_clears_blocked_and_the_note(tmp_path):
+    store = StateStore(tmp_path / "state.db")
+    store.set_status("api", "blocked", "needs an API key from the user")
+
+    store.record(_verdict(True))
+
+    assert (store.get("api").status, store.get("api").note) == ("passed", None)
+
+
+def test_a_failure_ends_in_progress(tmp_path):
+    store = StateStore(tmp_path / "state.db")
+    store.set_status("api", "in_progress", "delegated")
+
+    store.record(_verdict(False))
+
+    assert (store.get("api").status, store.get("api").note) == ("failed", "delegated")
@@ -0,0 +1,63 @@
+import hashlib
+import json
+import subprocess
+import sys
+
+import pytest
+
+from shepherd import telemetry
+
+
+def test_span_reports_rss_only_when_the_peak_rose(tmp_path):
+    subprocess.run([sys.executable, "-c", "x = bytearray(64 * 1024 * 1024)"], check=True)
+
+    with telemetry.span(tmp_path, "verify", "small"):
+        subprocess.run(["true"], check=True)
+    with telemetry.span(tmp_path, "verify", "large"):
+        subprocess.run([sys.executable, "-c", "x = bytearray(256 * 1024 * 1024)"], check=True)
+
+    spans = [json.loads(line) for line in (telemetry.telemetry_dir(tmp_path) / "spans.jsonl").read_text().splitlines()]
+    assert [s["task"] for s in spans] == ["small", "large"]
+    assert spans[0]["max_rss_kb"] is None
+    assert spans[1]["max_rss_kb"] > 256 * 1024
+
+
+def test_spans_nest_and_record_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr(telemetry, "_run_id", None)
+    monkeypatch.setenv("SHEPHERD_RUN_ID", "run-1")
+
+    with telemetry.span(tmp_path, "delegate", "api", model="sonnet") as attrs:
+        attrs.update(cost_usd=0.5, tokens_in=100)
+        with pytest.raises(RuntimeError):
+            with telemetry.span(tmp_path, "verify", "api"):
+                raise RuntimeError("boom")
+
+    inner, outer = telemetry.load(tmp_path)
+    assert inner["parent"] == outer["id"] and outer["parent"] is None
+    assert (inner["status"], outer["status"]) == ("error", "ok")
+    assert outer["attrs"] == {"model": "sonnet", "cost_usd": 0.5, "tokens_in": 100}
+    report = telemetry.aggregate([inner, outer])
+    assert list(report["phases"]) == ["delegate"]
+    assert report["tasks"]["api"]["phases"] == {"delegate": 1, "verify": 1}
+    assert report["cost_usd"] == 0.5
+
+
+def test_spans_export_as_an_otlp_trace(tmp_path, monkeypatch):
+    monkeypatch.setattr(telemetry, "_run_id", None)
+    monkeypatch.setenv("SHEPHERD_RUN_ID", "run-1")
+    with telemetry.span(tmp_path, "delegate", "api", model="sonnet", turns=3):
+        with telemetry.span(tmp_path, "verify", "api", passed=True):
+            pass
+
+    [resource] = telemetry.to_otlp(telemetry.load(tmp_path))["resourceSpans"]
+    verify, delegate = resource["scopeSpans"][0]["spans"]
+
+    assert verify["traceId"] == delegate["traceId"] == hashlib.md5(b"run-1").hexdigest()
+    assert verify["parentSpanId"] == delegate["spanId"] and "parentSpanId" not in delegate
+    assert delegate["name"] == "delegate api"
+    assert int(delegate["endTimeUnixNano"]) >= int(verify["endTimeUnixNano"]) >= int(verify["startTimeUnixNano"])
+    attributes = {a["key"]: a["value"] for a in delegate["attributes"]}
+    assert attributes["gen_ai.request.model"] == {"stringValue": "sonnet"}
+    assert attributes["shepherd.turns"] == {"intValue": "3"}
+    assert {a["key"]: a["value"] for a in verify["attributes"]}["shepherd.passed"] == {"boolValue": True}
+    assert delegate["status"] == {"code": 1}
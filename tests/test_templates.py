@@ -0,0 +1,96 @@
+import pytest
+
+from shepherd import templates
+from shepherd.init import scaffold
+
+CONFIG = {"name": "demo", "tasks": [{"name": "api", "description": "Build the API", "test_command": "pytest"}]}
+
+
+def _dangling(text):
+    """Lines ending in ":" that introduce nothing: the next non-blank line is a heading or the end."""
+    lines = [line for line in text.split("---\n", 2)[-1].split("\n") if line.strip()]
+    return [
+        line
+        for line, after in zip(lines, lines[1:] + ["#"])
+        if line.rstrip().endswith(":") and after.startswith("#")
+    ]
+
+
+def test_minimal_skills_keep_what_their_lead_ins_introduce():
+    for name in templates.skill_names():
+        text = templates.render(templates.skill_path(name), CONFIG, "minimal")
+
+        assert _dangling(text) == [], name
+
+
+def test_minimal_skills_fit_a_small_budget():
+    config = {**CONFIG, "skills": ["test-runner", "debugging", "error-analysis"], "skill_token_budget": 3000}
+
+    variants = templates.skill_variants(config)
+
+    assert "minimal" in variants.values()
+    total = sum(templates.estimate_tokens(templates.render(path, config, v)) for path, v in variants.items())
+    assert total <= 3000
+
+
+def test_manifest_matches_the_template_files():
+    assert templates.manifest() == templates.build_manifest()
+    assert list(templates.manifest()) == list(templates.NAMES.values())
+
+
+def test_former_constants_render_without_a_config():
+    assert templates.PM_AGENTS_MD == templates.render("AGENTS.md")
+    assert "TEST_RUNNER_SKILL_MD" in dir(templates)
+    with pytest.raises(KeyError, match="no template"):
+        templates.read_bytes("skills/missing/SKILL.md")
+
+
+def test_config_key_changes_with_the_config_and_the_renderer(monkeypatch):
+    key = templates.config_key(CONFIG)
+
+    assert templates.config_key(dict(reversed(CONFIG.items()))) == key
+    assert templates.config_key({**CONFIG, "description": "changed"}) != key
+    monkeypatch.setattr(templates, "RENDER_VERSION", templates.RENDER_VERSION + 1)
+    assert templates.config_key(CONFIG) != key
+
+
+def test_render_key_changes_with_the_path_variant_and_template(monkeypatch):
+    key = templates.config_key(CONFIG)
+    path = templates.skill_path("debugging")
+    render_key = templates.render_key(key, path)
+
+    assert templates.render_key(key, path, "minimal") != render_key
+    assert templates.render_key(key, templates.skill_path("code-review")) != render_key
+    edited = {**templates.manifest(), path: {**templates.manifest()[path], "sha256": "0" * 64}}
+    monkeypatch.setattr(templates, "manifest", lambda: edited)
+    assert templates.render_key(key, path) != render_key
+
+
+def test_rescaffold_renders_only_when_a_key_changes(tmp_path, monkeypatch):
+    scaffold(CONFIG, tmp_path)
+    original = templates.render
+    rendered = []
+
+    def render(path, config=None, variant="full"):
+        rendered.append(path)
+        return original(path, config, variant)
+
+    monkeypatch.setattr(templates, "render", render)
+    scaffold(CONFIG, tmp_path)
+    assert rendered == []
+
+    scaffold({**CONFIG, "description": "changed"}, tmp_path)
+    assert set(rendered) == set(templates.manifest())
+
+
+def test_stack_blocks_follow_the_project():
+    python = templates.render("skills/dependency-management/SKILL.md", CONFIG)
+    node = templates.render(
+        "skills/dependency-management/SKILL.md",
+        {**CONFIG, "tasks": [{"name": "ui", "description": "Build the UI", "test_command": "npm test"}]},
+    )
+    generic = templates.render("skills/dependency-management/SKILL.md")
+
+    assert "### Python" in python and "### Node.js" not in python
+    assert "### Node.js" in node and "### Python" not in node
+    assert "### Python" in generic and "### Node.js" in generic
@@ -0,0 +1,62 @@
+import os
+
+from shepherd.cache import ResultCache
+from shepherd.testmap import affected_tests, changed_files, verify_incremental
+
+TESTS = {
+    "tests/test_a.py::test_a": {"file": "tests/test_a.py", "deps": ["a.py", "tests/test_a.py"]},
+    "tests/test_b.py::test_b": {"file": "tests/test_b.py", "deps": ["b.py", "tests/test_b.py"]},
+}
+
+
+def test_changed_files_covers_added_removed_and_modified():
+    before = {"a.py": "1", "b.py": "2", "c.py": "3"}
+    after = {"a.py": "1", "b.py": "changed", "d.py": "4"}
+
+    assert changed_files(before, after) == {"b.py", "c.py", "d.py"}
+
+
+def test_affected_tests_are_those_that_ran_a_changed_file():
+    assert affected_tests(TESTS, {"b.py"}) == ["tests/test_b.py::test_b"]
+    assert affected_tests(TESTS, {"README.md"}) == []
+
+
+def test_unknown_test_files_and_conftest_need_the_full_run():
+    assert affected_tests(TESTS, {"tests/conftest.py"}) is None
+    assert affected_tests(TESTS, {"tests/test_new.py"}) is None
+
+
+def test_file_digests_are_reused_while_size_and_mtime_match(tmp_path):
+    cache = ResultCache(tmp_path / "cache.db")
+    (tmp_path / "ws").mkdir()
+    path = tmp_path / "ws" / "app.py"
+    path.write_text("x = 1\n")
+    stat = path.stat()
+    first = cache.file_digests(tmp_path / "ws")
+
+    path.write_text("x = 2\n")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cache.file_digests(tmp_path / "ws") == first
+
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert cache.file_digests(tmp_path / "ws") != first
+    cache.close()
+
+
+def test_a_broken_change_fails_on_the_affected_tests_alone(tmp_path):
+    ws = tmp_path / "ws"
+    ws.mkdir()
+    (ws / "a.py").write_text("A = 1\n")
+    (ws / "b.py").write_text("B = 1\n")
+    (ws / "test_a.py").write_text("from a import A\n\ndef test_a():\n    assert A == 1\n")
+    (ws / "test_b.py").write_text("def test_b():\n    import b\n    assert b.B == 1\n")
+    command = "cd ws && python -m pytest -q -p no:cacheprovider"
+
+    first = verify_incremental("t", command, tmp_path, "ws")
+    (ws / "b.py").write_text("B = 2\n")
+    second = verify_incremental("t", command, tmp_path, "ws")
+
+    assert first.passed and not first.partial
+    assert second.partial and not second.passed
+    assert "[incremental: 1 affected test(s)]" in second.output
+    assert [f["test"] for f in second.failures] == ["test_b.py::test_b"]
@@ -0,0 +1,65 @@
+from shepherd.triage import format_fix_list, triage
+
+
+def _failure(test, error_type, message, location, frames=()):
+    return {"test": test, "error_type": error_type, "message": message, "location": location, "frames": list(frames)}
+
+
+def test_fixes_are_ranked_by_category_then_by_reach():
+    fixes = triage(
+        [
+            _failure("t.py::a", "AssertionError", "assert 1 == 2", "t.py:3"),
+            _failure("t.py::b", "KeyError", "'x'", "app.py:10"),
+            _failure("t.py::c", "TypeError", "bad", "app.py:20"),
+            _failure("t.py::d", "TypeError", "bad", "app.py:20"),
+            _failure(None, "ModuleNotFoundError", "No module named 'yaml'", "conf.py:1"),
+        ]
+    )
+
+    assert [(f.category, f.error_type) for f in fixes] == [
+        ("import", "ModuleNotFoundError"),
+        ("runtime", "TypeError"),
+        ("runtime", "KeyError"),
+        ("assertion", "AssertionError"),
+    ]
+    assert "FIX THIS FIRST" in format_fix_list(fixes).splitlines()[0]
+
+
+def test_same_error_at_the_same_frame_is_one_cluster():
+    fixes = triage(
+        [
+            _failure("t.py::a", "ValueError", "bad value 1", None),
+            _failure("t.py::b", "ValueError", "bad value 2", None),
+            _failure("t.py::c", "ValueError", "other", "app.py:5"),
+        ]
+    )
+
+    assert [f.tests for f in fixes] == [["t.py::a", "t.py::b"], ["t.py::c"]]
+
+
+def test_failures_through_a_file_that_does_not_import_are_cascades():
+    fixes = triage(
+        [
+            _failure("tests/test_api.py", "ModuleNotFoundError", "No module named 'db'", "src/app.py:2"),
+            _failure("tests/test_ui.py::test_page", "NameError", "name 'app' is not defined", "tests/test_ui.py:9",
+                     frames=["tests/test_ui.py:9", "src/app.py:14"]),
+        ]
+    )
+
+    assert len(fixes) == 1
+    assert fixes[0].cascades == ["tests/test_ui.py::test_page"]
+
+
+def test_an_import_error_inside_a_test_does_not_swallow_its_neighbours():
+    fixes = triage(
+        [
+            _failure("tests/test_x.py::test_optional", "ModuleNotFoundError", "No module named 'extra'",
+                     "tests/test_x.py:12"),
+            _failure("tests/test_x.py::test_math", "AssertionError", "assert -1 == 3", "tests/test_x.py:20",
+                     frames=["tests/test_x.py:20"]),
+        ]
+    )
+
+    assert [f.error_type for f in fixes] == ["ModuleNotFoundError", "AssertionError"]
+    assert fixes[0].cascades == []
+    assert fixes[1].tests == ["tests/test_x.py::test_math"]
@@ -0,0 +1,44 @@
+import json
+import sys
+import time
+
+import pytest
+
+from shepherd.verify import main, run_command
+
+
+def test_background_processes_do_not_hold_the_output_open(tmp_path):
+    start = time.monotonic()
+
+    exit_code, capture = run_command("sleep 30 & echo started; echo done", tmp_path)
+
+    assert exit_code == 0
+    assert time.monotonic() - start < 10
+    assert capture.text.splitlines()[-2:] == ["started", "done"]
+
+
+def test_timeouts_kill_the_process_group(tmp_path):
+    exit_code, capture = run_command("echo before; sleep 30", tmp_path, timeout=0.5)
+
+    assert exit_code == 124
+    assert "before" in capture.text
+    assert "[timed out after 0.5s]" in capture.text
+
+
+def test_tasks_without_stages_get_their_timeout(tmp_path, monkeypatch, capsys):
+    (tmp_path / "workspace").mkdir()
+    (tmp_path / "project.yaml").write_text(
+        "name: demo\ndescription: Demo\ntasks:\n"
+        "  - name: slow\n    description: Sleeps\n    test_command: sleep 30\n    timeout: 1\n"
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["verify", "--json", "--no-cache"])
+    start = time.monotonic()
+
+    with pytest.raises(SystemExit) as info:
+        main()
+
+    assert info.value.code == 1
+    assert time.monotonic() - start < 20
+    [verdict] = json.loads(capsys.readouterr().out)
+    assert verdict["exit_code"] == 124
@@ -0,0 +1,63 @@
+import pytest
+
+from shepherd.verify import verify
+from shepherd.warm import Invocation, WarmPool, fingerprint, parse
+
+
+def test_python_commands_are_parsed_for_a_warm_run():
+    assert parse("cd ws && python -m pytest -q tests/test_a.py") == Invocation(
+        cwd="ws", python="python", mode="-m", target="pytest", args=["-q", "tests/test_a.py"]
+    )
+    assert parse("python3 -c 'import app; print(1)'") == Invocation(
+        cwd="", python="python3", mode="-c", target="import app; print(1)", args=[]
+    )
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        "pytest -q",
+        "python -O -m pytest",
+        "python -m pytest | tee log",
+        "python -m pytest tests/*.py",
+        "python -m pytest $ARGS",
+        "cd ws && npm test",
+        "python -c 'import app' && python -m pytest",
+        "python -c 'unterminated",
+    ],
+)
+def test_anything_else_runs_cold(command):
+    assert parse(command) is None
+
+
+def test_fingerprint_follows_dependency_files(tmp_path):
+    before = fingerprint([str(tmp_path / "site")], tmp_path)
+    (tmp_path / "app.py").write_text("x = 1\n")
+    assert fingerprint([str(tmp_path / "site")], tmp_path) == before
+
+    (tmp_path / "requirements.txt").write_text("requests\n")
+    assert fingerprint([str(tmp_path / "site")], tmp_path) != before
+
+
+def test_cold_commands_are_left_to_the_caller(tmp_path):
+    pool = WarmPool()
+
+    assert pool.run("echo hi", tmp_path) is None
+    assert pool.run("cd missing && python -c 'print(1)'", tmp_path) is None
+    verdict = verify("t", "echo hi | cat", tmp_path, ".", warm=pool)
+    assert verdict.passed and verdict.output.strip() == "hi"
+    pool.close()
+
+
+def test_a_warm_run_matches_a_cold_one(tmp_path):
+    (tmp_path / "ws").mkdir()
+    (tmp_path / "ws" / "app.py").write_text("import sys\nprint('argv', sys.argv[1:])\nsys.exit(3)\n")
+    pool = WarmPool()
+
+    result = pool.run("cd ws && python -m app one two", tmp_path, timeout=60)
+    cold = verify("t", "cd ws && python -m app one two", tmp_path, "ws")
+
+    assert result is not None
+    exit_code, capture = result
+    assert (exit_code, capture.text) == (cold.exit_code, cold.output) == (3, "argv ['one', 'two']")
+    pool.close()